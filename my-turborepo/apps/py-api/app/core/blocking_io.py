@@ -0,0 +1,84 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class BlockingIO:
+    """
+    Runs blocking calls (parquet reads, status files, shared drive access) off the event loop.
+
+    All calls share one bounded thread pool, and each resource has its own concurrency limit, so a
+    burst of slow reads on one resource (e.g. snapshots on a slow SMB share) queues behind its own
+    limit instead of taking every thread, and the event loop stays free for cheap endpoints.
+    """
+
+    def __init__(self, max_workers: int = 16, limits: dict[str, int] | None = None, default_limit: int = 4):
+        """
+        Args:
+            max_workers (int): Threads shared by all resources.
+            limits (dict): Maximum concurrent calls per resource name.
+            default_limit (int): Limit of resources not listed in limits.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blocking-io")
+        self.max_workers = max_workers
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._stats: dict[str, dict] = {}
+
+    async def run(self, resource: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Awaits func(*args, **kwargs) on the thread pool, within the limit of resource."""
+        semaphore = self._semaphores.get(resource)
+        if semaphore is None:
+            semaphore = self._semaphores[resource] = asyncio.Semaphore(self.limits.get(resource, self.default_limit))
+            self._stats[resource] = {"running": 0, "waiting": 0, "completed": 0, "max_wait": 0.0}
+        stats = self._stats[resource]  # Only touched from the event loop, no lock needed
+
+        queued_at = time.perf_counter()
+        stats["waiting"] += 1
+        acquired = False
+        try:
+            async with semaphore:
+                acquired = True
+                stats["waiting"] -= 1
+                stats["running"] += 1
+                stats["max_wait"] = max(stats["max_wait"], time.perf_counter() - queued_at)
+                try:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+                finally:
+                    stats["running"] -= 1
+                    stats["completed"] += 1
+        finally:
+            if not acquired:
+                stats["waiting"] -= 1  # Request cancelled while queued
+
+    def metrics(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "resources": {
+                name: {**stats, "limit": self.limits.get(name, self.default_limit)}
+                for name, stats in self._stats.items()
+            },
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def offload(resource: str):
+    """
+    Turns a blocking endpoint into an async one whose body runs through app.state.blocking_io
+    under the given resource's limit. The endpoint must take a `request: Request` parameter.
+    """
+
+    def decorator(func: Callable[..., Any]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await kwargs["request"].app.state.blocking_io.run(resource, func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
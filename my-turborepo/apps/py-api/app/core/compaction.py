@@ -0,0 +1,352 @@
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Process, Queue
+from typing import Callable, Optional
+
+import portalocker
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from app.core.formats import SNAPSHOT_METADATA_PREFIX, conform_table, read_snapshot_metadata
+
+logger = logging.getLogger(__name__)
+
+# Compacted snapshots live in snapshots/{data_type}/{folder_id}/_history/{partition}.parquet,
+# one row group per original snapshot, identified by the snapshot_ts column
+HISTORY_DIR = "_history"
+SNAPSHOT_TS_COLUMN = "snapshot_ts"
+SNAPSHOT_NAME_FORMAT = "%Y%m%d_%H%M%S"
+PARTITION_FORMATS = {"day": "%Y%m%d", "month": "%Y%m"}
+LOCK_FILENAME = ".compaction.lock"
+
+_SNAPSHOT_NAME = re.compile(r"^\d{8}_\d{6}\.parquet$")
+
+
+def snapshot_timestamp(filename: str) -> Optional[datetime]:
+    """Timestamp encoded in a snapshot filename such as 20251231_100000.parquet (None for other names)."""
+    if not _SNAPSHOT_NAME.match(filename):
+        return None
+    try:
+        return datetime.strptime(filename[:-8], SNAPSHOT_NAME_FORMAT)
+    except ValueError:
+        return None
+
+
+def snapshot_filename(ts: datetime) -> str:
+    return f"{ts.strftime(SNAPSHOT_NAME_FORMAT)}.parquet"
+
+
+def partition_versions(path: str) -> list[str]:
+    """
+    Snapshot filenames stored in a compacted partition file, from the list in its footer metadata
+    (falls back to reading the snapshot_ts column).
+    """
+    listed = read_snapshot_metadata(path).get("versions")
+    if listed is not None:
+        return listed.split(",") if listed else []
+    column = pq.read_table(path, columns=[SNAPSHOT_TS_COLUMN]).column(SNAPSHOT_TS_COLUMN)
+    return sorted(snapshot_filename(ts) for ts in pc.unique(column).to_pylist())
+
+
+class SnapshotCompactor:
+    """
+    Folds old per-run snapshot files into per-day (or per-month) partition files and applies retention.
+
+    PortfolioDataManager writes one small parquet per data_type and run. Once a snapshot is older
+    than min_age (and not among the keep_latest newest of its folder), it is appended to the
+    partition file of its day under _history/ with a snapshot_ts column, and the per-run file is
+    deleted once the partition has existed for grace_seconds, so every PC's mirror has synced it
+    before the original disappears. SnapshotIndex and DataManager keep addressing compacted
+    snapshots by their original filename.
+
+    Only one PC compacts at a time (lock file in the shared root); the others skip the run.
+    """
+
+    def __init__(
+        self,
+        shared_dir: str,
+        partition: str = "day",
+        min_age: float = 86400.0,
+        keep_latest: int = 5,
+        retention_days: Optional[float] = None,
+        grace_seconds: float = 600.0,
+        on_write: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            shared_dir (str): Root path of the shared data directory (e.g., 'Y:/Shared')
+            partition (str): 'day' or 'month', the period covered by one partition file.
+            min_age (float): Seconds a snapshot stays a separate file before it is compacted.
+            keep_latest (int): Newest snapshots per folder that are never compacted or expired.
+            retention_days (float): Snapshots older than this are deleted (None keeps them forever).
+            grace_seconds (float): Age a partition must reach before the files it covers are deleted.
+            on_write (Callable): Called with the path of every partition file written.
+        """
+        if partition not in PARTITION_FORMATS:
+            raise ValueError(f"Unknown partition: {partition}")
+        self.shared_dir = shared_dir
+        self.snapshots_dir = os.path.join(shared_dir, "snapshots")
+        self.partition = partition
+        self.min_age = min_age
+        self.keep_latest = keep_latest
+        self.retention_days = retention_days
+        self.grace_seconds = grace_seconds
+        self.on_write = on_write
+
+    def run(self) -> dict:
+        """
+        Compacts every snapshots/{data_type}/{folder_id} folder.
+
+        Returns:
+            dict: Statistics of the run ('skipped' if another PC holds the compaction lock).
+        """
+        stats = {
+            "skipped": False,
+            "folders": 0,
+            "compacted": 0,
+            "partitions_written": 0,
+            "files_removed": 0,
+            "expired": 0,
+            "seconds": 0.0,
+        }
+        start = time.perf_counter()
+        lock_path = os.path.join(self.shared_dir, LOCK_FILENAME)
+        try:
+            with portalocker.Lock(lock_path, mode="a", timeout=0, fail_when_locked=True):
+                for data_type in self._list_dirs(self.snapshots_dir):
+                    for folder_id in self._list_dirs(os.path.join(self.snapshots_dir, data_type)):
+                        try:
+                            self.compact_folder(data_type, folder_id, stats)
+                        except Exception as e:
+                            logger.error(f"SnapshotCompactor: Failed to compact {data_type}/{folder_id}: {e}")
+                        stats["folders"] += 1
+        except portalocker.exceptions.LockException:
+            stats["skipped"] = True
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+    def compact_folder(self, data_type: str, folder_id: str, stats: dict):
+        folder = os.path.join(self.snapshots_dir, data_type, folder_id)
+        history = os.path.join(folder, HISTORY_DIR)
+        now = datetime.now()
+        loose = sorted(
+            (name, ts) for name in os.listdir(folder) if (ts := snapshot_timestamp(name)) is not None
+        )  # Oldest first
+        protected = {name for name, _ in loose[-self.keep_latest :]} if self.keep_latest > 0 else set()
+
+        if self.retention_days is not None:
+            cutoff = now - timedelta(days=self.retention_days)
+            for name, ts in loose:
+                if ts < cutoff and name not in protected:
+                    self._remove(os.path.join(folder, name), stats)
+                    stats["expired"] += 1
+            self._expire_partitions(history, cutoff, stats)
+            loose = [(name, ts) for name, ts in loose if os.path.exists(os.path.join(folder, name))]
+
+        # Fold snapshots that are old enough into their partition
+        due = [(name, ts) for name, ts in loose if name not in protected and (now - ts).total_seconds() >= self.min_age]
+        covered = self._partition_contents(history)
+        groups: dict[str, list[tuple[str, datetime]]] = {}
+        for name, ts in due:
+            key = ts.strftime(PARTITION_FORMATS[self.partition])
+            if name not in covered.get(key, ()):
+                groups.setdefault(key, []).append((name, ts))
+        for key, members in groups.items():
+            self._append_to_partition(folder, history, key, members)
+            stats["compacted"] += len(members)
+            stats["partitions_written"] += 1
+        if groups:
+            covered = self._partition_contents(history)
+
+        # Delete per-run files once their partition had time to reach every mirror
+        for name, ts in due:
+            key = ts.strftime(PARTITION_FORMATS[self.partition])
+            partition_path = os.path.join(history, f"{key}.parquet")
+            if name in covered.get(key, ()) and self._age(partition_path) >= self.grace_seconds:
+                self._remove(os.path.join(folder, name), stats)
+
+    def _append_to_partition(self, folder: str, history: str, key: str, members: list[tuple[str, datetime]]):
+        """Rewrites the partition with its existing snapshots plus members."""
+        os.makedirs(history, exist_ok=True)
+        path = os.path.join(history, f"{key}.parquet")
+        tables = self._read_partition(path) if os.path.exists(path) else []
+        for name, ts in members:
+            table = pq.read_table(os.path.join(folder, name)).replace_schema_metadata(None)
+            column = pa.array([ts] * table.num_rows, type=pa.timestamp("s"))
+            tables.append((ts, table.append_column(SNAPSHOT_TS_COLUMN, column)))
+        self._write_partition(path, tables)
+
+    def _expire_partitions(self, history: str, cutoff: datetime, stats: dict):
+        fmt = PARTITION_FORMATS[self.partition]
+        for name in self._list_files(history):
+            try:
+                start = datetime.strptime(name[: -len(".parquet")], fmt)
+            except ValueError:
+                continue
+            if self.partition == "day":
+                end = start + timedelta(days=1)
+            else:
+                end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+            path = os.path.join(history, name)
+            if end <= cutoff:
+                stats["expired"] += len(partition_versions(path))
+                self._remove(path, stats)
+            elif start < cutoff:
+                tables = self._read_partition(path)
+                keep = [(ts, table) for ts, table in tables if ts >= cutoff]
+                if len(keep) < len(tables):
+                    stats["expired"] += len(tables) - len(keep)
+                    self._write_partition(path, keep)
+
+    @staticmethod
+    def _read_partition(path: str) -> list[tuple[datetime, pa.Table]]:
+        """Splits a partition file back into (snapshot_ts, table) per snapshot."""
+        table = pq.read_table(path).replace_schema_metadata(None)
+        column = table.column(SNAPSHOT_TS_COLUMN)
+        return [
+            (ts, table.filter(pc.equal(column, pa.scalar(ts, column.type)))) for ts in pc.unique(column).to_pylist()
+        ]
+
+    def _write_partition(self, path: str, tables: list[tuple[datetime, pa.Table]]):
+        """
+        Writes snapshots as one partition file, one row group per snapshot (so reading one version only
+        decodes its own row group), with the list of versions in the footer for SnapshotIndex.
+        """
+        tables = sorted(tables, key=lambda item: item[0])
+        versions = ",".join(snapshot_filename(ts) for ts, _ in tables)
+        schema = pa.unify_schemas([t.schema for _, t in tables], promote_options="permissive")
+        schema = schema.with_metadata({f"{SNAPSHOT_METADATA_PREFIX}versions": versions})
+        tmp = f"{path}.tmp"
+        with pq.ParquetWriter(tmp, schema) as writer:
+            for _, table in tables:
+                writer.write_table(conform_table(table, schema))
+        os.replace(tmp, path)  # Readers see the old or the new partition, never a partial one
+        if self.on_write:
+            self.on_write(path)
+
+    def _partition_contents(self, history: str) -> dict[str, set[str]]:
+        return {
+            name[: -len(".parquet")]: set(partition_versions(os.path.join(history, name)))
+            for name in self._list_files(history)
+        }
+
+    @staticmethod
+    def _remove(path: str, stats: dict):
+        try:
+            os.remove(path)
+            stats["files_removed"] += 1
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _age(path: str) -> float:
+        try:
+            return time.time() - os.stat(path).st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    @staticmethod
+    def _list_dirs(path: str) -> list[str]:
+        try:
+            return sorted(e.name for e in os.scandir(path) if e.is_dir() and not e.name.startswith((".", "_")))
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _list_files(path: str) -> list[str]:
+        try:
+            return sorted(n for n in os.listdir(path) if n.endswith(".parquet"))
+        except FileNotFoundError:
+            return []
+
+
+def run_in_subprocess(compactor: SnapshotCompactor, stop_event: Optional[threading.Event] = None) -> Optional[dict]:
+    """
+    Runs compactor.run() in a child process, so decoding and rewriting parquet doesn't hold the API
+    process's GIL for minutes. Concurrent runs, from this or another PC, still skip on the compaction lock.
+
+    Args:
+        compactor (SnapshotCompactor): Compaction to run (passed to the child process).
+        stop_event (threading.Event): Terminates the run once set. Partitions are replaced atomically,
+            so an interrupted run only loses its progress.
+
+    Returns:
+        dict: Statistics of the run, None if it was stopped.
+
+    Raises:
+        RuntimeError: If the run failed or the child process died without reporting statistics.
+    """
+    results = Queue()
+    process = Process(target=_run_compactor, args=(compactor, results), name="snapshot-compaction", daemon=True)
+    process.start()
+    try:
+        while True:
+            try:
+                result = results.get(timeout=0.5)
+                break
+            except queue.Empty:
+                pass
+            if stop_event is not None and stop_event.is_set():
+                process.terminate()
+                return None
+            if not process.is_alive():
+                try:
+                    result = results.get(timeout=0.5)  # Reported just before exiting
+                    break
+                except queue.Empty:
+                    raise RuntimeError(f"Compaction process exited with code {process.exitcode}") from None
+    finally:
+        process.join(timeout=5.0)
+    if isinstance(result, Exception):
+        raise RuntimeError(f"Compaction failed: {result}")
+    return result
+
+
+def _run_compactor(compactor: SnapshotCompactor, results: Queue):
+    try:
+        results.put(compactor.run())
+    except Exception as e:
+        results.put(e)
+
+
+class CompactionScheduler(threading.Thread):
+    """Runs a SnapshotCompactor every interval seconds, each run in a child process (see run_in_subprocess)."""
+
+    def __init__(self, compactor: SnapshotCompactor, interval: float = 6 * 3600.0, initial_delay: float = 300.0):
+        """
+        Args:
+            compactor (SnapshotCompactor): Compaction to run.
+            interval (float): Seconds between runs.
+            initial_delay (float): Seconds after start before the first run, to stay out of the startup path.
+        """
+        super().__init__(daemon=True, name="snapshot-compaction")
+        self.compactor = compactor
+        self.interval = interval
+        self.initial_delay = initial_delay
+        self.last_run: Optional[dict] = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=5.0)
+
+    def run(self):
+        delay = self.initial_delay
+        while not self._stop_event.wait(delay):
+            delay = self.interval
+            try:
+                stats = run_in_subprocess(self.compactor, self._stop_event)
+                if stats is None:
+                    return
+                self.last_run = {"finished_at": datetime.now().isoformat(), **stats}
+                if not self.last_run["skipped"]:
+                    logger.info(f"SnapshotCompactor: {self.last_run}")
+            except Exception as e:
+                logger.error(f"SnapshotCompactor: Run failed: {e}")
@@ -0,0 +1,179 @@
+import itertools
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+TEMP_SUFFIX = ".synctmp"
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+RATE_WINDOW_SECONDS = 60.0
+
+# Lower value is copied first
+PRIORITY_STATUS = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_SNAPSHOT = 2
+
+
+def copy_priority(rel_path: str) -> int:
+    """Status JSON must reach the UI before bulky snapshots."""
+    top = rel_path.replace("\\", "/").split("/", 1)[0]
+    if top == "status":
+        return PRIORITY_STATUS
+    if top == "snapshots":
+        return PRIORITY_SNAPSHOT
+    return PRIORITY_DEFAULT
+
+
+def atomic_copy(src: str, dst: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Copies src to a temp file next to dst in chunks, then atomically renames it into place.
+    Readers of dst therefore see either the old or the new file, never a partial one.
+    Metadata (mtime) is preserved like shutil.copy2.
+
+    Returns:
+        int: Number of bytes copied.
+    """
+    tmp = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.{threading.get_ident()}{TEMP_SUFFIX}")
+    copied = 0
+    try:
+        with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+            while chunk := fsrc.read(chunk_size):
+                fdst.write(chunk)
+                copied += len(chunk)
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return copied
+
+
+class CopyPipeline:
+    """
+    Bounded pool of copy threads fed by a priority queue.
+    Network I/O releases the GIL, so several copies from the share can run in parallel.
+    """
+
+    def __init__(self, max_workers: int = 4, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()  # FIFO order within the same priority
+        self._pending: set[str] = set()  # Queued or in-flight destinations
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+        self._in_flight = 0
+        self._files_copied = 0
+        self._bytes_copied = 0
+        self._failures = 0
+        self._recent_bytes: deque = deque()  # (finished_at, bytes) within RATE_WINDOW_SECONDS
+        self._recent_lags: deque = deque(maxlen=100)
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"copy-{i}", daemon=True) for i in range(max_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(
+        self,
+        src: str,
+        dst: str,
+        priority: int = PRIORITY_DEFAULT,
+        size: int = 0,
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """
+        Queues a copy unless the same destination is already queued or being copied.
+        on_done is called from the copy thread after a successful rename.
+
+        Returns:
+            bool: True if the copy was queued.
+        """
+        with self._lock:
+            if dst in self._pending:
+                return False
+            self._pending.add(dst)
+        # Smaller files first within the same priority class
+        self._queue.put((priority, size, next(self._seq), src, dst, time.time(), on_done))
+        return True
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every queued copy has finished. Returns False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return True
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def metrics(self) -> dict:
+        """Counters for monitoring how far the local mirror lags behind the share."""
+        now = time.time()
+        with self._lock:
+            self._trim_rate_window(now)
+            window_bytes = sum(b for _, b in self._recent_bytes)
+            lags = [lag for _, lag in self._recent_lags]
+            return {
+                "queue_depth": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "files_copied": self._files_copied,
+                "bytes_copied": self._bytes_copied,
+                "failures": self._failures,
+                "bytes_per_sec": window_bytes / RATE_WINDOW_SECONDS,
+                "max_lag_seconds": max(lags, default=0.0),
+                "recent": [{"path": path, "lag_seconds": lag} for path, lag in self._recent_lags],
+            }
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            try:
+                _, _, _, src, dst, enqueued_at, on_done = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            with self._lock:
+                self._in_flight += 1
+            try:
+                copied = atomic_copy(src, dst, self.chunk_size)
+                if on_done:
+                    on_done()
+                now = time.time()
+                with self._lock:
+                    self._files_copied += 1
+                    self._bytes_copied += copied
+                    self._recent_bytes.append((now, copied))
+                    self._trim_rate_window(now)
+                    self._recent_lags.append((dst, now - enqueued_at))
+            except (IOError, OSError) as e:
+                # If file is locked etc., skip and retry on next sync cycle
+                with self._lock:
+                    self._failures += 1
+                logger.warning(f"Syncer: Could not copy {src}. It might be in use. {e}")
+            except Exception as e:
+                with self._lock:
+                    self._failures += 1
+                logger.error(f"Syncer: Unexpected error copying {src}: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._pending.discard(dst)
+                self._queue.task_done()
+
+    def _trim_rate_window(self, now: float):
+        while self._recent_bytes and now - self._recent_bytes[0][0] > RATE_WINDOW_SECONDS:
+            self._recent_bytes.popleft()
@@ -1,76 +1,484 @@
+import base64
+import json
+import operator
 import os
-from functools import lru_cache
-from typing import Any, Dict, List
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow.fs import LocalFileSystem
+
+from app.core.compaction import SNAPSHOT_NAME_FORMAT, SNAPSHOT_TS_COLUMN, snapshot_timestamp
+from app.core.formats import conform_table, open_arrow_sidecar, read_snapshot_metadata
+from app.core.snapshot_cache import SnapshotCache
+from app.core.snapshot_index import SHARED_FOLDERS, SnapshotIndex
+
+# (column, operator, raw value) e.g. ("date", ">=", "2025-01-01")
+Predicate = Tuple[str, str, str]
+
+_PREDICATE_PATTERN = re.compile(r"^\s*([^<>=!\s]+)\s*(==|!=|>=|<=|=|>|<)\s*(.*?)\s*$")
+VERSION_COLUMN = "version"  # Snapshot filename of each row in history results
+_FOLDER_FIELD = "_folder"  # Folder a history fragment was read from (target_id, ALL or BATCH)
+CHANGE_COLUMN = "change"  # 'added', 'removed' or 'changed' in diff results
+
+# Columns identifying a row across snapshots of a data_type, used to pair rows in diffs.
+# ALL and BATCH snapshots are additionally keyed by primary_id. Other data_types are keyed by the whole row.
+DIFF_KEY_COLUMNS = {
+    "prices": ["fund_id", "field"],
+    "fx_rates": ["fund_id", "field"],
+    "calendar_events": ["event_id"],
+    "guideline": ["fund_id", "rule"],
+    "guideline_results": ["fund_id", "rule"],
+}
+_DIFF_KEYS_METADATA = b"ok_dashboard.diff_keys"
+
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+
+def parse_predicate(expression: str) -> Predicate:
+    """Parses a query-string predicate such as 'field=PX_LAST' or 'date>=2025-01-01'."""
+    match = _PREDICATE_PATTERN.match(expression)
+    if not match:
+        raise ValueError(f"Invalid filter: {expression}")
+    column, op, value = match.groups()
+    return column, "==" if op == "=" else op, value
+
+
+def build_filter_expression(schema: pa.Schema, filters: Tuple[Predicate, ...]) -> pc.Expression:
+    """Combines predicates into one Arrow expression, casting each value to its column's type."""
+    expression = None
+    for column, op, value in filters:
+        if column not in schema.names:
+            raise ValueError(f"Unknown filter column: {column}")
+        try:
+            scalar = pa.scalar(value).cast(schema.field(column).type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            raise ValueError(f"Invalid value for {column}: {value}")
+        term = _OPERATORS[op](pc.field(column), scalar)
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def diff_keys(diff: pa.Table) -> List[str]:
+    """Key columns a DataManager.load_diff result was paired by."""
+    return json.loads((diff.schema.metadata or {}).get(_DIFF_KEYS_METADATA, b"[]"))
+
+
+def encode_cursor(filename: str, offset: int) -> str:
+    """Opaque pagination cursor pinned to a concrete snapshot, so 'latest' moving doesn't shift pages."""
+    return base64.urlsafe_b64encode(json.dumps({"v": filename, "o": offset}).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(payload["v"]), int(payload["o"])
+    except Exception:
+        raise ValueError("Invalid cursor")
 
 
 class DataManager:
     """
     Provides access to the mirrored data on the local SSD.
-    Uses LRU cache to avoid repetitive disk I/O.
+    Uses a memory-bounded LRU cache keyed by file version to avoid repetitive disk I/O.
     """
 
-    def __init__(self, local_root: str):
+    def __init__(self, local_root: str, cache_max_bytes: int = 512 * 1024**2, memory_map: bool = True):
+        """
+        Args:
+            local_root (str): Root of the local mirror.
+            cache_max_bytes (int): Memory budget of the snapshot cache.
+            memory_map (bool): Read Arrow tables through memory maps of the local files. Tables backed by
+                an Arrow sidecar (see FileSyncer's arrow_sidecars) are then zero-copy and not cached.
+        """
         self.local_root = local_root
+        self.memory_map = memory_map
+        self.cache = SnapshotCache(max_bytes=cache_max_bytes)
+        self.index = SnapshotIndex(local_root)
 
-    def _get_merged_files(self, data_type: str, target_id: str) -> List[str]:
-        """Check ALL and target_id and return merged files"""
-        files = set()
-        paths = [
-            os.path.join(self.local_root, "snapshots", data_type, target_id),
-            os.path.join(self.local_root, "snapshots", data_type, "ALL"),
-        ]
-        for p in paths:
-            if os.path.exists(p):
-                files.update([f for f in os.listdir(p) if f.endswith(".parquet")])
-        return sorted(list(files), reverse=True)
+    def invalidate(self, path: str):
+        """Drops cached reads of a local file."""
+        self.cache.invalidate(path)
+
+    def on_file_synced(self, path: str):
+        """Called by the syncer whenever it writes a local file (new snapshot or overwrite)."""
+        self.cache.invalidate(path)
+        self.index.add(path)
+
+    def on_file_removed(self, path: str):
+        """Called by the syncer when it deletes a local file that was removed from the share."""
+        self.cache.invalidate(path)
+        self.index.discard(path)
 
-    @lru_cache(maxsize=64)
     def _raw_read(self, path: str) -> pd.DataFrame:
         """Cache raw read only to avoid duplicate cachcing due to different target ids"""
+        return self.cache.get_or_load(path, "frame", lambda: self._read_frame_uncached(path))
+
+    def _read_frame_uncached(self, path: str) -> pd.DataFrame:
+        # Converting the mapped sidecar skips parquet decoding
+        table = open_arrow_sidecar(path) if self.memory_map else None
+        if table is not None:
+            return table.to_pandas()
         return pd.read_parquet(path, engine="pyarrow")
 
-    def load_parquet(self, data_type: str, target_id: str, filename: str) -> pd.DataFrame:
+    def _raw_read_table(
+        self,
+        path: str,
+        columns: Optional[Tuple[str, ...]] = None,
+        filters: Optional[Tuple[Predicate, ...]] = None,
+    ) -> pa.Table:
+        """
+        Reads a parquet file as an Arrow table (no pandas round-trip).
+        Each projection/filter combination is cached as its own variant of the file.
+        """
+        if self.memory_map:
+            # Zero-copy view on the page cache: repeated reads cost (almost) no extra memory, nothing to cache
+            table = open_arrow_sidecar(path)
+            if table is not None:
+                return self._project_and_filter(table, columns, filters)
+        return self.cache.get_or_load(
+            path, ("table", columns, filters), lambda: self._read_table_uncached(path, columns, filters)
+        )
+
+    def _read_table_uncached(
+        self,
+        path: str,
+        columns: Optional[Tuple[str, ...]] = None,
+        filters: Optional[Tuple[Predicate, ...]] = None,
+    ) -> pa.Table:
+        """
+        Column selection and predicates are pushed down into the parquet reader,
+        so only the requested columns and matching row groups are decoded.
+        """
+        schema = pq.read_schema(path)
+        if columns:
+            missing = [c for c in columns if c not in schema.names]
+            if missing:
+                raise ValueError(f"Unknown columns: {missing}")
+        expression = build_filter_expression(schema, filters) if filters else None
+        return pq.read_table(
+            path, columns=list(columns) if columns else None, filters=expression, memory_map=self.memory_map
+        )
+
+    @staticmethod
+    def _project_and_filter(
+        table: pa.Table,
+        columns: Optional[Tuple[str, ...]] = None,
+        filters: Optional[Tuple[Predicate, ...]] = None,
+    ) -> pa.Table:
+        """In-memory equivalent of the parquet pushdown for tables that are already mapped."""
+        if filters:
+            table = table.filter(build_filter_expression(table.schema, filters))
+        if columns:
+            missing = [c for c in columns if c not in table.column_names]
+            if missing:
+                raise ValueError(f"Unknown columns: {missing}")
+            table = table.select(list(columns))
+        return table
+
+    def _find_snapshot(self, data_type: str, target_id: str, filename: str) -> Tuple[str, str, Optional[Predicate]]:
+        """
+        Locates a snapshot: snapshots/{data_type}/{target_id}/{filename}, else the _history partition it was
+        compacted into, else the same under ALL, else under BATCH if that batch covered target_id.
+
+        Returns:
+            tuple: (path, folder_id it was found in, snapshot_ts predicate selecting the snapshot's
+                rows if it lives in a partition)
+        """
+        for folder_id in (target_id,) if target_id in SHARED_FOLDERS else (target_id, *SHARED_FOLDERS):
+            if not self.index.covers(data_type, folder_id, filename, target_id):
+                continue
+            path = os.path.join(self.local_root, "snapshots", data_type, folder_id, filename)
+            if os.path.exists(path):
+                return path, folder_id, None
+            partition = self.index.locate(data_type, folder_id, filename)
+            if partition is not None and os.path.exists(partition):
+                ts = snapshot_timestamp(filename)
+                return partition, folder_id, (SNAPSHOT_TS_COLUMN, "==", ts.isoformat())
+
+        raise FileNotFoundError(f"Snapshot {filename} not found.")
+
+    def load_parquet(
+        self,
+        data_type: str,
+        target_id: str,
+        filename: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[List[Predicate]] = None,
+    ) -> pd.DataFrame:
         """
         Loads a specific parquet file based on data_type.
         Path: snapshots/{data_type}/{target_id}/{filename}
+
+        Args:
+            columns (list): Columns to read (all if None).
+            filters (list): (column, op, value) predicates applied at read time, see parse_predicate.
         """
-        path = os.path.join(self.local_root, "snapshots", data_type, target_id, filename)
-        if os.path.exists(path):
+        path, folder_id, version = self._find_snapshot(data_type, target_id, filename)
+        if folder_id == target_id and version is None and not columns and not filters:
             return self._raw_read(path)
+        return self.load_table(data_type, target_id, filename, columns, filters).to_pandas()
+
+    def load_table(
+        self,
+        data_type: str,
+        target_id: str,
+        filename: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[List[Predicate]] = None,
+    ) -> pa.Table:
+        """
+        Arrow counterpart of load_parquet.
+        A file found under ALL or BATCH is filtered by primary_id while reading instead of after materializing
+        it, and a compacted snapshot by its snapshot_ts (one row group of the partition).
+        """
+        path, folder_id, version = self._find_snapshot(data_type, target_id, filename)
+        predicates = tuple(filters or ())
+        if folder_id != target_id and "primary_id" in pq.read_schema(path).names:
+            predicates += (("primary_id", "==", target_id),)
+        if version is not None:
+            predicates += (version,)
+        table = self._raw_read_table(path, tuple(columns) if columns else None, predicates or None)
+        if version is not None and SNAPSHOT_TS_COLUMN in table.column_names:
+            table = table.drop_columns([SNAPSHOT_TS_COLUMN])  # Same shape as before compaction
+        return table
 
-        # Search in ALL if it doesn't exist in specific and target_id != "ALL"
-        if target_id != "ALL":
-            all_path = os.path.join(self.local_root, "snapshots", data_type, "ALL", filename)
-            if os.path.exists(all_path):
-                df = self._raw_read(all_path)
-                if target_id != "ALL" and isinstance(df, pd.DataFrame) and "primary_id" in df.columns:
-                    df = df[df["primary_id"] == target_id]
-                return df
+    def load_history(
+        self,
+        data_type: str,
+        target_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[List[str]] = None,
+        filters: Optional[List[Predicate]] = None,
+        max_versions: Optional[int] = None,
+    ) -> pa.Table:
+        """
+        Stacks every snapshot of (data_type, target_id) taken between start and end into one table with a
+        'version' column (the snapshot filename), oldest first.
 
-        raise FileNotFoundError(f"Snapshot {filename} not found.")
+        All files (the target's own, ALL and BATCH snapshots filtered by primary_id, and _history partitions) are read
+        as a single pyarrow dataset scan: fragments are read in parallel, and the column selection and
+        predicates are pushed down into each parquet file.
+
+        Args:
+            start (datetime): Earliest snapshot time (inclusive), from the snapshot filename.
+            end (datetime): Latest snapshot time (inclusive).
+            columns (list): Columns to read (all if None).
+            filters (list): (column, op, value) predicates, see parse_predicate.
+            max_versions (int): Only the newest N snapshots within the range.
+        """
+        versions = []
+        for filename in reversed(self.index.list_snapshots(data_type, target_id)):  # Oldest first
+            ts = snapshot_timestamp(filename)
+            if ts is None:
+                if start is None and end is None:
+                    versions.append(filename)
+            elif (start is None or ts >= start) and (end is None or ts <= end):
+                versions.append(filename)
+        if max_versions:
+            versions = versions[-max_versions:]
+
+        paths, partitions = [], []
+        first_seen: Dict[str, int] = {}
+        compacted: Dict[str, Tuple[str, list]] = {}  # partition path -> (folder, snapshot timestamps)
+        for filename in versions:
+            try:
+                path, folder, version = self._find_snapshot(data_type, target_id, filename)
+            except FileNotFoundError:
+                continue  # Removed since it was listed
+            first_seen.setdefault(path, len(first_seen))
+            if version is None:
+                paths.append(path)
+                partitions.append((ds.field(VERSION_COLUMN) == filename) & (ds.field(_FOLDER_FIELD) == folder))
+            else:
+                compacted.setdefault(path, (folder, []))[1].append(snapshot_timestamp(filename))
+        if not paths and not compacted:
+            return pa.table({VERSION_COLUMN: pa.array([], pa.string())})
+
+        sources = sorted(paths + list(compacted), key=lambda p: first_seen[p])  # Stable column order
+        file_schema = pa.unify_schemas(
+            [pq.read_schema(p).remove_metadata() for p in sources], promote_options="permissive"
+        )
+        if columns:
+            missing = [c for c in columns if c not in file_schema.names]
+            if missing:
+                raise ValueError(f"Unknown columns: {missing}")
+        schema = file_schema
+        for name, type_ in (
+            (VERSION_COLUMN, pa.string()),
+            (_FOLDER_FIELD, pa.string()),
+            (SNAPSHOT_TS_COLUMN, pa.timestamp("s")),
+        ):
+            if name not in schema.names:
+                schema = schema.append(pa.field(name, type_))
+
+        # Loose files carry their version as a partition value, partitions rows through snapshot_ts
+        expression = ds.field(VERSION_COLUMN).is_valid()
+        for path, (folder, timestamps) in compacted.items():
+            paths.append(path)
+            partitions.append(ds.field(_FOLDER_FIELD) == folder)
+            expression |= (ds.field(_FOLDER_FIELD) == folder) & ds.field(SNAPSHOT_TS_COLUMN).isin(
+                pa.array(timestamps, pa.timestamp("s"))
+            )
+        if target_id not in SHARED_FOLDERS and "primary_id" in file_schema.names:
+            # Like load_table: shared snapshots without a primary_id column apply to every target
+            primary_id = ds.field("primary_id")
+            expression &= (ds.field(_FOLDER_FIELD) == target_id) | (primary_id == target_id) | primary_id.is_null()
+        if filters:
+            expression &= build_filter_expression(file_schema, tuple(filters))
+
+        dataset = ds.FileSystemDataset.from_paths(
+            paths, schema=schema, format=ds.ParquetFileFormat(), filesystem=LocalFileSystem(), partitions=partitions
+        )
+        selected = list(dict.fromkeys([*columns, VERSION_COLUMN, SNAPSHOT_TS_COLUMN])) if columns else None
+        table = dataset.to_table(columns=selected, filter=expression, use_threads=True)
+
+        from_ts = pc.binary_join_element_wise(
+            pc.strftime(table.column(SNAPSHOT_TS_COLUMN).cast(pa.timestamp("s")), format=SNAPSHOT_NAME_FORMAT),
+            ".parquet",
+            "",
+        )
+        version = pc.if_else(pc.is_valid(table.column(VERSION_COLUMN)), table.column(VERSION_COLUMN), from_ts)
+        data = table.drop_columns(
+            [c for c in (VERSION_COLUMN, _FOLDER_FIELD, SNAPSHOT_TS_COLUMN) if c in table.column_names]
+        )
+        if columns:
+            data = data.select([c for c in columns if c != VERSION_COLUMN])
+        result = data.add_column(0, VERSION_COLUMN, version)
+        return result.sort_by(VERSION_COLUMN)  # Stable: rows keep their order within a snapshot
+
+    def load_diff(self, data_type: str, target_id: str, from_version: str, to_version: str) -> pa.Table:
+        """
+        Rows that differ between two snapshots: a 'change' column ('added', 'removed' or 'changed')
+        followed by the row in to_version (in from_version for removed rows), sorted by key.
+
+        Rows are paired by DIFF_KEY_COLUMNS; the key columns used are listed in diff_keys(result).
+        For a single target primary_id isn't compared, so diffs across an ALL or BATCH run and a per-target
+        snapshot line up, but it is kept if to_version has it: the result has the same columns as
+        load_table(to_version), so applying it to the rows of from_version yields those of to_version.
+        Results are cached per pair of file versions.
+        """
+        from_path, _, _ = self._find_snapshot(data_type, target_id, from_version)
+        to_path, _, _ = self._find_snapshot(data_type, target_id, to_version)
+        st = os.stat(from_path)
+        variant = ("diff", target_id, from_version, to_version, os.path.normpath(from_path), st.st_mtime_ns, st.st_size)
+        return self.cache.get_or_load(
+            to_path, variant, lambda: self._compute_diff(data_type, target_id, from_version, to_version)
+        )
+
+    def _compute_diff(self, data_type: str, target_id: str, from_version: str, to_version: str) -> pa.Table:
+        old = self.load_table(data_type, target_id, from_version)
+        new = self.load_table(data_type, target_id, to_version)
+        primary_id = None  # (position, field) of the primary_id column in to_version, re-added after comparing
+        if target_id not in SHARED_FOLDERS:
+            if "primary_id" in new.column_names:
+                primary_id = (new.column_names.index("primary_id"), new.schema.field("primary_id"))
+            old, new = (t.drop_columns(["primary_id"]) if "primary_id" in t.column_names else t for t in (old, new))
+        schema = pa.unify_schemas(
+            [new.schema.remove_metadata(), old.schema.remove_metadata()], promote_options="permissive"
+        )
+        old, new = conform_table(old, schema), conform_table(new, schema)
+
+        keys = [c for c in DIFF_KEY_COLUMNS.get(data_type, []) if c in schema.names]
+        if keys and target_id in SHARED_FOLDERS and "primary_id" in schema.names:
+            keys = ["primary_id", *keys]
+        if not keys or not (self._is_unique(old, keys) and self._is_unique(new, keys)):
+            keys = schema.names  # No usable key: rows can only be added or removed
+        values = [c for c in schema.names if c not in keys]
+
+        # Null in the marker column of the other side means the row is missing there
+        joined = new.append_column("__new", pa.repeat(True, new.num_rows)).join(
+            old.append_column("__old", pa.repeat(True, old.num_rows)),
+            keys,
+            join_type="full outer",
+            right_suffix="__from",
+        )
+        added = joined.column("__old").is_null()
+        removed = joined.column("__new").is_null()
+        changed = pa.repeat(False, joined.num_rows)
+        for name in values:
+            a, b = joined.column(name), joined.column(f"{name}__from")
+            differs = pc.or_(pc.fill_null(pc.not_equal(a, b), False), pc.not_equal(a.is_null(), b.is_null()))
+            changed = pc.or_(changed, differs)
+        change = pc.if_else(
+            added, "added", pc.if_else(removed, "removed", pc.if_else(changed, "changed", pa.scalar(None, pa.string())))
+        )
+
+        columns = [change] + [
+            joined.column(name)
+            if name in keys
+            else pc.if_else(removed, joined.column(f"{name}__from"), joined.column(name))
+            for name in schema.names
+        ]
+        result = pa.Table.from_arrays(columns, names=[CHANGE_COLUMN, *schema.names])
+        result = result.filter(result.column(CHANGE_COLUMN).is_valid()).sort_by([(k, "ascending") for k in keys])
+        if primary_id is not None:
+            # Every row read for a single target has primary_id == target_id (see load_table)
+            position, field = primary_id
+            value = pa.scalar(target_id).cast(field.type)
+            result = result.add_column(position + 1, field, pa.repeat(value, result.num_rows))
+        return result.replace_schema_metadata({_DIFF_KEYS_METADATA: json.dumps(keys).encode()})
+
+    @staticmethod
+    def _is_unique(table: pa.Table, keys: List[str]) -> bool:
+        return table.select(keys).group_by(keys).aggregate([]).num_rows == table.num_rows
+
+    def resolve_version(self, data_type: str, target_id: str, version: str) -> Optional[str]:
+        """Maps 'latest' to the newest snapshot filename (None if there is none yet)."""
+        if version != "latest":
+            return version
+        return self.index.latest(data_type, target_id)
+
+    def find_fresh_snapshot(
+        self, data_type: str, target_id: str, params_hash: str, max_age: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Checks whether the latest snapshot was computed from the same params within max_age seconds,
+        using only the params hash and compute time in its parquet schema metadata (no data is read).
+
+        Returns:
+            dict: The snapshot's filename, age_seconds and metadata, or None if it is stale or different.
+        """
+        filename = self.index.latest(data_type, target_id)
+        if filename is None:
+            return None
+        try:
+            path, _, version = self._find_snapshot(data_type, target_id, filename)
+            if version is not None:
+                return None  # Compacted: per-run metadata isn't kept
+            metadata = read_snapshot_metadata(path)
+            age = (datetime.now() - datetime.fromisoformat(metadata["computed_at"])).total_seconds()
+        except (FileNotFoundError, KeyError, ValueError, pa.ArrowInvalid):
+            return None  # Gone, unreadable, or written before snapshots carried metadata
+        if metadata.get("params_hash") != params_hash or age > max_age:
+            return None
+        return {"filename": filename, "age_seconds": age, **metadata}
 
     def get_latest_data(self, data_type: str, target_id: str) -> List[Dict[str, Any]]:
         """Finds the newest parquet and returns it as a list of dicts for JSON."""
-        files = self.get_snapshots(data_type, target_id)
-        if not files:
+        # Assuming files are named with timestamps (e.g., 20251231_1000.parquet)
+        latest_file = self.index.latest(data_type, target_id)
+        if latest_file is None:
             return []
 
-        # Assuming files are named with timestamps (e.g., 20251231_1000.parquet)
-        latest_file = files[0]  # sorted by get_snapshots()
         df = self.load_parquet(data_type, target_id, latest_file)
 
         # Convert to JSON-serializable format
         return df.to_dict(orient="records")
 
     def get_snapshots(self, data_type: str, target_id: str) -> List[str]:
-        """Lists available versions for a specific data_type."""
-        if target_id == "ALL":
-            folder = os.path.join(self.local_root, "snapshots", data_type, target_id)
-            if not os.path.exists(folder):
-                return []
-            # Get a list in a descending order (new => old)
-            return sorted([f for f in os.listdir(folder) if f.endswith(".parquet")], reverse=True)
-
-        return self._get_merged_files(data_type, target_id)
+        """Lists available versions for a specific data_type in a descending order (new => old)."""
+        return self.index.list_snapshots(data_type, target_id)
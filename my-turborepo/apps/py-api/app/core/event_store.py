@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Optional
+
+import portalocker
+
+logger = logging.getLogger(__name__)
+
+
+class UserEventStore:
+    """
+    Append-only store of user events on the shared drive.
+
+    Every change is one JSON line appended to user_events.log: {"op": "upsert", "event": {...}} or
+    {"op": "delete", "event_id": ...}. Writers only hold the lock for the append, so saving an event
+    no longer parses and rewrites the whole history, and readers never need the lock: each process
+    keeps an event_id index and only parses the lines appended since its last read offset
+    (nothing at all while the file's mtime and size are unchanged).
+
+    Once superseded records outnumber live events, the log is compacted in the background into one
+    upsert per live event, under a new generation id in its header line, which tells every
+    reader to rebuild its index from the start.
+
+    An existing user_events.json (the previous whole-file format) is imported on first use.
+    """
+
+    def __init__(
+        self,
+        user_data_dir: str,
+        filename: str = "user_events.log",
+        legacy_filename: Optional[str] = "user_events.json",
+        compact_min_records: int = 1000,
+    ):
+        """
+        Args:
+            user_data_dir (str): Shared directory holding the log (e.g., 'Y:/Shared/user_data').
+            filename (str): Name of the log file.
+            legacy_filename (str): Whole-file JSON list imported when the log doesn't exist yet.
+            compact_min_records (int): Superseded records tolerated before compacting, regardless of ratio.
+        """
+        self.user_data_dir = user_data_dir
+        self.path = os.path.join(user_data_dir, filename)
+        # Separate lock file: compaction replaces the log, which would orphan a lock held on the log itself
+        self.lock_path = f"{self.path}.lock"
+        self.legacy_path = os.path.join(user_data_dir, legacy_filename) if legacy_filename else None
+        self.compact_min_records = compact_min_records
+
+        self._lock = threading.Lock()
+        self._events: dict[str, dict] = {}  # event_id -> event, in first-insertion order
+        self._generation: Optional[str] = None
+        self._offset = 0  # Bytes of the current generation already indexed
+        self._records = 0  # Records indexed in the current generation (live + superseded)
+        self._signature: Optional[tuple[int, int]] = None  # (mtime_ns, size) at the last read
+        self._list: Optional[list[dict]] = None  # Cached result of all()
+        self._compacting = threading.Lock()
+
+    def all(self) -> list[dict]:
+        """All live events, refreshed from the log if it changed since the last call."""
+        with self._lock:
+            self._refresh()
+            if self._list is None:
+                self._list = list(self._events.values())
+            return self._list
+
+    def get(self, event_id: str) -> Optional[dict]:
+        with self._lock:
+            self._refresh()
+            return self._events.get(event_id)
+
+    def upsert(self, event: dict):
+        """Adds the event, or replaces the event with the same event_id."""
+        self._append({"op": "upsert", "event": event})
+
+    def delete(self, event_id: str) -> bool:
+        """
+        Returns:
+            bool: False if there was no event with this id.
+        """
+        if self.get(event_id) is None:
+            return False
+        self._append({"op": "delete", "event_id": event_id})
+        return True
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "events": len(self._events),
+                "records": self._records,
+                "bytes": self._offset,
+                "generation": self._generation,
+            }
+
+    def _append(self, record: dict):
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self._ensure_log()
+        with portalocker.Lock(self.lock_path, mode="a", timeout=10, check_interval=0.01):
+            with open(self.path, "ab") as f:
+                f.write(line)
+        with self._lock:
+            if self._generation is None:
+                return  # Nothing indexed yet: a writer-only process doesn't pay for reading the whole log
+            self._refresh()
+            due = self._records - len(self._events) > max(self.compact_min_records, len(self._events))
+        if due and self._compacting.acquire(blocking=False):
+            threading.Thread(target=self._compact_in_background, daemon=True, name="user-events-compaction").start()
+
+    def _ensure_log(self):
+        """Creates the log (importing the legacy JSON list) if it doesn't exist yet."""
+        if os.path.exists(self.path):
+            return
+        os.makedirs(self.user_data_dir, exist_ok=True)
+        with portalocker.Lock(self.lock_path, mode="a", timeout=10):
+            if os.path.exists(self.path):
+                return  # Another PC created it while we waited
+            events = []
+            if self.legacy_path and os.path.exists(self.legacy_path):
+                with open(self.legacy_path, "r", encoding="utf-8") as f:
+                    content = f.read()
+                events = json.loads(content) if content else []
+                logger.info(f"UserEventStore: Imported {len(events)} events from {self.legacy_path}")
+            self._write_generation(events)
+
+    def _write_generation(self, events: list[dict]):
+        """Atomically replaces the log with a new generation holding one upsert per event (lock held)."""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "header", "generation": uuid.uuid4().hex}) + "\n")
+            for event in events:
+                f.write(json.dumps({"op": "upsert", "event": event}, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.path)
+
+    def _refresh(self):
+        """Indexes records appended since the last read (self._lock held)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self.legacy_path and os.path.exists(self.legacy_path):
+                self._ensure_log()
+                st = os.stat(self.path)
+            else:
+                return
+        signature = (st.st_mtime_ns, st.st_size)
+        if signature == self._signature:
+            return
+
+        with open(self.path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("generation") != self._generation or st.st_size < self._offset:
+                # Compacted by someone (or a first read): rebuild from the start
+                self._events.clear()
+                self._generation = header.get("generation")
+                self._offset = f.tell()
+                self._records = 0
+                self._list = None
+            f.seek(self._offset)
+            data = f.read()
+
+        end = data.rfind(b"\n") + 1  # A line still being appended is picked up next time
+        changed = False
+        for record in self._parse(data[:end]):
+            if record.get("op") == "upsert":
+                self._events[record["event"]["event_id"]] = record["event"]
+            elif record.get("op") == "delete":
+                self._events.pop(record["event_id"], None)
+            self._records += 1
+            changed = True
+        self._offset += end
+        # Only trust the signature once every byte is indexed, so a partial line is read again
+        self._signature = signature if end == len(data) else None
+        if changed:
+            self._list = None
+
+    def _parse(self, data: bytes) -> list[dict]:
+        """Parses complete JSON lines, in one json.loads call unless a line is damaged."""
+        lines = [line for line in data.splitlines() if line.strip()]
+        try:
+            return json.loads(b"[" + b",".join(lines) + b"]")
+        except ValueError:
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"UserEventStore: Skipping unreadable record in {self.path}")
+            return records
+
+    def compact(self):
+        """Rewrites the log as one upsert per live event, dropping superseded and deleted records."""
+        with portalocker.Lock(self.lock_path, mode="a", timeout=30):
+            with self._lock:
+                self._refresh()
+                events = list(self._events.values())
+                before = self._records
+            self._write_generation(events)
+        logger.info(f"UserEventStore: Compacted {before} records into {len(events)} events")
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"UserEventStore: Compaction failed: {e}")
+        finally:
+            self._compacting.release()
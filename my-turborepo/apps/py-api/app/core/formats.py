@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+SIDECAR_SUFFIX = ".arrow"
+_SIDECAR_SOURCE_KEY = b"ok_dashboard.source"  # (size, mtime) of the parquet the sidecar was built from
+SNAPSHOT_METADATA_PREFIX = "ok_dashboard."  # Namespace of our keys in parquet schema metadata
+
+
+def table_to_arrow_ipc(table: pa.Table) -> memoryview:
+    """
+    Serializes an Arrow table into the Arrow IPC stream format.
+    The returned view wraps the Arrow buffer directly, so no extra copy is made for the response.
+    """
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return memoryview(sink.getvalue())
+
+
+def frame_to_columns_json(df: pd.DataFrame, meta: Optional[dict] = None) -> str:
+    """
+    Serializes a DataFrame as column-oriented JSON: {"columns": [...], "num_rows": n, **meta, "data": {col: [values]}}.
+    Each column is encoded by pandas' C JSON encoder (floats by Arrow, see _float_literals), avoiding one Python
+    dict per row.
+    """
+    parts = [f"{json.dumps(str(col), ensure_ascii=False)}:{_column_values_json(df[col])}" for col in df.columns]
+    header = json.dumps(
+        {"columns": [str(c) for c in df.columns], "num_rows": len(df), **(meta or {})}, ensure_ascii=False
+    )
+    return f'{header[:-1]},"data":{{{",".join(parts)}}}}}'
+
+
+def frame_to_records_json(df: pd.DataFrame, meta: Optional[dict] = None, chunk_rows: int = 10000) -> str:
+    """
+    Serializes a DataFrame as row-oriented JSON: {**meta, "data": [{col: value, ...}, ...]}, missing values as null.
+    Encoded by pandas' C JSON encoder in chunks of chunk_rows: the encoder holds the GIL, so chunking
+    lets the event loop run between chunks while a large snapshot is encoded on a worker thread.
+
+    pandas writes floats with at most 15 digits, so float columns are first replaced by their exact
+    literals (see _float_literals), which come out as JSON strings and are unquoted afterwards.
+    """
+    floats = [col for col in df.columns if pd.api.types.is_float_dtype(df[col])]
+    if floats:
+        df = df.copy(deep=False)
+        for col in floats:
+            df[col] = _float_literals(df[col]).to_pandas()
+    # Keys exactly as pandas writes them (it escapes '/', unlike json.dumps)
+    keys = [pd.Series([str(col)]).to_json(orient="values", force_ascii=False)[1:-1] for col in floats]
+
+    chunks = []
+    for start in range(0, len(df), chunk_rows):
+        text = df.iloc[start : start + chunk_rows].to_json(orient="records", date_format="iso", force_ascii=False)
+        for key in keys:
+            text = _unquote_values(text, key)
+        chunks.append(text[1:-1])
+    header = json.dumps(meta or {}, ensure_ascii=False)
+    separator = "," if meta else ""
+    return f'{header[:-1]}{separator}"data":[{",".join(chunks)}]}}'
+
+
+def _float_literals(values: pd.Series) -> pa.Array:
+    """
+    Shortest decimal strings that parse back to exactly the same floats (like Python's repr),
+    null for NaN and infinities, which JSON can't represent.
+    """
+    array = pa.array(values, from_pandas=True)
+    return pc.if_else(pc.is_finite(array), pc.cast(array, pa.string()), pa.scalar(None, pa.string()))
+
+
+def _column_values_json(values: pd.Series) -> str:
+    """A column as a JSON array."""
+    if not pd.api.types.is_float_dtype(values):
+        return values.to_json(orient="values", date_format="iso")
+    literals = pc.fill_null(_float_literals(values), "null")
+    joined = pc.binary_join(pa.ListArray.from_arrays(pa.array([0, len(literals)], pa.int32()), literals), ",")
+    return f"[{joined[0].as_py()}]"
+
+
+def _unquote_values(text: str, key: str) -> str:
+    """
+    Turns the string values of key back into numbers in records JSON: '"key":"1.5"' becomes '"key":1.5'.
+    Only a real key can be preceded by '{' or ',' and followed by ':"' unescaped, since every quote
+    inside an encoded string is escaped; the float literal itself never contains a quote.
+    """
+    for opener in (f'{{{key}:"', f',{key}:"'):
+        head, *values = text.split(opener)
+        if values:
+            text = opener[:-1].join([head, *(value.replace('"', "", 1) for value in values)])
+    return text
+
+
+def sidecar_path(parquet_path: str) -> str:
+    """Path of the uncompressed Arrow IPC file kept next to a local parquet snapshot."""
+    return os.path.splitext(parquet_path)[0] + SIDECAR_SUFFIX
+
+
+def _source_signature(parquet_path: str) -> bytes:
+    st = os.stat(parquet_path)
+    return f"{st.st_size}:{st.st_mtime_ns}".encode()
+
+
+def write_arrow_sidecar(parquet_path: str) -> str:
+    """
+    Writes an uncompressed Arrow IPC (Feather v2) copy of a parquet file, atomically via a temp file.
+    Memory-mapping it later gives zero-copy tables backed by the OS page cache.
+    """
+    table = pq.read_table(parquet_path)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SIDECAR_SOURCE_KEY] = _source_signature(parquet_path)
+    table = table.replace_schema_metadata(metadata)
+
+    target = sidecar_path(parquet_path)
+    tmp = f"{target}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, target)
+    return target
+
+
+def open_arrow_sidecar(parquet_path: str) -> Optional[pa.Table]:
+    """
+    Memory-maps the sidecar of a parquet file and returns a zero-copy table,
+    or None if there is no sidecar or it was built from a different version of the parquet.
+    """
+    path = sidecar_path(parquet_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        if (reader.schema.metadata or {}).get(_SIDECAR_SOURCE_KEY) != _source_signature(parquet_path):
+            return None
+        return reader.read_all()
+    except (OSError, pa.ArrowInvalid) as e:
+        logger.warning(f"Ignoring unreadable Arrow sidecar {path}: {e}")
+        return None
+
+
+def params_hash(params: dict) -> str:
+    """Stable hash of task params (target_id, task_type, extra_params, ...) identifying a computation."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def with_snapshot_metadata(table: pa.Table, **values) -> pa.Table:
+    """Adds ok_dashboard.* entries to a table's schema metadata, preserving existing entries (e.g. pandas)."""
+    metadata = dict(table.schema.metadata or {})
+    for key, value in values.items():
+        metadata[f"{SNAPSHOT_METADATA_PREFIX}{key}".encode()] = str(value).encode()
+    return table.replace_schema_metadata(metadata)
+
+
+def read_snapshot_metadata(parquet_path: str) -> dict[str, str]:
+    """Reads the ok_dashboard.* schema metadata of a parquet file from its footer, without loading any data."""
+    metadata = pq.read_schema(parquet_path).metadata or {}
+    prefix = SNAPSHOT_METADATA_PREFIX.encode()
+    return {k[len(prefix) :].decode(): v.decode() for k, v in metadata.items() if k.startswith(prefix)}
+
+
+def conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Aligns a table to schema: columns are cast and reordered, columns it lacks (older runs) are filled with nulls."""
+    columns = [
+        table.column(f.name).cast(f.type) if f.name in table.column_names else pa.nulls(table.num_rows, f.type)
+        for f in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
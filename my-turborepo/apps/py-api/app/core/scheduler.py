@@ -0,0 +1,134 @@
+import itertools
+import time
+from collections import Counter
+from typing import Optional
+
+# Priority classes, most urgent first
+PRIORITIES = ("interactive", "background", "batch")
+
+
+class TaskScheduler:
+    """
+    Pending tasks of the worker pool.
+
+    Tasks are ordered by:
+    1. Deadline: tasks due within deadline_horizon seconds go first, earliest deadline first.
+    2. Priority class (interactive > background > batch). A task is promoted by one class for every
+       aging_seconds it has waited, so low-priority work still progresses under constant load.
+    3. Fairness across target_ids: the target served least recently goes first, so one fund with
+       a long backlog doesn't starve the others.
+    4. Arrival order.
+
+    A concurrency limit per task_type is enforced, a task_id is queued at most once and never runs
+    twice concurrently. Not thread-safe; WorkerPool serializes access.
+    """
+
+    def __init__(
+        self,
+        type_limits: Optional[dict[str, int]] = None,
+        aging_seconds: float = 120.0,
+        deadline_horizon: float = 60.0,
+    ):
+        """
+        Args:
+            type_limits (dict): Maximum number of concurrently running tasks per task_type.
+                Task types not listed are only bounded by the pool size.
+            aging_seconds (float): Waiting time after which a task is promoted by one priority class.
+            deadline_horizon (float): Tasks whose deadline is closer than this are scheduled first.
+        """
+        self.type_limits = type_limits or {}
+        self.aging_seconds = aging_seconds
+        self.deadline_horizon = deadline_horizon
+        self._pending: dict[str, dict] = {}  # task_id -> queued task_info, in arrival order
+        self._running: Counter = Counter()  # task_type -> running count
+        self._running_ids: set[str] = set()
+        self._arrivals = itertools.count()
+        self._turns = itertools.count(1)
+        self._last_served: dict[str, int] = {}  # target_id -> turn it was last served
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._pending
+
+    def push(self, task_info: dict) -> bool:
+        """
+        Queues a task ({"task_id", "params"}, optionally "priority" and "deadline" as epoch seconds).
+        If the same task_id is already waiting, the queued entry takes the new params (latest
+        request wins), the higher priority and the earlier deadline, and keeps its place.
+
+        Returns:
+            bool: True if queued, False if coalesced into the waiting task.
+        """
+        queued = self._pending.get(task_info["task_id"])
+        if queued is not None:
+            queued["params"] = task_info["params"]
+            queued["priority"] = min(queued["priority"], task_info.get("priority", "interactive"), key=PRIORITIES.index)
+            deadlines = [d for d in (queued.get("deadline"), task_info.get("deadline")) if d is not None]
+            queued["deadline"] = min(deadlines, default=None)
+            return False
+        task_info.setdefault("priority", "interactive")
+        task_info.setdefault("deadline", None)
+        task_info.setdefault("enqueued_at", time.time())  # Kept on requeue, so the task keeps its aging
+        task_info["arrival"] = next(self._arrivals)
+        self._pending[task_info["task_id"]] = task_info
+        return True
+
+    def pop(self) -> Optional[dict]:
+        """Returns the next runnable task (respecting type limits) and counts it as running."""
+        now = time.time()
+        runnable = [t for t in self._pending.values() if self.can_run(t)]
+        if not runnable:
+            return None
+        task_info = min(runnable, key=lambda t: self._order_key(t, now))
+        del self._pending[task_info["task_id"]]
+        task_type = task_info["params"].get("task_type")
+        self._running[task_type] += 1
+        self._running_ids.add(task_info["task_id"])
+        self._last_served[task_info["params"].get("target_id", "ALL")] = next(self._turns)
+        return task_info
+
+    def remove(self, task_id: str) -> Optional[dict]:
+        """Drops a waiting task (e.g. cancelled before it started). Returns it, or None if not queued."""
+        return self._pending.pop(task_id, None)
+
+    def done(self, task_info: dict):
+        """Releases the concurrency slot taken by pop()."""
+        task_type = task_info["params"].get("task_type")
+        if self._running[task_type] > 0:
+            self._running[task_type] -= 1
+        self._running_ids.discard(task_info["task_id"])
+
+    def pending(self) -> list[dict]:
+        """Waiting tasks in the order they would be dispatched if no concurrency limit applied."""
+        now = time.time()
+        return sorted(self._pending.values(), key=lambda t: self._order_key(t, now))
+
+    def effective_priority(self, task_info: dict, now: Optional[float] = None) -> str:
+        """Priority class after aging."""
+        waited = (now or time.time()) - task_info["enqueued_at"]
+        promoted = int(waited // self.aging_seconds) if self.aging_seconds > 0 else 0
+        return PRIORITIES[max(0, PRIORITIES.index(task_info["priority"]) - promoted)]
+
+    def running_counts(self) -> dict[str, int]:
+        return {k: v for k, v in self._running.items() if v}
+
+    def can_run(self, task_info: dict) -> bool:
+        """Whether the task may start now under the type limits (and no instance of it is running)."""
+        task_type = task_info["params"].get("task_type")
+        if self._running[task_type] >= self.type_limits.get(task_type, float("inf")):
+            return False
+        # Wait for the running instance of the same task to finish
+        return task_info["task_id"] not in self._running_ids
+
+    def _order_key(self, task_info: dict, now: float) -> tuple:
+        deadline = task_info.get("deadline")
+        if deadline is not None and deadline - now <= self.deadline_horizon:
+            return (0, deadline, 0, task_info["arrival"])
+        return (
+            1,
+            PRIORITIES.index(self.effective_priority(task_info, now)),
+            self._last_served.get(task_info["params"].get("target_id", "ALL"), 0),
+            task_info["arrival"],
+        )
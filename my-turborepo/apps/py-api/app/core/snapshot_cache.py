@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate in-memory size of a cached DataFrame or Arrow table in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pa.Table):
+        return value.nbytes
+    return 0
+
+
+class SnapshotCache:
+    """
+    LRU cache of parsed snapshots bounded by total memory instead of entry count.
+
+    Entries are keyed by (path, mtime, size, variant), so a file re-synced with new content
+    under the same name is never served stale. The syncer also invalidates a path eagerly
+    when it overwrites the file, releasing the memory of the old version right away.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024**2):
+        """
+        Args:
+            max_bytes (int): Memory budget for all cached entries.
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[Any, int]] = OrderedDict()  # key -> (value, size)
+        self._keys_by_path: dict[str, set[tuple]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, path: str, variant: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for the current version of path, loading it on a miss.
+
+        Args:
+            path (str): File the value is derived from.
+            variant (Hashable): Distinguishes different reads of the same file (e.g. projections).
+            loader (Callable): Reads the file when it is not cached.
+        """
+        path = os.path.normpath(path)
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size, variant)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Load outside the lock so slow reads don't block cache hits of other requests
+        value = loader()
+        size = estimate_size(value)
+
+        with self._lock:
+            # Older versions of the file can never be hit again
+            for stale in [k for k in self._keys_by_path.get(path, ()) if k[1:3] != key[1:3]]:
+                self._remove(stale)
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (value, size)
+                self._keys_by_path.setdefault(path, set()).add(key)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, path: str):
+        """Drops every cached variant of path (e.g. after the syncer overwrote it)."""
+        path = os.path.normpath(path)
+        with self._lock:
+            keys = list(self._keys_by_path.get(path, ()))
+            for key in keys:
+                self._remove(key)
+            if keys:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_path.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: tuple):
+        _, size = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._keys_by_path.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_path[key[0]]
@@ -0,0 +1,278 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from app.core.compaction import HISTORY_DIR, SNAPSHOT_TS_COLUMN, partition_versions, snapshot_filename
+
+logger = logging.getLogger(__name__)
+
+# Folders holding several targets' rows keyed by primary_id: ALL (full-universe runs) and BATCH (subsets)
+SHARED_FOLDERS = ("ALL", "BATCH")
+
+
+class _Folder:
+    """Sorted snapshot filenames of one snapshots/{data_type}/{folder_id} directory."""
+
+    __slots__ = ("names", "compacted", "partitions", "targets", "mtime_ns", "checked_at", "version")
+
+    def __init__(self):
+        self.names: list[str] = []  # Ascending, so the latest snapshot is names[-1]
+        self.compacted: dict[str, str] = {}  # Filename -> partition under _history/ holding it
+        self.partitions: dict[str, tuple[int, list[str]]] = {}  # Partition -> (mtime_ns, filenames)
+        self.targets: dict[str, frozenset[str]] = {}  # BATCH only: filename -> primary_ids it covers
+        self.mtime_ns: Optional[tuple] = None  # (folder, _history) mtimes
+        self.checked_at = 0.0
+        self.version = 0
+
+
+class SnapshotIndex:
+    """
+    Maintained index of snapshot filenames per (data_type, target_id).
+
+    Folders are scanned once, then kept up to date incrementally when the syncer adds files.
+    As a safety net the folder mtime is re-checked at most every revalidate_interval seconds
+    and the folder rescanned only if it changed behind the index's back.
+
+    Snapshots folded into _history/ partitions by SnapshotCompactor are listed under their
+    original filename; locate() tells in which partition file they are stored.
+
+    A target's snapshots include its own folder, ALL (full-universe runs) and the BATCH snapshots
+    (runs over a subset of targets) whose primary_id column contains it. Which targets a batch covers
+    is read once per snapshot, from that column only.
+    """
+
+    def __init__(self, local_root: str, revalidate_interval: float = 5.0):
+        self.local_root = local_root
+        self.revalidate_interval = revalidate_interval
+        self._folders: dict[tuple[str, str], _Folder] = {}
+        self._merged: dict[tuple[str, str], tuple[tuple[int, int], list[str]]] = {}  # Cached target + ALL lists
+        self._lock = threading.Lock()
+
+    def list_snapshots(self, data_type: str, target_id: str) -> list[str]:
+        """
+        Snapshot filenames for target_id merged with ALL and the batches covering it
+        (unless target_id is ALL or BATCH itself), newest first.
+        """
+        with self._lock:
+            own = self._folder(data_type, target_id)
+            if target_id in SHARED_FOLDERS:
+                return own.names[::-1]
+
+            shared = self._folder(data_type, "ALL")
+            batches = self._folder(data_type, "BATCH")
+            key = (data_type, target_id)
+            versions = (own.version, shared.version, batches.version)
+            cached = self._merged.get(key)
+            if cached is None or cached[0] != versions:
+                covering = [
+                    name for name in batches.names if target_id in self._batch_targets(data_type, batches, name)
+                ]
+                merged = sorted(set(own.names).union(shared.names, covering), reverse=True)
+                cached = (versions, merged)
+                self._merged[key] = cached
+            return list(cached[1])
+
+    def latest(self, data_type: str, target_id: str) -> Optional[str]:
+        """Newest snapshot filename for target_id (including ALL and covering batches), without listing them all."""
+        with self._lock:
+            candidates = [self._folder(data_type, target_id).names]
+            if target_id not in SHARED_FOLDERS:
+                candidates.append(self._folder(data_type, "ALL").names)
+            newest = max((names[-1] for names in candidates if names), default=None)
+            if target_id in SHARED_FOLDERS:
+                return newest
+
+            batches = self._folder(data_type, "BATCH")
+            for name in reversed(batches.names):
+                if newest is not None and name <= newest:
+                    break
+                if target_id in self._batch_targets(data_type, batches, name):
+                    return name
+            return newest
+
+    def covers(self, data_type: str, folder_id: str, filename: str, target_id: str) -> bool:
+        """Whether a snapshot in folder_id holds rows of target_id (always True outside BATCH)."""
+        if folder_id != "BATCH" or target_id == "BATCH":
+            return True
+        with self._lock:
+            return target_id in self._batch_targets(data_type, self._folder(data_type, folder_id), filename)
+
+    def locate(self, data_type: str, folder_id: str, filename: str) -> Optional[str]:
+        """
+        Path of the _history partition holding a compacted snapshot, None if it isn't compacted in this folder.
+        The snapshot's loose file, while it still exists, holds the same rows and is cheaper to read.
+        """
+        with self._lock:
+            partition = self._folder(data_type, folder_id).compacted.get(filename)
+        if partition is None:
+            return None
+        return os.path.join(self.local_root, "snapshots", data_type, folder_id, HISTORY_DIR, partition)
+
+    def add(self, path: str):
+        """Registers a snapshot file written under snapshots/{data_type}/{folder_id}/ (no-op otherwise)."""
+        if self._rescan_history(path):
+            return
+        key = self._key_for(path)
+        if key is None:
+            return
+        name = os.path.basename(path)
+        with self._lock:
+            folder = self._folders.get(key)
+            if folder is None:
+                return  # Not loaded yet: the first access scans the folder anyway
+            i = bisect.bisect_left(folder.names, name)
+            if i == len(folder.names) or folder.names[i] != name:
+                folder.names.insert(i, name)
+                folder.version += 1
+            self._record_mtime(key, folder)
+
+    def discard(self, path: str):
+        """Removes a snapshot file from the index (e.g. after compaction or retention deleted it)."""
+        if self._rescan_history(path):
+            return
+        key = self._key_for(path)
+        if key is None:
+            return
+        name = os.path.basename(path)
+        with self._lock:
+            folder = self._folders.get(key)
+            if folder is None:
+                return
+            if name in folder.compacted:
+                return  # Still available from its partition
+            i = bisect.bisect_left(folder.names, name)
+            if i < len(folder.names) and folder.names[i] == name:
+                del folder.names[i]
+                folder.version += 1
+            self._record_mtime(key, folder)
+
+    def _folder(self, data_type: str, folder_id: str) -> _Folder:
+        key = (data_type, folder_id)
+        folder = self._folders.get(key)
+        if folder is None:
+            folder = _Folder()
+            self._folders[key] = folder
+            self._scan(key, folder)
+        elif time.monotonic() - folder.checked_at > self.revalidate_interval:
+            mtime = self._dir_mtime(key)
+            folder.checked_at = time.monotonic()
+            if mtime != folder.mtime_ns:
+                self._scan(key, folder)
+        return folder
+
+    def _scan(self, key: tuple[str, str], folder: _Folder):
+        path = os.path.join(self.local_root, "snapshots", *key)
+        folder.mtime_ns = self._dir_mtime(key)
+        folder.checked_at = time.monotonic()
+        try:
+            loose = {f for f in os.listdir(path) if f.endswith(".parquet")}
+        except FileNotFoundError:
+            loose = set()
+        self._scan_history(key, folder)
+        # Also recorded while the loose file still exists (readers prefer the file until the compactor
+        # deletes it), so discarding the file later keeps the snapshot listed without a rescan
+        folder.compacted = {
+            name: partition for partition, (_, versions) in folder.partitions.items() for name in versions
+        }
+        names = sorted(loose.union(folder.compacted))
+        if names != folder.names:
+            folder.names = names
+            folder.version += 1
+        folder.targets = {
+            name: targets for name, targets in folder.targets.items() if name in folder.compacted or name in loose
+        }
+
+    def _scan_history(self, key: tuple[str, str], folder: _Folder):
+        """Refreshes the versions of _history partitions whose mtime changed (reads their snapshot_ts column only)."""
+        history = os.path.join(self.local_root, "snapshots", *key, HISTORY_DIR)
+        partitions = {}
+        try:
+            entries = [e for e in os.scandir(history) if e.name.endswith(".parquet")]
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            mtime_ns = entry.stat().st_mtime_ns
+            known = folder.partitions.get(entry.name)
+            if known is not None and known[0] == mtime_ns:
+                partitions[entry.name] = known
+                continue
+            try:
+                partitions[entry.name] = (mtime_ns, partition_versions(entry.path))
+            except Exception as e:
+                # E.g. still being copied: keep what we knew and retry on the next scan
+                logger.warning(f"SnapshotIndex: Could not read partition {entry.path}: {e}")
+                if known is not None:
+                    partitions[entry.name] = known
+        folder.partitions = partitions
+
+    def _batch_targets(self, data_type: str, folder: _Folder, filename: str) -> frozenset[str]:
+        """primary_ids in a BATCH snapshot (self._lock held), read once: snapshots don't change after being written."""
+        targets = folder.targets.get(filename)
+        if targets is not None:
+            return targets
+        base = os.path.join(self.local_root, "snapshots", data_type, "BATCH")
+        partition = folder.compacted.get(filename)
+        try:
+            if partition is None:
+                column = pq.read_table(os.path.join(base, filename), columns=["primary_id"]).column("primary_id")
+                folder.targets[filename] = frozenset(pc.unique(column).to_pylist())
+            else:
+                # One read fills in every snapshot of the partition
+                table = pq.read_table(
+                    os.path.join(base, HISTORY_DIR, partition), columns=[SNAPSHOT_TS_COLUMN, "primary_id"]
+                )
+                pairs = table.group_by([SNAPSHOT_TS_COLUMN, "primary_id"]).aggregate([])
+                found: dict[str, set[str]] = {}
+                for ts, primary_id in zip(
+                    pairs.column(SNAPSHOT_TS_COLUMN).to_pylist(), pairs.column("primary_id").to_pylist()
+                ):
+                    found.setdefault(snapshot_filename(ts), set()).add(primary_id)
+                for name, ids in found.items():
+                    folder.targets[name] = frozenset(ids)
+        except Exception as e:
+            # E.g. removed by the compactor or still being copied: treated as covering nothing until the next call
+            logger.warning(f"SnapshotIndex: Could not read the targets of batch {filename}: {e}")
+            return frozenset()
+        return folder.targets.setdefault(filename, frozenset())
+
+    def _rescan_history(self, path: str) -> bool:
+        """Rescans the folder of a _history partition that was written or removed. False if path isn't one."""
+        rel = os.path.relpath(path, os.path.join(self.local_root, "snapshots"))
+        parts = rel.split(os.sep)
+        if len(parts) != 4 or parts[2] != HISTORY_DIR or not parts[3].endswith(".parquet"):
+            return False
+        with self._lock:
+            folder = self._folders.get((parts[0], parts[1]))
+            if folder is not None:
+                self._scan((parts[0], parts[1]), folder)
+        return True
+
+    def _record_mtime(self, key: tuple[str, str], folder: _Folder):
+        # The change was applied incrementally: accept the folder's new mtime without rescanning
+        folder.mtime_ns = self._dir_mtime(key)
+        folder.checked_at = time.monotonic()
+
+    def _dir_mtime(self, key: tuple[str, str]) -> tuple[Optional[int], Optional[int]]:
+        path = os.path.join(self.local_root, "snapshots", *key)
+        mtimes = []
+        for p in (path, os.path.join(path, HISTORY_DIR)):
+            try:
+                mtimes.append(os.stat(p).st_mtime_ns)
+            except FileNotFoundError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _key_for(self, path: str) -> Optional[tuple[str, str]]:
+        if not path.endswith(".parquet"):
+            return None
+        rel = os.path.relpath(path, os.path.join(self.local_root, "snapshots"))
+        parts = rel.split(os.sep)
+        if len(parts) != 3 or parts[0] == "..":
+            return None
+        return parts[0], parts[1]
@@ -1,8 +1,10 @@
 import json
 import logging
 import os
+import threading
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Optional
 
 import portalocker
 
@@ -21,18 +23,43 @@ class StatusManager:
     without leaving stale lock files on the shared drive.
     """
 
-    def __init__(self, shared_dir: str):
+    def __init__(self, shared_dir: str, on_write: Optional[Callable[[str], None]] = None):
         """
         Args:
             shared_dir (str): Root path of the shared data directory (e.g., 'Y:/Shared')
+            on_write (Callable): Called with the path of every status file written,
+                e.g. to request an immediate sync of the local mirror.
         """
+        self.on_write = on_write
         self.status_dir = os.path.join(shared_dir, "status")
         os.makedirs(self.status_dir, exist_ok=True)
 
+        # In-memory index of the status directory, refreshed incrementally by mtime
+        self.refresh_interval = 0.5  # Concurrent pollers within this window share one directory scan
+        self.version = 0  # Incremented whenever any indexed status changes
+        self._lock = threading.Lock()  # Guards the index; never held during file I/O
+        self._refresh_lock = threading.Lock()  # One directory scan at a time, see refresh
+        self._last_refresh = 0.0
+        self._statuses: dict[str, dict] = {}  # task_id -> status
+        self._signatures: dict[str, tuple[int, int]] = {}  # task_id -> (mtime_ns, size) of the indexed file
+        self._by_task: dict[tuple[str, str], set[str]] = {}  # (target_id, task_type) -> task_ids
+        self._sorted: Optional[list[dict]] = None  # Cached result of get_all_statuses
+        self._changed_at: dict[str, int] = {}  # task_id -> version of its last change (change feed)
+        self._removed: set[str] = set()  # task_ids whose removal is still in the change feed
+
     def _get_path(self, task_id: str) -> str:
         return os.path.join(self.status_dir, f"{task_id}.json")
 
-    def update(self, task_id: str, status: str, user: str, params: dict, progress: float = 0, message: str = ""):
+    def update(
+        self,
+        task_id: str,
+        status: str,
+        user: str,
+        params: dict,
+        progress: float = 0,
+        message: str = "",
+        timings: Optional[dict[str, float]] = None,
+    ):
         """
         Updates the task progress and writes it to the shared JSON file.
         The lock is automatically released by the OS even if the process crashes.
@@ -47,6 +74,7 @@ class StatusManager:
             params (dict): Extra parameters for the task
             progress (float): Completion percentage (0.0 to 100.0).
             message (str): Human-readable message for UI display.
+            timings (dict): Seconds spent per phase (queue_wait, compute, write), in final statuses.
         """
         path = self._get_path(task_id)
         data = {
@@ -58,6 +86,8 @@ class StatusManager:
             "last_heartbeat": datetime.now().isoformat(),
             "params": params,
         }
+        if timings is not None:
+            data["timings"] = {phase: round(seconds, 3) for phase, seconds in timings.items()}
 
         try:
             # Open with 'r+' or 'a+' and use portalocker to prevent concurrent access
@@ -68,6 +98,10 @@ class StatusManager:
                 json.dump(data, f, indent=2, ensure_ascii=False)
         except Exception as e:
             logger.error(f"Error updating status for {task_id}: {e}")
+            return
+
+        if self.on_write:
+            self.on_write(path)
 
     def get_status(self, task_id: str) -> Optional[dict]:
         """
@@ -87,19 +121,160 @@ class StatusManager:
 
     def get_all_statuses(self) -> list[dict]:
         """
-        Scans the status directory and returns all task statuses
+        Returns all task statuses from the in-memory index
         sorted by last_heartbeat (newest first).
         """
-        statuses = []
-        if not os.path.exists(self.status_dir):
-            return []
+        self.refresh()
+        with self._lock:
+            if self._sorted is None:
+                # Sort by last_heartbeat (descending, new => old)
+                self._sorted = sorted(self._statuses.values(), key=lambda x: x.get("last_heartbeat", ""), reverse=True)
+            return list(self._sorted)
+
+    def get_task_status(self, target_id: str, task_type: str) -> Optional[dict]:
+        """
+        Returns the most relevant status for a (target_id, task_type) pair across all users:
+        running tasks first, then the most recent heartbeat.
+        """
+        self.refresh()
+        with self._lock:
+            task_ids = self._by_task.get((target_id, task_type))
+            if not task_ids:
+                return None
+            return max(
+                (self._statuses[t] for t in task_ids),
+                key=lambda x: (x["status"] == "running", x.get("last_heartbeat", "")),
+            )
+
+    def find_reusable(self, params: dict, max_age: float, stale_after: float = 900.0) -> Optional[dict]:
+        """
+        Looks for a status (of any user) whose result can be reused instead of computing again:
+        a task with identical params that is running with a live heartbeat, or finished
+        successfully within max_age seconds. Running tasks are preferred.
 
-        for filename in os.listdir(self.status_dir):
-            if filename.endswith(".json"):
-                task_id = filename[:-5]  # Remove .json
+        Args:
+            params (dict): TaskParams of the requested task.
+            max_age (float): Maximum age in seconds of a 'done' status.
+            stale_after (float): Seconds without heartbeat after which a 'running' status is considered dead.
+        """
+        self.refresh()
+        now = datetime.now()
+        with self._lock:
+            task_ids = self._by_task.get((params.get("target_id"), params.get("task_type")), ())
+            candidates = []
+            for task_id in task_ids:
+                status = self._statuses[task_id]
+                if status.get("params") != params:
+                    continue
+                try:
+                    age = (now - datetime.fromisoformat(status["last_heartbeat"])).total_seconds()
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if (status["status"] == "running" and age <= stale_after) or (
+                    status["status"] == "done" and age <= max_age
+                ):
+                    candidates.append(status)
+            return max(candidates, key=lambda x: (x["status"] == "running", x.get("last_heartbeat", "")), default=None)
+
+    def refresh(self, force: bool = False) -> set[str]:
+        """
+        Brings the index up to date with the status directory.
+        Only files whose (mtime, size) changed since the last refresh are re-read.
+
+        The directory is scanned and the files read without holding the index lock, so readers keep
+        being served from the previous index meanwhile; the result is swapped in at the end.
+
+        Args:
+            force (bool): Scan even if the last refresh is more recent than refresh_interval.
+        Returns:
+            set[str]: task_ids that were added, changed or removed.
+        """
+        # A caller that doesn't force the scan uses the index as is while another one is refreshing it
+        if not self._refresh_lock.acquire(blocking=force):
+            return set()
+        try:
+            with self._lock:
+                now = time.monotonic()
+                if not force and now - self._last_refresh < self.refresh_interval:
+                    return set()
+                self._last_refresh = now
+
+            seen = {}
+            try:
+                with os.scandir(self.status_dir) as it:
+                    for entry in it:
+                        if entry.name.endswith(".json") and entry.is_file():
+                            st = entry.stat()
+                            seen[entry.name[:-5]] = (st.st_mtime_ns, st.st_size)  # Remove .json
+            except FileNotFoundError:
+                pass
+
+            # Only refresh() changes _signatures, and _refresh_lock is held
+            updates = {}
+            for task_id, signature in seen.items():
+                if self._signatures.get(task_id) == signature:
+                    continue
                 status = self.get_status(task_id)
-                if status:
-                    statuses.append(status)
+                if status is None:
+                    # Unreadable (e.g. being written): keep the previous entry and retry next refresh
+                    continue
+                updates[task_id] = (status, signature)
+
+            with self._lock:
+                changed = set(updates)
+                for task_id, (status, signature) in updates.items():
+                    self._index_status(task_id, status)
+                    self._signatures[task_id] = signature
+                    self._removed.discard(task_id)
+
+                for task_id in self._statuses.keys() - seen.keys():
+                    self._unindex_status(task_id)
+                    self._signatures.pop(task_id, None)
+                    self._removed.add(task_id)
+                    changed.add(task_id)
+
+                if changed:
+                    self.version += 1
+                    self._sorted = None
+                    for task_id in changed:
+                        self._changed_at[task_id] = self.version
+                return changed
+        finally:
+            self._refresh_lock.release()
+
+    def changes_since(self, version: int) -> tuple[int, set[str]]:
+        """
+        Change feed of the index: task_ids added, changed or removed after the given version,
+        regardless of which caller's refresh picked the change up.
+
+        Removals at or below the given version are forgotten, as the caller has already seen them:
+        the feed is meant for a single consumer (StatusBroadcaster) that polls with increasing versions.
+
+        Returns:
+            tuple: (current version, changed task_ids)
+        """
+        self.refresh()
+        with self._lock:
+            for task_id in [t for t in self._removed if self._changed_at[t] <= version]:
+                self._removed.discard(task_id)
+                del self._changed_at[task_id]
+            return self.version, {t for t, v in self._changed_at.items() if v > version}
+
+    def _index_status(self, task_id: str, status: dict):
+        self._unindex_status(task_id)
+        self._statuses[task_id] = status
+        params = status.get("params") or {}
+        key = (params.get("target_id"), params.get("task_type"))
+        self._by_task.setdefault(key, set()).add(task_id)
 
-        # Sort by last_heartbeat (descending, new => old)
-        return sorted(statuses, key=lambda x: x.get("last_heartbeat", ""), reverse=True)
+    def _unindex_status(self, task_id: str):
+        old = self._statuses.pop(task_id, None)
+        if old is None:
+            return
+        params = old.get("params") or {}
+        key = (params.get("target_id"), params.get("task_type"))
+        task_ids = self._by_task.get(key)
+        if task_ids is not None:
+            task_ids.discard(task_id)
+            if not task_ids:
+                del self._by_task[key]
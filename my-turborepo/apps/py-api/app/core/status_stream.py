@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Optional
+
+from app.core.status import StatusManager
+
+logger = logging.getLogger(__name__)
+
+# Fields whose change is pushed immediately. A change in last_heartbeat alone is coalesced.
+SIGNIFICANT_FIELDS = ("status", "progress", "message", "user")
+
+
+def task_key(status: dict) -> tuple[str, str]:
+    """(target_id, task_type) a status belongs to, as used by subscriptions."""
+    params = status.get("params") or {}
+    return params.get("target_id"), params.get("task_type")
+
+
+class StatusSubscription:
+    """
+    Pending updates for one streaming client.
+    Keeps only the latest status per task_id, so a slow client gets coalesced updates
+    instead of an ever-growing backlog.
+    """
+
+    def __init__(self, tasks: Optional[set[tuple[str, str]]] = None):
+        """
+        Args:
+            tasks (set): (target_id, task_type) pairs to receive. All tasks if None.
+        """
+        self.tasks = tasks
+        self._pending: dict[str, dict] = {}
+        self._event = asyncio.Event()
+
+    def matches(self, status: dict) -> bool:
+        return self.matches_key(task_key(status))
+
+    def matches_key(self, key: Optional[tuple[str, str]]) -> bool:
+        if self.tasks is None:
+            return True
+        return key in self.tasks
+
+    def push(self, task_id: str, message: dict):
+        self._pending[task_id] = message
+        self._event.set()
+
+    async def next_batch(self, timeout: float) -> list[dict]:
+        """Waits for pending updates (or timeout) and returns them all at once."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._event.clear()
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+class StatusBroadcaster:
+    """
+    Watches the StatusManager index and fans out status changes to subscribed clients.
+
+    A single background task refreshes the index for every client, so the number of open
+    widgets no longer multiplies the status directory reads.
+    """
+
+    def __init__(self, status_manager: StatusManager, poll_interval: float = 0.25, heartbeat_interval: float = 30.0):
+        """
+        Args:
+            status_manager (StatusManager): Index of the local status mirror.
+            poll_interval (float): Seconds between checks of the index's change feed.
+            heartbeat_interval (float): Minimum seconds between pushes of heartbeat-only updates per task.
+        """
+        self.status_manager = status_manager
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._subscriptions: set[StatusSubscription] = set()
+        self._sent: dict[str, tuple[tuple, float]] = {}  # task_id -> (significant fields, last push time)
+        self._keys: dict[str, tuple[str, str]] = {}  # task_id -> (target_id, task_type), to filter removals
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def subscribe(self, tasks: Optional[set[tuple[str, str]]] = None) -> StatusSubscription:
+        subscription = StatusSubscription(tasks)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: StatusSubscription):
+        self._subscriptions.discard(subscription)
+
+    async def _run(self):
+        # Clients get the current state from their snapshot: only track it here, don't push it
+        now = time.monotonic()
+        version, _ = await asyncio.to_thread(self.status_manager.changes_since, 0)
+        for status in await asyncio.to_thread(self.status_manager.get_all_statuses):
+            self._sent[status["task_id"]] = (tuple(status.get(k) for k in SIGNIFICANT_FIELDS), now)
+            self._keys[status["task_id"]] = task_key(status)
+
+        while True:
+            try:
+                version, changed = await asyncio.to_thread(self.status_manager.changes_since, version)
+                if changed:
+                    # Reading the statuses touches the disk: off the event loop, fan-out stays on it
+                    self._publish(changed, await asyncio.to_thread(self.status_manager.get_all_statuses))
+            except Exception as e:
+                logger.error(f"StatusBroadcaster: Error refreshing statuses: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def _publish(self, changed: set[str], all_statuses: list[dict]):
+        now = time.monotonic()
+        statuses = {s["task_id"]: s for s in all_statuses}
+        for task_id in changed:
+            status = statuses.get(task_id)
+            if status is None:
+                self._sent.pop(task_id, None)
+                key = self._keys.pop(task_id, None)
+                message = {"type": "removed", "task_id": task_id}
+                for subscription in self._subscriptions:
+                    if subscription.matches_key(key):
+                        subscription.push(task_id, message)
+                continue
+
+            self._keys[task_id] = task_key(status)
+            fingerprint = tuple(status.get(k) for k in SIGNIFICANT_FIELDS)
+            previous = self._sent.get(task_id)
+            if previous and previous[0] == fingerprint and now - previous[1] < self.heartbeat_interval:
+                continue  # Heartbeat only: coalesce
+            self._sent[task_id] = (fingerprint, now)
+
+            message = {"type": "status", "task_id": task_id, "status": status}
+            for subscription in self._subscriptions:
+                if subscription.matches(status):
+                    subscription.push(task_id, message)
+
+    async def stream(self, subscription: StatusSubscription, keepalive: float = 15.0) -> AsyncIterator[str]:
+        """
+        Yields Server-Sent Events: an initial snapshot, then one event per changed status.
+        A comment line is sent every keepalive seconds so proxies keep the connection open.
+        """
+        statuses = await asyncio.to_thread(self.status_manager.get_all_statuses)
+        snapshot = [s for s in statuses if subscription.matches(s)]
+        yield _sse("snapshot", snapshot)
+        while True:
+            batch = await subscription.next_batch(timeout=keepalive)
+            if not batch:
+                yield ": keepalive\n\n"
+                continue
+            for message in batch:
+                yield _sse(message["type"], message)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
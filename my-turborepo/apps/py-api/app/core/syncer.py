@@ -1,48 +1,374 @@
+import json
 import logging
 import os
+import queue
 import shutil
 import threading
 import time
+from typing import Callable, Iterable, Optional
+
+from app.core.copier import CopyPipeline, copy_priority
+from app.core.formats import sidecar_path, write_arrow_sidecar
 
 logger = logging.getLogger(__name__)
 
+MANIFEST_FILENAME = ".sync_manifest.json"
+SYNC_SUB_DIRS = ("status", "snapshots")
+FULL_SYNC = "__FULL_SYNC__"  # Sync request asking for a full cycle instead of specific paths
+
 
 class FileSyncer(threading.Thread):
     """
     Intelligent background syncer for Windows Network Shares.
     Ensures sequential execution and minimal I/O by checking modification times.
+
+    In incremental mode (default) the syncer keeps a local manifest of what it has
+    already mirrored, so a steady-state cycle costs one scandir per changed directory
+    and one stat per unchanged directory instead of several stats per file.
     """
 
-    def __init__(self, shared_root: str, local_root: str, interval: int = 10):
+    def __init__(
+        self,
+        shared_root: str,
+        local_root: str,
+        interval: int = 10,
+        incremental: bool = True,
+        append_only_dirs: tuple[str, ...] = ("snapshots",),
+        settle_seconds: float = 30.0,
+        copy_workers: int = 4,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        active_window: float = 60.0,
+        sync_requests=None,
+        on_file_synced: Optional[Callable[[str], None]] = None,
+        arrow_sidecars: bool = False,
+        on_file_removed: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            shared_root (str): Root of the shared drive to mirror from.
+            local_root (str): Root of the local mirror.
+            interval (int): Initial seconds to wait between full sync cycles.
+            incremental (bool): Use the manifest-driven sync instead of a full os.walk.
+            append_only_dirs (tuple): Sub directories whose files are only ever added (never rewritten
+                in place), so an unchanged directory mtime means its listing can be skipped.
+            settle_seconds (float): Files modified more recently than this keep their directory
+                from being marked as unchanged, so half-written files are re-checked.
+            copy_workers (int): Number of parallel copy threads used in incremental mode.
+            min_interval (float): Interval used while tasks are active (defaults to interval).
+            max_interval (float): Interval the syncer backs off to while idle (defaults to interval).
+            active_window (float): Seconds after the last observed change during which the syncer stays fast.
+            sync_requests: Queue (e.g. multiprocessing.Queue) receiving shared paths written by local
+                writers, or FULL_SYNC. Each request wakes the syncer before the interval elapses.
+            on_file_synced (Callable): Called with the local path of every file (over)written by the
+                syncer, e.g. to invalidate caches of the previous content.
+            arrow_sidecars (bool): Keep an uncompressed Arrow IPC copy next to every mirrored parquet,
+                so DataManager can memory-map it instead of decoding the parquet per request.
+            on_file_removed (Callable): Called with the local path of every mirrored file deleted because it
+                was removed from the share (e.g. snapshots folded into partitions by SnapshotCompactor).
+        """
         super().__init__(daemon=True)
         self.shared_root = shared_root
         self.local_root = local_root
         self.interval = interval
+        self.min_interval = min_interval if min_interval is not None else interval
+        self.max_interval = max_interval if max_interval is not None else interval
+        self.current_interval = float(interval)
+        self.active_window = active_window
+        self._last_activity = 0.0
+        self.sync_requests = sync_requests if sync_requests is not None else queue.Queue()
+        self.incremental = incremental
+        self.append_only_dirs = set(append_only_dirs)
+        self.settle_seconds = settle_seconds
+        self.on_file_synced = on_file_synced
+        self.arrow_sidecars = arrow_sidecars
+        self.on_file_removed = on_file_removed
         self._stop_event = threading.Event()
 
+        self.manifest_path = os.path.join(local_root, MANIFEST_FILENAME)
+        self._manifest = self._load_manifest()
+        self._manifest_dirty = False
+        self._manifest_lock = threading.Lock()  # Manifest is updated from copy threads
+        self.stats = self._new_cycle_stats()
+
+        # Copies run in the background so a large snapshot does not hold back status updates
+        self.copier = CopyPipeline(max_workers=copy_workers) if incremental else None
+
     def stop(self):
         self._stop_event.set()
+        self.sync_requests.put(FULL_SYNC)  # Wake the thread if it is waiting for requests
+        if self.is_alive():
+            self.join(timeout=5.0)
+        if self.copier:
+            self.copier.stop()
+
+    def metrics(self) -> dict:
+        """Statistics of the last sync cycle and the copy pipeline."""
+        return {
+            "last_cycle": dict(self.stats),
+            "current_interval": self.current_interval,
+            "copy": self.copier.metrics() if self.copier else None,
+        }
+
+    def request_sync(self, paths: Optional[Iterable[str]] = None):
+        """
+        Wakes the syncer without waiting for the interval.
+
+        Args:
+            paths (Iterable[str]): Shared paths (absolute or relative to shared_root) to mirror right away.
+                A full cycle is requested if omitted.
+        """
+        if paths is None:
+            self.sync_requests.put(FULL_SYNC)
+            return
+        for path in paths:
+            self.sync_requests.put(path)
 
     def run(self):
         logging.info(f"Syncer: Monitoring started. Shared: {self.shared_root} -> Local: {self.local_root}")
 
+        next_full_sync = 0.0
         while not self._stop_event.is_set():
-            start_time = time.time()
+            if time.time() >= next_full_sync:
+                stats = self.sync_once()
+                self._adapt_interval(active=stats["files_queued"] > 0 or stats["files_copied"] > 0)
+                next_full_sync = time.time() + self.current_interval
+
+            # Copies keep landing in the background while the syncer waits for the next request or cycle
+            paths = self._wait_for_requests(timeout=max(0.0, next_full_sync - time.time()))
+            if not paths:
+                continue
+            self._adapt_interval(active=True)
+            if FULL_SYNC in paths or not self.incremental:
+                next_full_sync = 0.0
+                continue
+            self.sync_paths(paths)
+            next_full_sync = min(next_full_sync, time.time() + self.current_interval)
+
+    def _wait_for_requests(self, timeout: float) -> set[str]:
+        """Blocks until a sync request arrives or timeout elapses, then drains every pending request."""
+        paths = set()
+        try:
+            paths.add(self.sync_requests.get(timeout=timeout))
+            while True:
+                paths.add(self.sync_requests.get_nowait())
+        except queue.Empty:
+            pass
+        return paths
+
+    def _adapt_interval(self, active: bool):
+        """Stays at min_interval while changes keep arriving, then backs off exponentially to max_interval."""
+        now = time.time()
+        if active:
+            self._last_activity = now
+        if now - self._last_activity < self.active_window:
+            self.current_interval = self.min_interval
+        else:
+            self.current_interval = min(self.max_interval, max(self.current_interval, self.min_interval) * 2)
 
+    def sync_paths(self, paths: Iterable[str]):
+        """
+        Mirrors only the given shared files instead of scanning whole directories.
+        Used by local writers that know exactly which files they touched.
+        """
+        if not self.incremental:
+            self.sync_once()
+            return
+        for path in paths:
+            rel_file = os.path.relpath(path, self.shared_root) if os.path.isabs(path) else os.path.normpath(path)
+            if rel_file.startswith("..") or rel_file.split(os.sep, 1)[0] not in SYNC_SUB_DIRS:
+                continue
+            shared_file = os.path.join(self.shared_root, rel_file)
             try:
-                self.sync_directory("status")
-                self.sync_directory("snapshots")
-            except Exception as e:
-                logging.error(f"Syncer: Error during sync: {e}")
+                st = os.stat(shared_file)
+                os.makedirs(os.path.dirname(os.path.join(self.local_root, rel_file)), exist_ok=True)
+                self._sync_file(rel_file, shared_file, st)
+            except (IOError, OSError) as e:
+                # Full cycles will pick it up later
+                logging.warning(f"Syncer: Could not sync requested {rel_file}. {e}")
+
+    def sync_once(self, wait: bool = False) -> dict:
+        """
+        Runs one full sync cycle and returns its statistics.
 
-            elapsed = time.time() - start_time
-            if elapsed > 1.0:
-                logging.debug(f"Syncer: Sync took {elapsed:.2f} seconds.")
+        Args:
+            wait (bool): Block until every copy queued by this cycle has landed.
+        """
+        start_time = time.time()
+        self.stats = self._new_cycle_stats()
 
-            # This sleep is only triggered once copy is completed
-            time.sleep(self.interval)
+        try:
+            for sub_dir in SYNC_SUB_DIRS:
+                self.sync_directory(sub_dir)
+            if wait and self.copier:
+                self.copier.join()
+            self._save_manifest()
+        except Exception as e:
+            logging.error(f"Syncer: Error during sync: {e}")
+
+        elapsed = time.time() - start_time
+        self.stats["elapsed"] = elapsed
+        if elapsed > 1.0:
+            logging.debug(f"Syncer: Sync took {elapsed:.2f} seconds.")
+        return self.stats
 
     def sync_directory(self, sub_dir: str):
+        if not self.incremental:
+            return self._sync_directory_full(sub_dir)
+
+        shared_base = os.path.join(self.shared_root, sub_dir)
+        try:
+            dir_mtime = os.stat(shared_base).st_mtime_ns
+        except FileNotFoundError:
+            return
+        self.stats["stat_calls"] += 1
+
+        self._sync_tree(sub_dir, dir_mtime, can_skip=sub_dir in self.append_only_dirs)
+
+    def _sync_tree(self, rel_dir: str, dir_mtime: int, can_skip: bool):
+        """
+        Mirrors one shared directory (relative to shared_root) and recurses into its children.
+        Reuses the stat data returned by os.scandir instead of issuing separate stats per file.
+        """
+        shared_dir = os.path.join(self.shared_root, rel_dir)
+        record = self._manifest["dirs"].get(rel_dir)
+
+        # Listing is unchanged since the last settled scan: only descend into known sub directories,
+        # whose mtime is not reflected in the parent's mtime.
+        if can_skip and record and record["mtime"] == dir_mtime:
+            self.stats["dirs_skipped"] += 1
+            for name in record["subdirs"]:
+                try:
+                    sub_mtime = os.stat(os.path.join(shared_dir, name)).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                finally:
+                    self.stats["stat_calls"] += 1
+                self._sync_tree(os.path.join(rel_dir, name), sub_mtime, can_skip)
+            return
+
+        if record is None:
+            os.makedirs(os.path.join(self.local_root, rel_dir), exist_ok=True)
+
+        self.stats["dirs_scanned"] += 1
+        settled = True
+        now = time.time()
+        subdirs = []
+        shared_names = set()
+        with os.scandir(shared_dir) as it:
+            for entry in it:
+                shared_names.add(entry.name)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append((entry.name, entry.stat().st_mtime_ns))
+                        self.stats["stat_calls"] += 1
+                    elif entry.is_file():
+                        st = entry.stat()
+                        self.stats["stat_calls"] += 1
+                        if now - st.st_mtime < self.settle_seconds:
+                            settled = False
+                        if not self._sync_file(os.path.join(rel_dir, entry.name), entry.path, st):
+                            # Copy is still queued or failed: re-check this listing next cycle
+                            settled = False
+                except (IOError, OSError) as e:
+                    # If file is locked etc., skip and retry on next loop
+                    settled = False
+                    logging.warning(f"Syncer: Could not copy {entry.name}. It might be in use. {e}")
+
+        for name, sub_mtime in subdirs:
+            self._sync_tree(os.path.join(rel_dir, name), sub_mtime, can_skip)
+        self._mirror_removals(rel_dir, shared_names)
+
+        with self._manifest_lock:
+            self._manifest["dirs"][rel_dir] = {
+                "mtime": dir_mtime if settled else None,
+                "subdirs": sorted(name for name, _ in subdirs),
+            }
+            self._manifest_dirty = True
+
+    def _sync_file(self, rel_file: str, shared_file: str, st: os.stat_result) -> bool:
+        """
+        Queues a copy of a single file if its (size, mtime) differs from what was last mirrored.
+
+        Returns:
+            bool: True if the local copy is already up to date.
+        """
+        signature = [st.st_size, st.st_mtime_ns]
+        known = self._manifest["files"].get(rel_file)
+        if known == signature:
+            return True
+
+        local_file = os.path.join(self.local_root, rel_file)
+        # Not in the manifest yet (e.g. first run after an upgrade): adopt an existing identical local copy
+        if known is None:
+            self.stats["stat_calls"] += 1
+            try:
+                local_st = os.stat(local_file)
+            except FileNotFoundError:
+                local_st = None
+            if local_st and local_st.st_size == st.st_size and abs(local_st.st_mtime - st.st_mtime) <= 1.0:
+                self._record_file(rel_file, signature)
+                return True
+
+        if self.copier.submit(
+            shared_file,
+            local_file,
+            priority=copy_priority(rel_file),
+            size=st.st_size,
+            on_done=lambda: self._on_copied(rel_file, local_file, signature),
+        ):
+            self.stats["files_queued"] += 1
+        return False
+
+    def _on_copied(self, rel_file: str, local_file: str, signature: list):
+        logging.info(f"Syncer: Updated {rel_file}")
+        if self.arrow_sidecars and local_file.endswith(".parquet"):
+            try:
+                write_arrow_sidecar(local_file)
+            except Exception as e:
+                # Readers fall back to the parquet itself
+                logging.warning(f"Syncer: Could not write Arrow sidecar for {rel_file}. {e}")
+        self._record_file(rel_file, signature)
+        if self.on_file_synced:
+            self.on_file_synced(local_file)
+
+    def _mirror_removals(self, rel_dir: str, shared_names: set[str]):
+        """
+        Deletes local copies of files that disappeared from a shared directory listing.
+        Only files this syncer mirrored (known to the manifest) are touched, never local-only files.
+        """
+        try:
+            local_names = os.listdir(os.path.join(self.local_root, rel_dir))
+        except FileNotFoundError:
+            return
+        for name in local_names:
+            if name in shared_names:
+                continue
+            rel_file = os.path.join(rel_dir, name)
+            with self._manifest_lock:
+                if self._manifest["files"].pop(rel_file, None) is None:
+                    continue
+                self._manifest_dirty = True
+            local_file = os.path.join(self.local_root, rel_file)
+            for path in (local_file, sidecar_path(local_file)) if name.endswith(".parquet") else (local_file,):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logging.warning(f"Syncer: Could not remove {path}. {e}")
+            self.stats["files_removed"] += 1
+            logging.info(f"Syncer: Removed {rel_file}")
+            if self.on_file_removed:
+                self.on_file_removed(local_file)
+
+    def _record_file(self, rel_file: str, signature: list):
+        with self._manifest_lock:
+            self._manifest["files"][rel_file] = signature
+            self._manifest_dirty = True
+
+    def _sync_directory_full(self, sub_dir: str):
+        """Legacy sync: walks the whole tree and compares mtimes of both sides for every file."""
         shared_base = os.path.join(self.shared_root, sub_dir)
         local_base = os.path.join(self.local_root, sub_dir)
 
@@ -71,6 +397,47 @@ class FileSyncer(threading.Thread):
                         logging.info(f"Syncer: Updating {sub_dir}/{rel_path}/{file}")
                         # Use copy2() to keep metadata (mtime) for update time comparison
                         shutil.copy2(shared_file, local_file)
+                        self.stats["files_copied"] += 1
+                        if self.on_file_synced:
+                            self.on_file_synced(local_file)
                 except (IOError, OSError) as e:
                     # If file is locked etc., skip and retry on next loop
                     logging.warning(f"Syncer: Could not copy {file}. It might be in use. {e}")
+
+    @staticmethod
+    def _new_cycle_stats() -> dict:
+        return {
+            "dirs_scanned": 0,
+            "dirs_skipped": 0,
+            "stat_calls": 0,
+            "files_queued": 0,
+            "files_copied": 0,
+            "files_removed": 0,
+            "elapsed": 0.0,
+        }
+
+    def _load_manifest(self) -> dict:
+        """Loads the persisted manifest, falling back to an empty one if missing or corrupted."""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if isinstance(manifest.get("files"), dict) and isinstance(manifest.get("dirs"), dict):
+                return manifest
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Syncer: Ignoring unreadable manifest {self.manifest_path}. {e}")
+        return {"files": {}, "dirs": {}}
+
+    def _save_manifest(self):
+        """Persists the manifest atomically (write to temp file, then rename) when it changed."""
+        if not self.incremental or not self._manifest_dirty:
+            return
+        os.makedirs(self.local_root, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with self._manifest_lock:
+            payload = json.dumps(self._manifest, separators=(",", ":"))
+            self._manifest_dirty = False
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,301 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from app.core.scheduler import PRIORITIES
+from app.core.status import StatusManager
+
+logger = logging.getLogger(__name__)
+
+
+class FileTaskBroker:
+    """
+    Team-wide task queue on the shared drive, so idle PCs can take over a colleague's backlog.
+
+    Works without any external service, in the spirit of a taskiq broker:
+    - broker/queue/<task_id>.json: published tasks waiting for a worker.
+    - broker/claimed/<task_id>.<token>.json: tasks taken by a PC. A claim is an atomic rename out
+      of queue/, so exactly one PC wins a task even if several try at the same time.
+
+    A claim is a lease: its holder renews it (touches the file) while the task is queued or running
+    on its worker pool. Any PC moves claims that weren't renewed within lease_seconds back to
+    queue/, so the tasks of a PC that crashed or lost the network are picked up by someone else.
+    Expiry never compares file times with the local clock (the PCs' clocks may disagree): each PC
+    remembers when it last saw a claim's mtime change and measures lease_seconds on its own
+    monotonic clock from there, so a PC only requeues claims it watched go stale.
+    """
+
+    def __init__(
+        self,
+        shared_dir: str,
+        lease_seconds: float = 60.0,
+        status_manager: Optional[StatusManager] = None,
+        user_name: str = "",
+    ):
+        """
+        Args:
+            shared_dir (str): Root path of the shared data directory (e.g., 'Y:/Shared')
+            lease_seconds (float): Seconds after which a claim that wasn't renewed is considered lost.
+            status_manager (StatusManager): Writes 'pending'/'cancelled' statuses for published tasks.
+            user_name (str): Name of the user/PC publishing tasks, used in status files.
+        """
+        self.lease_seconds = lease_seconds
+        self.status_manager = status_manager
+        self.user_name = user_name
+        self.queue_dir = os.path.join(shared_dir, "broker", "queue")
+        self.claimed_dir = os.path.join(shared_dir, "broker", "claimed")
+        os.makedirs(self.queue_dir, exist_ok=True)
+        os.makedirs(self.claimed_dir, exist_ok=True)
+        # Claim filename -> (mtime_ns, size) last seen and the local monotonic time it was first seen
+        self._observed: dict[str, tuple[tuple[int, int], float]] = {}
+
+    def publish(self, task_info: dict):
+        """
+        Queues a task ({"task_id", "params"}, optionally "priority" and "deadline") for any team PC.
+        Publishing a task_id that is already waiting replaces it (latest request wins).
+        """
+        task_info = {
+            **task_info,
+            "priority": task_info.get("priority") or "interactive",
+            "deadline": task_info.get("deadline"),
+            "enqueued_at": task_info.get("enqueued_at") or time.time(),
+            "published_by": self.user_name,
+        }
+        path = self._queue_path(task_info["task_id"])
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(task_info, f, ensure_ascii=False)
+        os.replace(tmp, path)  # Readers never see a half-written task
+        self._write_status(task_info, "pending", "Waiting for a team worker")
+
+    def withdraw(self, task_id: str) -> bool:
+        """Removes a task that no PC has claimed yet. Returns False if it isn't waiting."""
+        task_info = self._read(self._queue_path(task_id))
+        try:
+            os.remove(self._queue_path(task_id))
+        except FileNotFoundError:
+            return False
+        if task_info is not None:
+            self._write_status(task_info, "cancelled", "Cancelled before it started.")
+        return True
+
+    def pending(self) -> list[dict]:
+        """Waiting tasks, most urgent first: due deadlines, then priority class, then arrival."""
+        tasks = []
+        for name in self._list(self.queue_dir):
+            if name.endswith(".json"):
+                task_info = self._read(os.path.join(self.queue_dir, name))
+                if task_info is not None:
+                    tasks.append(task_info)
+        now = time.time()
+        return sorted(tasks, key=lambda t: self._order_key(t, now))
+
+    def claim(self, accept: Optional[Callable[[dict], bool]] = None) -> Optional[tuple[dict, str]]:
+        """
+        Takes the most urgent waiting task that 'accept' agrees to run and that isn't already
+        claimed by another PC (a newer request for a task that is still running waits for it).
+
+        Returns:
+            tuple: (task_info, claim token), or None if there is nothing to take.
+        """
+        claimed = {self._split_claim(name)[0] for name in self._list(self.claimed_dir)}
+        for task_info in self.pending():
+            task_id = task_info["task_id"]
+            if task_id in claimed or (accept is not None and not accept(task_info)):
+                continue
+            token = uuid.uuid4().hex
+            try:
+                os.rename(self._queue_path(task_id), self._claim_path(task_id, token))
+            except OSError:
+                continue  # Another PC was faster
+            self.renew(task_id, token)  # The lease starts now, not when the task was published
+            # Params may have been replaced between listing and claiming
+            return self._read(self._claim_path(task_id, token)) or task_info, token
+        return None
+
+    def renew(self, task_id: str, token: str) -> bool:
+        """Extends a lease. Returns False if the claim was lost (expired and taken back)."""
+        try:
+            os.utime(self._claim_path(task_id, token))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, task_id: str, token: str):
+        """Drops a claim once its task finished (successfully or not)."""
+        try:
+            os.remove(self._claim_path(task_id, token))
+        except FileNotFoundError:
+            pass
+
+    def release(self, task_id: str, token: str):
+        """Hands a claimed task back to the queue, e.g. on shutdown before it ran."""
+        self._requeue(self._claim_path(task_id, token), task_id)
+
+    def requeue_expired(self) -> list[str]:
+        """
+        Moves claims whose lease expired back to the queue. Returns their task_ids.
+        A claim expires once its mtime didn't change for lease_seconds of this PC's own time.
+        """
+        now = time.monotonic()
+        observed = {}
+        requeued = []
+        for name in self._list(self.claimed_dir):
+            path = os.path.join(self.claimed_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature = (st.st_mtime_ns, st.st_size)
+            previous = self._observed.get(name)
+            since = previous[1] if previous is not None and previous[0] == signature else now
+            if now - since <= self.lease_seconds:
+                observed[name] = (signature, since)
+                continue
+            task_id = self._split_claim(name)[0]
+            if self._requeue(path, task_id):
+                logger.warning(f"FileTaskBroker: Lease of {task_id} expired, requeued")
+                requeued.append(task_id)
+        self._observed = observed
+        return requeued
+
+    def status(self) -> dict:
+        return {
+            "pending": len([n for n in self._list(self.queue_dir) if n.endswith(".json")]),
+            "claimed": len(self._list(self.claimed_dir)),
+            "lease_seconds": self.lease_seconds,
+        }
+
+    def _requeue(self, claim_path: str, task_id: str) -> bool:
+        if os.path.exists(self._queue_path(task_id)):
+            # A newer request is already waiting: it supersedes the claimed one
+            try:
+                os.remove(claim_path)
+            except FileNotFoundError:
+                pass
+            return False
+        try:
+            os.rename(claim_path, self._queue_path(task_id))
+            return True
+        except OSError:
+            return False
+
+    def _write_status(self, task_info: dict, status: str, message: str):
+        if self.status_manager is not None:
+            self.status_manager.update(task_info["task_id"], status, self.user_name, task_info["params"], 0, message)
+
+    def _queue_path(self, task_id: str) -> str:
+        return os.path.join(self.queue_dir, f"{task_id}.json")
+
+    def _claim_path(self, task_id: str, token: str) -> str:
+        return os.path.join(self.claimed_dir, f"{task_id}.{token}.json")
+
+    @staticmethod
+    def _split_claim(name: str) -> tuple[str, str]:
+        task_id, _, rest = name.removesuffix(".json").rpartition(".")
+        return task_id, rest
+
+    @staticmethod
+    def _list(directory: str) -> list[str]:
+        try:
+            return [n for n in os.listdir(directory) if not n.endswith(".tmp")]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _read(path: str) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None  # Claimed by someone else meanwhile, or being replaced
+
+    @staticmethod
+    def _order_key(task_info: dict, now: float, deadline_horizon: float = 60.0) -> tuple:
+        deadline = task_info.get("deadline")
+        if deadline is not None and deadline - now <= deadline_horizon:
+            return (0, deadline, task_info["enqueued_at"])
+        return (1, PRIORITIES.index(task_info.get("priority", "interactive")), task_info["enqueued_at"])
+
+
+class BrokerConsumer(threading.Thread):
+    """
+    Feeds this PC's WorkerPool from the FileTaskBroker.
+
+    Only claims a task when a warmed worker could start it right away, so busy PCs leave work to
+    idle ones. Renews the leases of claimed tasks while they are queued or running locally and
+    completes them once they are gone from the pool.
+    """
+
+    def __init__(self, broker: FileTaskBroker, pool, poll_interval: float = 2.0):
+        """
+        Args:
+            broker (FileTaskBroker): Shared task queue.
+            pool (WorkerPool): Local worker pool executing claimed tasks.
+            poll_interval (float): Seconds between broker scans while idle.
+        """
+        super().__init__(daemon=True, name="broker-consumer")
+        self.broker = broker
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.claimed = 0
+        self._claims: dict[str, str] = {}  # task_id -> claim token
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self):
+        """Checks the broker now instead of at the next poll, e.g. right after publishing."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self.is_alive():
+            self.join(timeout=5.0)
+        # Tasks of this PC are lost with its workers: let other PCs take them right away
+        for task_id, token in list(self._claims.items()):
+            self.broker.release(task_id, token)
+        self._claims.clear()
+
+    def status(self) -> dict:
+        return {**self.broker.status(), "claimed_here": sorted(self._claims), "claimed_total": self.claimed}
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._poll()
+            except Exception as e:
+                logger.error(f"BrokerConsumer: Error polling broker: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _poll(self):
+        for task_id, token in list(self._claims.items()):
+            if not self.pool.is_active(task_id):
+                self.broker.complete(task_id, token)
+                del self._claims[task_id]
+            elif not self.broker.renew(task_id, token):
+                logger.warning(f"BrokerConsumer: Lost the lease of {task_id}")
+                del self._claims[task_id]
+
+        self.broker.requeue_expired()
+
+        while not self._stop_event.is_set():
+            claim = self.broker.claim(accept=lambda t: t["task_id"] not in self._claims and self.pool.can_start(t))
+            if claim is None:
+                return
+            task_info, token = claim
+            self._claims[task_info["task_id"]] = token
+            self.claimed += 1
+            logger.info(f"BrokerConsumer: Claimed {task_info['task_id']} published by {task_info['published_by']}")
+            self.pool.submit(
+                {
+                    k: task_info[k]
+                    for k in ("task_id", "params", "priority", "deadline", "enqueued_at")
+                    if k in task_info
+                }
+            )
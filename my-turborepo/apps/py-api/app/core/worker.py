@@ -1,14 +1,189 @@
 import logging
 import multiprocessing
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 
 from app.core.status import StatusManager
-from app.services.portfolio_data_manager import PortfolioDataManager
+from app.services.portfolio_data_manager import PortfolioDataManager, load_libraries
 
 logger = logging.getLogger(__name__)
 
+# Task types served by the worker, each backed by its own engine instance
+ENGINE_TYPES = ("pricing", "event", "guideline")
 
-def calc_worker(queue: multiprocessing.Queue, shared_dir: str, user_name: str, ready_event):
+# Values of the cancel_reason shared with the WorkerPool
+CANCEL_BY_USER = 1
+CANCEL_TIMEOUT = 2
+
+
+class TaskCancelled(Exception):
+    """Raised at an engine checkpoint when the pool asked to stop the running task."""
+
+    def __init__(self, reason: int):
+        super().__init__("Cancelled by user." if reason == CANCEL_BY_USER else "Timed out.")
+        self.reason = reason
+
+
+def cancel_checkpoint(seq: Optional[int], cancel_seq, cancel_reason) -> Optional[Callable[[], None]]:
+    """
+    Returns the engine checkpoint for the task dispatched with seq. It raises TaskCancelled once the pool
+    flagged that dispatch in the shared cancel_seq, so a stale flag can never hit a later task.
+    """
+    if seq is None or cancel_seq is None:
+        return None
+
+    def checkpoint():
+        if cancel_seq.value == seq:
+            raise TaskCancelled(cancel_reason.value)
+
+    return checkpoint
+
+
+def warm_up_engines(
+    shared_dir: str, on_write: Optional[Callable[[str], None]], lazy_engines: tuple = ()
+) -> tuple[dict, dict]:
+    """
+    Loads the shared libraries once, then initializes the eager engines concurrently,
+    so time-to-ready follows the slowest engine instead of the sum of all of them.
+
+    Args:
+        shared_dir (str): Root directory of the shared drive.
+        on_write (Callable): Passed to every engine, see calc_worker.
+        lazy_engines (tuple): Task types whose engine is only created on first use.
+    Returns:
+        tuple: (engines by task_type, seconds per warm-up phase)
+    """
+    timings = {}
+    start = time.perf_counter()
+    load_libraries()
+    timings["libraries"] = time.perf_counter() - start
+
+    def build(task_type: str) -> tuple[str, PortfolioDataManager, float]:
+        t = time.perf_counter()
+        engine = PortfolioDataManager(shared_dir=shared_dir, on_write=on_write)
+        return task_type, engine, time.perf_counter() - t
+
+    engines = {}
+    eager = [t for t in ENGINE_TYPES if t not in lazy_engines]
+    if eager:
+        with ThreadPoolExecutor(max_workers=len(eager), thread_name_prefix="engine-init") as pool:
+            for task_type, engine, elapsed in pool.map(build, eager):
+                engines[task_type] = engine
+                timings[f"engine:{task_type}"] = elapsed
+    timings["total"] = time.perf_counter() - start
+    return engines, timings
+
+
+class ProgressReporter:
+    """
+    Live 'running' status of one task, written from the engine's progress callback and a heartbeat thread.
+
+    Progress updates are coalesced: the engine may report as often as it likes, the status file is
+    written at most every min_interval seconds with the latest value. While the engine reports
+    nothing (e.g. inside one long library call), the heartbeat thread rewrites the last state every
+    heartbeat_interval seconds, so a fresh last_heartbeat means the worker is alive and the message
+    tells for how long the progress hasn't moved.
+    """
+
+    def __init__(
+        self,
+        status_mgr: StatusManager,
+        task_id: str,
+        user_name: str,
+        params: dict,
+        min_interval: float = 1.0,
+        heartbeat_interval: float = 10.0,
+        stall_after: float = 30.0,
+    ):
+        """
+        Args:
+            status_mgr (StatusManager): Writer of the task's status file.
+            task_id (str): Task being reported.
+            user_name (str): Identifier of the current PC user.
+            params (dict): TaskParams of the task.
+            min_interval (float): Minimum seconds between two status writes.
+            heartbeat_interval (float): Seconds without a write after which the heartbeat rewrites the status.
+            stall_after (float): Seconds without progress after which the message says so.
+        """
+        self.status_mgr = status_mgr
+        self.task_id = task_id
+        self.user_name = user_name
+        self.params = params
+        self.min_interval = min_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stall_after = stall_after
+        self.writes = 0
+        self._progress = 0.0
+        self._message = "Running..."
+        self._changed = True  # Latest progress not written yet
+        self._progress_at = time.monotonic()
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True, name=f"heartbeat-{task_id}")
+
+    def __call__(self, progress: float, message: str):
+        """Engine progress callback. Cheap: only writes if min_interval has passed since the last write."""
+        with self._lock:
+            self._progress = progress
+            self._message = message
+            self._changed = True
+            self._progress_at = time.monotonic()
+            if self._progress_at - self._last_write >= self.min_interval:
+                self._write()
+
+    def start(self) -> "ProgressReporter":
+        with self._lock:
+            self._write()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the heartbeat. Call before writing the final status so it can't be overwritten."""
+        self._stop_event.set()
+        self._thread.join()
+
+    def _heartbeat(self):
+        while not self._stop_event.wait(self.min_interval):
+            with self._lock:
+                now = time.monotonic()
+                if self._stop_event.is_set():
+                    return
+                # Flush a coalesced update, or prove liveness after a quiet period
+                if (self._changed and now - self._last_write >= self.min_interval) or (
+                    now - self._last_write >= self.heartbeat_interval
+                ):
+                    self._write()
+
+    def _write(self):
+        now = time.monotonic()
+        message = self._message
+        stalled = now - self._progress_at
+        if stalled >= self.stall_after:
+            message = f"{message} (no progress for {stalled:.0f}s)"
+        self.status_mgr.update(
+            self.task_id, "running", self.user_name, params=self.params, progress=self._progress, message=message
+        )
+        self._last_write = now
+        self._changed = False
+        self.writes += 1
+
+
+def calc_worker(
+    queue: multiprocessing.Queue,
+    shared_dir: str,
+    user_name: str,
+    ready_event,
+    sync_requests=None,
+    results: multiprocessing.Queue = None,
+    worker_id: int = None,
+    lazy_engines: tuple = (),
+    cancel_seq=None,
+    cancel_reason=None,
+):
     """
     Main loop for the persistent calculation worker process.
 
@@ -21,18 +196,25 @@ def calc_worker(queue: multiprocessing.Queue, shared_dir: str, user_name: str, r
         queue (multiprocessing.Queue): IPC queue for receiving task requests from FastAPI.
         shared_dir (str): Root directory for status tracking.
         user_name (str): Identifier of the current PC user.
+        sync_requests (multiprocessing.Queue): Optional queue to the FileSyncer. Every file written
+            to the shared drive is pushed there so the local mirror picks it up immediately.
+        results (multiprocessing.Queue): Optional queue back to the WorkerPool. Warm-up timings are posted
+            once ready, and a 'done' message after every task so the pool can free the worker and its slot.
+        worker_id (int): Identifier of this worker within the WorkerPool.
+        lazy_engines (tuple): Rarely used task types whose engine is warmed up on first use.
+        cancel_seq (multiprocessing.Value): Dispatch sequence number of the task the pool wants stopped.
+        cancel_reason (multiprocessing.Value): CANCEL_BY_USER or CANCEL_TIMEOUT for cancel_seq.
     """
+    on_write = sync_requests.put if sync_requests is not None else None
 
     logger.info(f"Worker[{os.getpid()}]: Intializing engines...")
-    engines = {
-        "pricing": PortfolioDataManager(shared_dir=shared_dir),
-        "event": PortfolioDataManager(shared_dir=shared_dir),
-        "guideline": PortfolioDataManager(shared_dir=shared_dir),
-    }
+    engines, timings = warm_up_engines(shared_dir, on_write, lazy_engines)
     # Initialize own StatusManager for this worker's process
-    status_mgr = StatusManager(shared_dir)
+    status_mgr = StatusManager(shared_dir, on_write=on_write)
+    if results is not None:
+        results.put({"type": "warmup", "worker_id": worker_id, "timings": timings})
     ready_event.set()  # Tell that initialization of Worker is complete
-    logger.info("Worker: Initialization complete. Waiting for tasks...")
+    logger.info(f"Worker[{os.getpid()}]: Initialization complete in {timings['total']:.1f}s. Waiting for tasks...")
 
     while True:
         # Blocks until a new task is pushed into the queue
@@ -45,24 +227,55 @@ def calc_worker(queue: multiprocessing.Queue, shared_dir: str, user_name: str, r
         task_id = task_info["task_id"]
         params = task_info.get("params", {})
         task_type = params.get("task_type")
+        # Phase timings reported in the final status
+        phases = {}
+        if task_info.get("enqueued_at"):
+            phases["queue_wait"] = max(0.0, time.time() - task_info["enqueued_at"])
+        reporter = None
 
         try:
-            # Get engine dynamically
-            engine = engines.get(task_type)
-
-            if not engine:
+            if task_type not in ENGINE_TYPES:
                 raise ValueError(f"Unknown task_type: {task_type}")
 
-            # Notify start via status manager
-            status_mgr.update(task_id, "running", user_name, params=params, progress=0, message="Running...")
+            # Notify start via status manager, then keep the status alive while the engine runs
+            reporter = ProgressReporter(status_mgr, task_id, user_name, params).start()
+
+            # Get engine dynamically, warming up lazy engines on first use
+            engine = engines.get(task_type)
+            if engine is None:
+                start = time.perf_counter()
+                engine = engines[task_type] = PortfolioDataManager(shared_dir=shared_dir, on_write=on_write)
+                timings[f"engine:{task_type}"] = phases["warmup"] = time.perf_counter() - start
+                if results is not None:
+                    results.put({"type": "warmup", "worker_id": worker_id, "timings": timings})
 
             # Run task
             # No need to save result path here as the dashboard should refer to the latest (or a specific version manually)
-            _ = engine.run(params)
+            _ = engine.run(
+                params,
+                on_progress=reporter,
+                checkpoint=cancel_checkpoint(task_info.get("seq"), cancel_seq, cancel_reason),
+                timings=phases,
+            )
 
             # Notify completion via status manager
-            status_mgr.update(task_id, "done", user_name, params=params, progress=100, message="Task finished.")
+            reporter.stop()
+            status_mgr.update(
+                task_id, "done", user_name, params=params, progress=100, message="Task finished.", timings=phases
+            )
+
+        except TaskCancelled as e:
+            # Stopped cooperatively: the engines stay warm and the worker takes the next task
+            reporter.stop()
+            status = "cancelled" if e.reason == CANCEL_BY_USER else "failed"
+            status_mgr.update(task_id, status, user_name, params=params, message=str(e), timings=phases)
 
         except Exception as e:
             # Catch and broadcast errors to all users via the shared status file
-            status_mgr.update(task_id, "failed", user_name, params=params, message=f"Error: {str(e)}")
+            if reporter is not None:
+                reporter.stop()
+            status_mgr.update(task_id, "failed", user_name, params=params, message=f"Error: {str(e)}", timings=phases)
+
+        finally:
+            if results is not None:
+                results.put({"type": "done", "worker_id": worker_id, "task_id": task_id})
@@ -0,0 +1,636 @@
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from multiprocessing import Event, Process, Queue, Value
+from typing import Callable, Optional
+
+from app.core.scheduler import TaskScheduler
+from app.core.status import StatusManager
+from app.core.worker import CANCEL_BY_USER, CANCEL_TIMEOUT, calc_worker
+
+try:
+    import psutil
+except ImportError:  # A dependency, but keep /proc as a fallback for environments installed without it
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+def process_rss(pid: int) -> Optional[int]:
+    """Resident set size of a process in bytes, or None if it can't be determined."""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class WorkerHandle:
+    """Main-process view of one calc_worker process."""
+
+    def __init__(
+        self,
+        worker_id: int,
+        process: Process,
+        inbox: Queue,
+        ready_event,
+        cancel_seq,
+        cancel_reason,
+        standby: bool = False,
+    ):
+        self.worker_id = worker_id
+        self.process = process
+        self.inbox = inbox  # Tasks assigned to this worker only
+        self.ready_event = ready_event
+        self.started_at = time.time()
+        self.current: Optional[dict] = None  # Task being executed
+        self.current_since: Optional[float] = None
+        self.current_seq: Optional[int] = None  # Dispatch sequence number of the current task
+        self.cancel_seq = cancel_seq  # Shared with the worker, see cancel_checkpoint
+        self.cancel_reason = cancel_reason
+        self.cancel_requested_at: Optional[float] = None
+        self.standby = standby  # Warmed spare: takes no tasks until promoted
+        self.retiring = False  # Being replaced: don't assign new tasks
+        self.draining = False  # Over the memory ceiling: replaced once the current task finishes
+        self.rss: Optional[int] = None
+        self.warmup: dict[str, float] = {}  # Seconds per warm-up phase, reported by the worker
+        self.time_to_ready: Optional[float] = None  # Spawn to ready, including process start and imports
+
+    @property
+    def state(self) -> str:
+        if not self.process.is_alive():
+            return "offline"
+        if not self.ready_event.is_set():
+            return "initializing"
+        if self.retiring:
+            return "retiring"
+        return "busy" if self.current else "ready"
+
+    @property
+    def accepts_tasks(self) -> bool:
+        return (
+            self.current is None and not (self.standby or self.retiring or self.draining) and self.ready_event.is_set()
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "pid": self.process.pid,
+            "role": "standby" if self.standby else "active",
+            "state": self.state,
+            "started_at": self.started_at,
+            "time_to_ready": self.time_to_ready,
+            "warmup": self.warmup,
+            "rss_bytes": self.rss,
+            "draining": self.draining,
+            "cancelling": self.cancel_requested_at is not None,
+            "task_id": self.current["task_id"] if self.current else None,
+            "task_type": self.current["params"].get("task_type") if self.current else None,
+            "running_for": time.time() - self.current_since if self.current_since else None,
+        }
+
+
+class WorkerPool:
+    """
+    Pool of warmed calc_worker processes fed by a central TaskScheduler.
+
+    Every worker has its own inbox, so the dispatcher thread in the FastAPI process decides which
+    task runs where: per-task_type concurrency limits and fairness across target_ids are enforced
+    before a task is handed out, and a slow 'pricing' run no longer blocks other task types.
+
+    Optionally one extra standby worker is kept warmed up in the background. Restarts, crashes and
+    memory-ceiling recycles swap it in immediately instead of waiting for a fresh warm-up.
+    """
+
+    def __init__(
+        self,
+        shared_dir: str,
+        user_name: str,
+        size: int = 2,
+        type_limits: Optional[dict[str, int]] = None,
+        sync_requests=None,
+        lazy_engines: tuple = (),
+        standby: bool = False,
+        memory_limit: Optional[int] = None,
+        memory_check_interval: float = 5.0,
+        timeouts: Optional[dict[str, float]] = None,
+        cancel_grace: float = 10.0,
+        max_requeues: int = 1,
+        worker_target: Callable = calc_worker,
+    ):
+        """
+        Args:
+            shared_dir (str): Root directory of the shared drive (passed to workers).
+            user_name (str): Identifier of the current PC user.
+            size (int): Number of worker processes taking tasks.
+            type_limits (dict): Maximum concurrently running tasks per task_type.
+            sync_requests (multiprocessing.Queue): Queue to the FileSyncer, see calc_worker.
+            lazy_engines (tuple): Task types whose engine is warmed up on first use, see calc_worker.
+            standby (bool): Keep one pre-warmed spare worker for instant replacement.
+            memory_limit (int): RSS in bytes above which a worker is recycled after its current task.
+            memory_check_interval (float): Seconds between RSS samples of the workers.
+            timeouts (dict): Maximum run time in seconds per task_type before the task is cancelled.
+            cancel_grace (float): Seconds a task may ignore a cancellation before its worker is replaced.
+            max_requeues (int): How often a task whose worker died or was restarted is queued again.
+            worker_target (Callable): Worker process entry point (calc_worker signature).
+        """
+        self.shared_dir = shared_dir
+        self.user_name = user_name
+        self.size = size
+        self.sync_requests = sync_requests
+        self.lazy_engines = tuple(lazy_engines)
+        self.standby_enabled = standby
+        self.memory_limit = memory_limit
+        self.memory_check_interval = memory_check_interval
+        self.timeouts = timeouts or {}
+        self.cancel_grace = cancel_grace
+        self.max_requeues = max_requeues
+        self.worker_target = worker_target
+        self.scheduler = TaskScheduler(type_limits)  # Priority classes, aging and deadlines
+
+        self.results = Queue()  # Messages from workers back to the dispatcher
+        self._workers: dict[int, WorkerHandle] = {}
+        self._standby: Optional[WorkerHandle] = None
+        self._ids = itertools.count(1)
+        self._seqs = itertools.count(1)
+        self._status_writer: Optional[StatusManager] = None
+        self._status_writes: list[tuple[dict, str, str]] = []  # Queued under the lock, written after releasing it
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._dispatcher = threading.Thread(target=self._run, name="worker-dispatcher", daemon=True)
+        self._recycling = False
+        self._recycler: Optional[threading.Thread] = None
+        self._last_memory_check = 0.0
+        self._last_position_report = 0.0
+        self._reported_positions: dict[str, int] = {}  # task_id -> position last written to its status file
+        # task_id -> (inbox, message) held back while its 'pending' status is being written, see _dispatch
+        self._position_writes: dict[str, Optional[tuple[Queue, dict]]] = {}
+        self.position_report_interval = 2.0
+        self.position_report_limit = 20  # Exact positions are written for the first N waiting tasks only
+        self.memory_recycles = 0
+        self.coalesced = 0  # Duplicate submissions merged into a waiting task
+        self.attached = 0  # Duplicate submissions of an already running task
+
+    def start(self):
+        if self.memory_limit and process_rss(os.getpid()) is None:
+            logger.error(
+                f"WorkerPool: memory_limit is {self.memory_limit / 1024**2:.0f} MiB but worker RSS can't be measured "
+                "on this system (install psutil); workers will not be recycled on memory"
+            )
+        with self._lock:
+            for _ in range(self.size):
+                self._spawn()
+            self._ensure_standby()
+        self._dispatcher.start()
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            handles = list(self._workers.values())
+            for handle in handles:
+                handle.retiring = True  # Not a crash: don't respawn
+        for handle in handles:
+            if handle.process.is_alive():
+                handle.process.terminate()
+                handle.process.join()
+        for thread in (self._dispatcher, self._recycler):
+            if thread is not None and thread.is_alive():
+                thread.join(timeout=2.0)
+
+    def submit(self, task_info: dict) -> str:
+        """
+        Queues a task ({"task_id", "params"}, optionally "priority" and "deadline", see TaskScheduler)
+        and hands it to an idle worker if limits allow. A task that has to wait gets a 'pending'
+        status with its queue position. Duplicate submissions are coalesced instead of computing
+        the same task again.
+
+        Returns:
+            str: 'accepted' if queued, 'coalesced' if merged into the same waiting task,
+                'attached' if the same task with the same params is already running.
+        """
+        with self._lock:
+            running = self._running_task(task_info["task_id"])
+            queued = task_info["task_id"] in self.scheduler
+            if running is not None and running["params"] == task_info["params"] and not queued:
+                self.attached += 1
+                return "attached"
+            if not self.scheduler.push(task_info):
+                self.coalesced += 1
+                return "coalesced"
+            self._dispatch()
+        self._report_positions()
+        return "accepted"
+
+    def position(self, task_id: str) -> Optional[int]:
+        """1-based position of a waiting task in the dispatch order, None if it isn't waiting."""
+        with self._lock:
+            return next((i for i, t in enumerate(self.scheduler.pending(), 1) if t["task_id"] == task_id), None)
+
+    def is_active(self, task_id: str) -> bool:
+        """Whether the task is waiting or running on this pool."""
+        with self._lock:
+            return task_id in self.scheduler or self._running_task(task_id) is not None
+
+    def can_start(self, task_info: dict) -> bool:
+        """Whether the task would start right away: an idle worker is free after everything already waiting."""
+        with self._lock:
+            idle = sum(1 for h in self._workers.values() if h.accepts_tasks)
+            return idle > len(self.scheduler) and self.scheduler.can_run(task_info)
+
+    def queue(self) -> dict:
+        """Waiting tasks in dispatch order and running tasks, for /tasks/queue."""
+        with self._lock:
+            now = time.time()
+            pending = [
+                {
+                    "position": i,
+                    "task_id": t["task_id"],
+                    "priority": t["priority"],
+                    "effective_priority": self.scheduler.effective_priority(t, now),
+                    "deadline": t["deadline"],
+                    "enqueued_at": t["enqueued_at"],
+                    "waited": now - t["enqueued_at"],
+                    "attempts": t.get("attempts", 0),
+                    "params": t["params"],
+                }
+                for i, t in enumerate(self.scheduler.pending(), 1)
+            ]
+            running = [
+                {
+                    "task_id": h.current["task_id"],
+                    "worker_id": h.worker_id,
+                    "priority": h.current["priority"],
+                    "running_for": now - h.current_since,
+                    "params": h.current["params"],
+                }
+                for h in self._workers.values()
+                if h.current
+            ]
+            return {"pending": pending, "running": running}
+
+    def cancel(self, task_id: str) -> Optional[str]:
+        """
+        Cancels a task without restarting the pool: a waiting task is dropped from the queue,
+        a running one is asked to stop at its next engine checkpoint.
+
+        Returns:
+            str: 'cancelled' (was waiting), 'cancelling' (running), or None if the task is unknown.
+        """
+        with self._lock:
+            task_info = self.scheduler.remove(task_id)
+            if task_info is None:
+                handle = next(
+                    (h for h in self._workers.values() if h.current and h.current["task_id"] == task_id), None
+                )
+                if handle is None:
+                    return None
+                self._request_cancel(handle, CANCEL_BY_USER)
+                return "cancelling"
+        self._write_status(task_info, "cancelled", "Cancelled before it started.")
+        return "cancelled"
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "workers": [h.to_dict() for h in self._workers.values()],
+                "pending": len(self.scheduler),
+                "running": self.scheduler.running_counts(),
+                "type_limits": self.scheduler.type_limits,
+                "recycling": self._recycling,
+                "memory_limit": self.memory_limit,
+                "memory_recycles": self.memory_recycles,
+                "coalesced": self.coalesced,
+                "attached": self.attached,
+            }
+
+    def recycle(self) -> Optional[int]:
+        """
+        Restarts all active workers one at a time: each is replaced by the warmed standby (or a
+        fresh worker once that has warmed up) before it is terminated, so the pool never goes offline.
+
+        Returns:
+            int: PID of the first replacement process (None if a recycle is already running).
+        """
+        with self._lock:
+            if self._recycling:
+                return None
+            self._recycling = True
+            old_ids = [worker_id for worker_id, h in self._workers.items() if not h.standby]
+            first = self._take_replacement()
+        self._recycler = threading.Thread(target=self._rolling_restart, args=(old_ids, first), daemon=True)
+        self._recycler.start()
+        return first.process.pid
+
+    def _rolling_restart(self, old_ids: list[int], replacement: WorkerHandle):
+        try:
+            for i, worker_id in enumerate(old_ids):
+                if i > 0:
+                    with self._lock:
+                        replacement = self._take_replacement()
+                # Wait for the replacement before taking the old worker away
+                while not replacement.ready_event.wait(timeout=1.0):
+                    if self._stop_event.is_set():
+                        return
+                    if not replacement.process.is_alive():
+                        logger.error(f"WorkerPool: Replacement worker {replacement.worker_id} failed to start")
+                        return
+                with self._lock:
+                    old = self._workers.get(worker_id)
+                    if old is None:
+                        continue
+                    old.retiring = True
+                self._retire(old)
+                self._flush_statuses()
+                logger.info(f"WorkerPool: Worker {worker_id} replaced by {replacement.worker_id}")
+        finally:
+            with self._lock:
+                self._recycling = False
+
+    def _running_task(self, task_id: str) -> Optional[dict]:
+        return next((h.current for h in self._workers.values() if h.current and h.current["task_id"] == task_id), None)
+
+    def _spawn(self, standby: bool = False) -> WorkerHandle:
+        worker_id = next(self._ids)
+        inbox = Queue()
+        ready_event = Event()
+        cancel_seq = Value("q", 0)
+        cancel_reason = Value("i", 0)
+        process = Process(
+            target=self.worker_target,
+            args=(
+                inbox,
+                self.shared_dir,
+                self.user_name,
+                ready_event,
+                self.sync_requests,
+                self.results,
+                worker_id,
+                self.lazy_engines,
+                cancel_seq,
+                cancel_reason,
+            ),
+            daemon=True,
+        )
+        process.start()
+        handle = WorkerHandle(worker_id, process, inbox, ready_event, cancel_seq, cancel_reason, standby=standby)
+        self._workers[worker_id] = handle
+        role = "Standby worker" if standby else "Worker"
+        logger.info(f"WorkerPool: {role} {worker_id} started with PID {process.pid}")
+        return handle
+
+    def _ensure_standby(self):
+        if self.standby_enabled and self._standby is None and not self._stop_event.is_set():
+            self._standby = self._spawn(standby=True)
+
+    def _take_replacement(self) -> WorkerHandle:
+        """Promotes the standby (warm, or at least ahead of a fresh start), else spawns a new worker."""
+        handle = self._standby
+        self._standby = None
+        if handle is not None and handle.process.is_alive():
+            handle.standby = False
+            logger.info(f"WorkerPool: Standby worker {handle.worker_id} promoted")
+        else:
+            handle = self._spawn()
+        self._ensure_standby()
+        return handle
+
+    def _retire(self, handle: WorkerHandle, requeue: bool = True):
+        if handle.process.is_alive():
+            handle.process.terminate()
+            handle.process.join()
+        with self._lock:
+            self._release(handle, requeue)
+            self._workers.pop(handle.worker_id, None)
+
+    def _release(self, handle: WorkerHandle, requeue: bool = True):
+        """Frees the task of a worker that is gone. It is queued again (up to max_requeues) unless requeue is False."""
+        task_info = handle.current
+        if task_info is None:
+            return
+        self.scheduler.done(task_info)
+        cancelling = handle.cancel_requested_at is not None
+        handle.current = None
+        handle.current_since = None
+        handle.cancel_requested_at = None
+        if not requeue:
+            return
+        if cancelling:
+            self._queue_status(task_info, "cancelled", "Cancelled by user.")
+            return
+
+        attempts = task_info.get("attempts", 0) + 1
+        if attempts > self.max_requeues:
+            logger.warning(f"WorkerPool: Task {task_info['task_id']} lost with worker {handle.worker_id}")
+            self._queue_status(task_info, "failed", "Worker stopped while running the task.")
+            return
+        logger.warning(f"WorkerPool: Task {task_info['task_id']} requeued after losing worker {handle.worker_id}")
+        # Keeps enqueued_at, so the task doesn't lose its aging
+        self.scheduler.push({**task_info, "attempts": attempts})
+        self._queue_status(task_info, "pending", "Requeued after worker restart.")
+
+    def _request_cancel(self, handle: WorkerHandle, reason: int):
+        if handle.cancel_requested_at is not None:
+            return
+        # Reason first: the worker reads it as soon as it sees its sequence number
+        handle.cancel_reason.value = reason
+        handle.cancel_seq.value = handle.current_seq
+        handle.cancel_requested_at = time.monotonic()
+
+    def _enforce_timeouts(self):
+        """Cancels tasks over their task_type timeout; replaces workers whose task ignores the cancellation."""
+        now = time.time()
+        for handle in list(self._workers.values()):
+            task_info = handle.current
+            if task_info is None or handle.retiring:
+                continue
+            timeout = self.timeouts.get(task_info["params"].get("task_type"))
+            if timeout and now - handle.current_since > timeout:
+                if handle.cancel_requested_at is None:
+                    logger.warning(f"WorkerPool: Task {task_info['task_id']} timed out after {timeout:.0f}s")
+                self._request_cancel(handle, CANCEL_TIMEOUT)
+            if handle.cancel_requested_at is None or time.monotonic() - handle.cancel_requested_at < self.cancel_grace:
+                continue
+
+            # Hard fallback: the engine never reached a checkpoint
+            logger.error(
+                f"WorkerPool: Task {task_info['task_id']} ignored cancellation, replacing worker {handle.worker_id}"
+            )
+            timed_out = handle.cancel_reason.value == CANCEL_TIMEOUT
+            self._take_replacement()
+            handle.retiring = True
+            self._retire(handle, requeue=False)
+            if timed_out:
+                self._queue_status(task_info, "failed", f"Timed out after {timeout:.0f}s, worker restarted.")
+            else:
+                self._queue_status(task_info, "cancelled", "Cancelled by user, worker restarted.")
+
+    def _report_positions(self):
+        """Writes 'pending' statuses whose queue position changed, at most every position_report_interval."""
+        with self._lock:
+            pending = self.scheduler.pending()
+            updates = []
+            for position, task_info in enumerate(pending, 1):
+                position = min(position, self.position_report_limit + 1)  # Beyond the limit: written once
+                if self._reported_positions.get(task_info["task_id"]) != position:
+                    self._reported_positions[task_info["task_id"]] = position
+                    updates.append((task_info, position))
+            waiting = {t["task_id"] for t in pending}
+            self._reported_positions = {k: v for k, v in self._reported_positions.items() if k in waiting}
+            self._last_position_report = time.monotonic()
+
+        # Written outside the lock: the shared drive can be slow
+        for task_info, position in updates:
+            task_id = task_info["task_id"]
+            with self._lock:
+                if task_id not in self.scheduler:
+                    continue  # Dispatched meanwhile: its worker reports the status from now on
+                self._position_writes[task_id] = None
+            if position > self.position_report_limit:
+                message = f"Queued (position {self.position_report_limit}+)"
+            else:
+                message = f"Queued (position {position})"
+            try:
+                self._write_status(task_info, "pending", message)
+            finally:
+                with self._lock:
+                    held = self._position_writes.pop(task_id)
+                    if held is not None:
+                        inbox, task_message = held
+                        inbox.put(task_message)
+
+    def _queue_status(self, task_info: dict, status: str, message: str):
+        """Queues a status write (self._lock held); _flush_statuses writes it once the lock is released."""
+        self._status_writes.append((task_info, status, message))
+
+    def _flush_statuses(self):
+        """Writes the queued statuses outside the lock: the shared drive can be slow."""
+        with self._lock:
+            writes, self._status_writes = self._status_writes, []
+        for task_info, status, message in writes:
+            self._write_status(task_info, status, message)
+
+    def _write_status(self, task_info: dict, status: str, message: str):
+        """Writes a status on behalf of a task that its worker doesn't (yet or anymore) report."""
+        if self._status_writer is None:
+            on_write = self.sync_requests.put if self.sync_requests is not None else None
+            self._status_writer = StatusManager(self.shared_dir, on_write=on_write)
+        self._status_writer.update(
+            task_info["task_id"], status, self.user_name, params=task_info["params"], message=message
+        )
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                message = self.results.get(timeout=0.5)
+                with self._lock:
+                    self._handle_message(message)
+                    while True:
+                        self._handle_message(self.results.get_nowait())
+            except queue.Empty:
+                pass
+
+            if time.monotonic() - self._last_memory_check >= self.memory_check_interval:
+                self._last_memory_check = time.monotonic()
+                self._check_memory()
+
+            with self._lock:
+                self._reap_dead()
+                self._enforce_timeouts()
+                self._recycle_drained()
+            # Before dispatching: a requeued task's 'pending' must not land after its new worker's 'running'
+            self._flush_statuses()
+            with self._lock:
+                self._dispatch()
+
+            if time.monotonic() - self._last_position_report >= self.position_report_interval:
+                self._report_positions()
+
+    def _handle_message(self, message: dict):
+        handle = self._workers.get(message.get("worker_id"))
+        if handle is None:
+            return
+        if message.get("type") == "warmup":
+            handle.warmup = message["timings"]
+            if handle.time_to_ready is None:
+                handle.time_to_ready = time.time() - handle.started_at
+                logger.info(f"WorkerPool: Worker {handle.worker_id} ready in {handle.time_to_ready:.1f}s")
+        elif message.get("type") == "done" and handle.current and handle.current["task_id"] == message.get("task_id"):
+            self.scheduler.done(handle.current)
+            handle.current = None
+            handle.current_since = None
+            handle.cancel_requested_at = None
+
+    def _check_memory(self):
+        """Samples every worker's RSS and marks active workers above the memory ceiling for recycling."""
+        with self._lock:
+            handles = list(self._workers.values())
+        for handle in handles:
+            if handle.process.is_alive():
+                handle.rss = process_rss(handle.process.pid)
+        if not self.memory_limit:
+            return
+        with self._lock:
+            for handle in handles:
+                if handle.standby or handle.retiring or handle.draining or handle.rss is None:
+                    continue
+                if handle.rss > self.memory_limit:
+                    handle.draining = True
+                    logger.warning(
+                        f"WorkerPool: Worker {handle.worker_id} uses {handle.rss / 1024**2:.0f} MiB "
+                        f"(limit {self.memory_limit / 1024**2:.0f} MiB), recycling after its current task"
+                    )
+
+    def _recycle_drained(self):
+        for handle in list(self._workers.values()):
+            if not handle.draining or handle.current or handle.retiring:
+                continue
+            replacement = self._take_replacement()
+            handle.retiring = True
+            self._retire(handle)
+            self.memory_recycles += 1
+            logger.info(
+                f"WorkerPool: Worker {handle.worker_id} recycled for memory, replaced by {replacement.worker_id}"
+            )
+
+    def _reap_dead(self):
+        """Replaces workers that died unexpectedly (crash, OOM kill)."""
+        for handle in list(self._workers.values()):
+            if handle.retiring or handle.process.is_alive():
+                continue
+            logger.error(f"WorkerPool: Worker {handle.worker_id} (PID {handle.process.pid}) died, respawning")
+            self._release(handle)
+            del self._workers[handle.worker_id]
+            if handle is self._standby:
+                self._standby = None
+                self._ensure_standby()
+            else:
+                self._take_replacement()
+
+    def _dispatch(self):
+        for handle in self._workers.values():
+            if not handle.accepts_tasks:
+                continue
+            task_info = self.scheduler.pop()
+            if task_info is None:
+                return
+            handle.current = task_info
+            handle.current_since = time.time()
+            handle.current_seq = next(self._seqs)
+            handle.cancel_requested_at = None
+            message = {**task_info, "seq": handle.current_seq}
+            if task_info["task_id"] in self._position_writes:
+                # Its 'pending' status is being written: sent once that landed, so it can't follow 'running'
+                self._position_writes[task_info["task_id"]] = (handle.inbox, message)
+            else:
+                handle.inbox.put(message)
@@ -5,24 +5,39 @@ Handles the lifecycle of the background worker process and provides
 REST endpoints for the Next.js frontend to interact with the calculation engine.
 """
 
-import json
 import logging
 import os
 import pathlib
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from multiprocessing import Event, Process, Queue
+from multiprocessing import Queue
 from os.path import expanduser
+from typing import Literal, Optional
 
-import portalocker
-from fastapi import FastAPI, HTTPException, Request
+import pandas as pd
+import pyarrow as pa
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 
-from app.core.data_manager import DataManager
+from app.core.blocking_io import BlockingIO, offload
+from app.core.compaction import CompactionScheduler, SnapshotCompactor, run_in_subprocess
+from app.core.data_manager import DataManager, decode_cursor, diff_keys, encode_cursor, parse_predicate
+from app.core.event_store import UserEventStore
+from app.core.formats import (
+    ARROW_STREAM_MEDIA_TYPE,
+    frame_to_columns_json,
+    frame_to_records_json,
+    params_hash,
+    table_to_arrow_ipc,
+)
 from app.core.status import StatusManager
+from app.core.status_stream import StatusBroadcaster
 from app.core.syncer import FileSyncer
-from app.core.worker import calc_worker
+from app.core.task_broker import BrokerConsumer, FileTaskBroker
+from app.core.worker_pool import WorkerPool
 from app.schemas.task import TaskParams, TaskStatus, UserEvent
+from app.services.portfolio_data_manager import data_types_for
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
@@ -38,7 +53,41 @@ LOCAL_DIR = str(dev_dir / "TypeScript" / "Local")
 USER_NAME = os.getlogin()
 # Directly write to the shared drive as this should be small and not frequent
 USER_DATA_DIR = pathlib.Path(SHARED_DIR) / "user_data"
-USER_EVENTS_FILE = USER_DATA_DIR / "user_events.json"
+# Worker pool: one warmed process per slot, and at most N concurrent tasks of a given task_type
+WORKER_POOL_SIZE = max(1, min(4, (os.cpu_count() or 2) // 2))
+TASK_TYPE_LIMITS = {"pricing": 2}
+# Rarely used engines warmed up on first use instead of at worker start, e.g. ("guideline",)
+LAZY_ENGINES: tuple[str, ...] = ()
+# Opt-in result freshness per task_type (seconds): /run-task returns the latest snapshot instead of
+# recomputing when it was computed from identical params within this age. Absent task_types always recompute.
+FRESHNESS_MAX_AGE: dict[str, float] = {"event": 3600, "guideline": 900}
+# Maximum run time per task_type (seconds) before a task is cancelled at its next engine checkpoint
+TASK_TIMEOUTS: dict[str, float] = {"pricing": 1800, "event": 600, "guideline": 600}
+# Keep a pre-warmed spare worker so restarts and crash recovery don't wait for a warm-up
+STANDBY_WORKER = True
+# Recycle a worker once its RSS exceeds this many bytes (None to disable)
+WORKER_MEMORY_LIMIT: Optional[int] = 2 * 1024**3
+# Distributed mode: /run-task publishes to a team-wide queue on the shared drive and any PC with an
+# idle warmed worker claims it (see FileTaskBroker). Every PC of the team needs it enabled.
+DISTRIBUTED_MODE = False
+# Seconds after which a task claimed by a PC that stopped renewing its lease is handed to another PC
+BROKER_LEASE_SECONDS = 60.0
+# Snapshot compaction: per-run files older than a day are folded into per-day partitions under _history/
+SNAPSHOT_COMPACTION_INTERVAL: Optional[float] = 6 * 3600  # Seconds between runs (None to disable)
+SNAPSHOT_RETENTION_DAYS: Optional[float] = None  # Delete snapshots older than this (None keeps everything)
+
+# Blocking I/O of the endpoints runs on a shared thread pool, with at most N concurrent calls per
+# resource so slow reads of one kind (e.g. parquet on a slow share) can't starve the others
+BLOCKING_IO_WORKERS = 16
+# Snapshot reads are CPU-bound (parquet decoding, JSON encoding under the GIL):
+# more of them than cores only adds latency
+BLOCKING_IO_LIMITS = {
+    "snapshots": max(2, min(4, (os.cpu_count() or 2) // 2)),
+    "status": 4,
+    "tasks": 2,
+    "user_events": 2,
+    "compaction": 1,
+}
 
 # To save under app.state
 state = {}
@@ -51,44 +100,100 @@ async def lifespan(app: FastAPI):
     Before yield => on startup
     After yield => on shutdown
     """
-    # Monitor Worker's readiness
-    ready_event = Event()
+    app.state.blocking_io = BlockingIO(BLOCKING_IO_WORKERS, BLOCKING_IO_LIMITS)
 
     # Initialize managers
     # StatusManager and DataManager will monitor local mirror of shared
     app.state.status_manager = StatusManager(LOCAL_DIR)
     app.state.data_manager = DataManager(LOCAL_DIR)
+    # User events are written by every PC, so they are read from the shared drive, not the mirror
+    app.state.user_events = UserEventStore(str(USER_DATA_DIR))
+
+    # Single watcher of the status index pushing changes to every streaming client
+    status_broadcaster = StatusBroadcaster(app.state.status_manager)
+    status_broadcaster.start()
+    app.state.status_broadcaster = status_broadcaster
 
     # Start file syncer thread
-    syncer = FileSyncer(SHARED_DIR, LOCAL_DIR, interval=5)
+    # Files written by our own worker are pushed through sync_requests and mirrored immediately,
+    # teammates' changes are polled fast while tasks are active and backed off while idle
+    sync_requests = Queue()
+    # DataManager's snapshot index and cache are updated as soon as a file lands
+    syncer = FileSyncer(
+        SHARED_DIR,
+        LOCAL_DIR,
+        interval=5,
+        min_interval=1,
+        max_interval=30,
+        sync_requests=sync_requests,
+        on_file_synced=app.state.data_manager.on_file_synced,
+        on_file_removed=app.state.data_manager.on_file_removed,
+        arrow_sidecars=True,  # Memory-mapped zero-copy reads for DataManager
+    )
     syncer.start()
     app.state.syncer = syncer
+    app.state.sync_requests = sync_requests
+
+    # Start the worker pool
+    # Tasks are queued in the main process and handed to idle workers within per-task_type limits
+    worker_pool = WorkerPool(
+        SHARED_DIR,
+        USER_NAME,
+        size=WORKER_POOL_SIZE,
+        type_limits=TASK_TYPE_LIMITS,
+        sync_requests=sync_requests,
+        lazy_engines=LAZY_ENGINES,
+        standby=STANDBY_WORKER,
+        memory_limit=WORKER_MEMORY_LIMIT,
+        timeouts=TASK_TIMEOUTS,
+    )
+    worker_pool.start()
+    app.state.worker_pool = worker_pool
 
-    # Start a worker process
-    task_queue = Queue()  # Queue for IPC between FastAPI and Worker
-    worker_process = Process(target=calc_worker, args=(task_queue, SHARED_DIR, USER_NAME, ready_event), daemon=True)
-    worker_process.start()
-
-    # Save them to app.state, so each API endpoint can access
-    app.state.task_queue = task_queue
-    app.state.worker_process = worker_process
-    app.state.worker_ready_event = ready_event
-
-    logger.info(f"Worker process started with PID {worker_process.pid}")
+    # Compacts the shared snapshots in the background (one PC at a time, see SnapshotCompactor),
+    # each run in a child process so rewriting parquet doesn't compete with requests for the GIL
+    app.state.compactor = SnapshotCompactor(
+        SHARED_DIR, retention_days=SNAPSHOT_RETENTION_DAYS, on_write=sync_requests.put
+    )
+    app.state.compaction_scheduler = None
+    if SNAPSHOT_COMPACTION_INTERVAL:
+        compaction_scheduler = CompactionScheduler(app.state.compactor, interval=SNAPSHOT_COMPACTION_INTERVAL)
+        compaction_scheduler.start()
+        app.state.compaction_scheduler = compaction_scheduler
+
+    app.state.task_broker = None
+    app.state.broker_consumer = None
+    if DISTRIBUTED_MODE:
+        task_broker = FileTaskBroker(
+            SHARED_DIR,
+            lease_seconds=BROKER_LEASE_SECONDS,
+            status_manager=StatusManager(SHARED_DIR, on_write=sync_requests.put),
+            user_name=USER_NAME,
+        )
+        broker_consumer = BrokerConsumer(task_broker, worker_pool)
+        broker_consumer.start()
+        app.state.task_broker = task_broker
+        app.state.broker_consumer = broker_consumer
 
     yield  # FastAPI starts up here and wait for a request
 
     # Cleanup on FastAPI's shutdown
-    logger.info("Worker process shutting down. Cleaning up resources...")
-    if app.state.worker_process.is_alive():
-        app.state.worker_process.terminate()
-        app.state.worker_process.join()
+    logger.info("Worker processes shutting down. Cleaning up resources...")
+    if app.state.broker_consumer is not None:
+        app.state.broker_consumer.stop()  # Hands claimed tasks back to the team first
+    app.state.worker_pool.stop()
+    if app.state.compaction_scheduler is not None:
+        app.state.compaction_scheduler.stop()
+
+    await app.state.status_broadcaster.stop()
 
     # Stop syncer's thread
     if hasattr(app.state.syncer, "stop"):
         app.state.syncer.stop()
 
-    logger.info("Worker process cleanup complete")
+    app.state.blocking_io.shutdown()
+
+    logger.info("Worker processes cleanup complete")
 
 
 # Set lifespan on app creation
@@ -99,27 +204,100 @@ app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allo
 
 
 @app.post("/run-task")
-async def run_task(params: TaskParams, request: Request):
+@offload("tasks")
+def run_task(
+    params: TaskParams,
+    request: Request,
+    reuse: bool = False,
+    max_age: float = Query(300, ge=0),
+    force: bool = False,
+    priority: Optional[Literal["interactive", "background", "batch"]] = None,
+    deadline: Optional[float] = Query(None, ge=0),
+):
     """
-    Submits a task to the local worker queue.
+    Submits a task to the local worker pool.
     The task_id is generated by combining target_id and task_type.
+
+    Duplicate submissions never compute twice: a request for a task that is already waiting is
+    'coalesced' into it, and one for the same task running with the same params is 'attached' to it.
+    With 'reuse=true', a teammate's identical task that is running, or finished within 'max_age'
+    seconds, is returned as 'reused' instead of being computed again.
+
+    For task_types with a freshness policy (FRESHNESS_MAX_AGE), the latest snapshots are returned
+    as 'fresh' if they were computed from identical params recently enough, unless 'force=true'.
+
+    Waiting tasks are ordered by 'priority' (default 'interactive', 'batch' for multi-target tasks)
+    and by 'deadline' (seconds from now) once it comes close. A task that has to wait returns its
+    queue 'position' and shows 'pending' until a worker picks it up.
+
+    In distributed mode the task is 'published' to the team-wide queue instead, and runs on
+    whichever PC has an idle worker first.
     """
-    task_id = f"{params.target_id}_{params.task_type}_{USER_NAME}"
-    try:
-        request.app.state.task_queue.put(
-            {
+    task_id = f"{params.task_target()}_{params.task_type}_{USER_NAME}"
+    task_params = params.model_dump()  # Convert Pydantic to dict for Queue
+    fresh_max_age = FRESHNESS_MAX_AGE.get(params.task_type)
+    if fresh_max_age is not None and not force:
+        key = params_hash(task_params)
+        snapshots = {
+            data_type: request.app.state.data_manager.find_fresh_snapshot(
+                data_type, params.target_id, key, fresh_max_age
+            )
+            for data_type in data_types_for(params.task_type)
+        }
+        if all(snapshots.values()):
+            return {
+                "status": "fresh",
                 "task_id": task_id,
-                "params": params.model_dump(),  # Convert Pydantic to dict for Queue
+                "snapshots": {data_type: s["filename"] for data_type, s in snapshots.items()},
+                "computed_at": min(s["computed_at"] for s in snapshots.values()),
             }
-        )
-        return {"status": "accepted", "task_id": task_id}
+
+    if reuse:
+        existing = request.app.state.status_manager.find_reusable(task_params, max_age)
+        if existing is not None:
+            return {
+                "status": "reused",
+                "task_id": existing["task_id"],
+                "user": existing["user"],
+                "task_status": existing["status"],
+            }
+
+    task_info = {
+        "task_id": task_id,
+        "params": task_params,
+        "priority": priority or ("batch" if params.target_ids else "interactive"),
+        "deadline": datetime.now().timestamp() + deadline if deadline is not None else None,
+    }
+    task_broker = request.app.state.task_broker
+    if task_broker is not None:
+        try:
+            task_broker.publish(task_info)
+        except OSError as e:
+            logger.error(f"Failed to publish task: {e}")
+            raise HTTPException(status_code=503, detail="Shared task queue is not reachable")
+        request.app.state.broker_consumer.wake()
+        request.app.state.syncer.request_sync()
+        return {"status": "published", "task_id": task_id}
+
+    try:
+        pool = request.app.state.worker_pool
+        result = pool.submit(task_info)
+        if result == "accepted":
+            # Poll the share fast while our task is running
+            request.app.state.syncer.request_sync()
+        response = {"status": result, "task_id": task_id}
+        position = pool.position(task_id)
+        if position is not None:
+            response["position"] = position
+        return response
     except Exception as e:
         logger.error(f"Failed to submit task: {e}")
         raise HTTPException(status_code=500, detail="Internal worker queue error")
 
 
 @app.get("/tasks/status", response_model=list[TaskStatus])
-async def get_all_task_statuses(request: Request):
+@offload("status")
+def get_all_task_statuses(request: Request):
     """
     Returns the status of all tracked tasks in the team's shared directory.
     Used by the Global Task Monitor (Dropdown).
@@ -127,25 +305,80 @@ async def get_all_task_statuses(request: Request):
     return request.app.state.status_manager.get_all_statuses()
 
 
+@app.get("/tasks/stream")
+async def stream_task_statuses(request: Request, task: list[str] | None = Query(None)):
+    """
+    Server-Sent Events stream of task status changes, replacing per-widget polling.
+    Subscribe to specific tasks with repeated 'task=<target_id>:<task_type>' parameters, or to all tasks if omitted.
+    Sends an initial 'snapshot' event, then 'status' / 'removed' events only when a status actually changes.
+    """
+    tasks = None
+    if task:
+        if not all(":" in t for t in task):
+            raise HTTPException(status_code=400, detail="task must be '<target_id>:<task_type>'")
+        tasks = {tuple(t.split(":", 1)) for t in task}
+
+    broadcaster = request.app.state.status_broadcaster
+    subscription = broadcaster.subscribe(tasks)
+
+    async def events():
+        try:
+            async for chunk in broadcaster.stream(subscription):
+                if await request.is_disconnected():
+                    break
+                yield chunk
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/tasks/queue")
+@offload("tasks")
+def get_task_queue(request: Request):
+    """
+    Returns this PC's waiting tasks in dispatch order (with priority after aging, deadline and
+    time waited) and the tasks currently running on the worker pool.
+    """
+    return request.app.state.worker_pool.queue()
+
+
+@app.post("/tasks/{task_id}/cancel")
+@offload("tasks")
+def cancel_task(task_id: str, request: Request):
+    """
+    Cancels one of this PC's tasks without restarting the worker pool.
+    A waiting task is removed from the queue ('cancelled'); a running task stops at its next
+    engine checkpoint ('cancelling') and its status file then shows 'cancelled'.
+    In distributed mode, a task still waiting in the team-wide queue can be withdrawn as well.
+    """
+    result = request.app.state.worker_pool.cancel(task_id)
+    task_broker = request.app.state.task_broker
+    if result is None and task_broker is not None and task_broker.withdraw(task_id):
+        result = "cancelled"
+    if result is None:
+        raise HTTPException(status_code=404, detail="Task is not queued or running on this worker pool")
+    return {"status": result, "task_id": task_id}
+
+
 @app.get("/tasks/{target_id}/{task_type}/status", response_model=TaskStatus)
-async def get_task_status(target_id: str, task_type: str, request: Request):
+@offload("status")
+def get_task_status(target_id: str, task_type: str, request: Request):
     """
     Returns status for a specific task. Used for widget-level polling.
     """
-    all_statuses = request.app.state.status_manager.get_all_statuses()
-    relevant = [
-        s for s in all_statuses if s["params"]["target_id"] == target_id and s["params"]["task_type"] == task_type
-    ]
-    if not relevant:
+    # Indexed by (target_id, task_type), 'running' first then the latest 'last_heartbeat'
+    status = request.app.state.status_manager.get_task_status(target_id, task_type)
+    if status is None:
         raise HTTPException(status_code=404, detail="No status found for this task")
-
-    # Sort by 'last_heartbeat' and status ('running' at top)
-    relevant.sort(key=lambda x: (x["status"] == "running", x["last_heartbeat"]), reverse=True)
-    return relevant[0]
+    return status
 
 
 @app.get("/data/{target_id}/{data_type}/snapshots")
-async def get_data_snapshots(target_id: str, data_type: str, request: Request):
+@offload("snapshots")
+def get_data_snapshots(target_id: str, data_type: str, request: Request):
     """
     Returns a list of available parquet snapshot filenames for a data type.
     """
@@ -154,45 +387,178 @@ async def get_data_snapshots(target_id: str, data_type: str, request: Request):
 
 
 @app.get("/data/{target_id}/{data_type}/content")
-async def get_data_content(target_id: str, data_type: str, request: Request, version: str = "latest"):
+@offload("snapshots")
+def get_data_content(
+    target_id: str,
+    data_type: str,
+    request: Request,
+    version: str = "latest",
+    format: Optional[Literal["records", "columns", "arrow"]] = None,
+    columns: Optional[str] = None,
+    where: Optional[list[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+):
     """
     Returns the actual content of a parquet snapshot as a JSON-serializable list.
     Supports historical data retrieval via the 'version' query parameter.
+
+    The response format is negotiated via 'format' (or the Accept header for Arrow):
+    - records (default): {"data": [{col: value, ...}, ...], "version": filename, "next_cursor": ...}
+    - columns: {"columns": [...], "num_rows": n, "version": filename, "next_cursor": ..., "data": {col: [values]}}
+    - arrow: Arrow IPC stream bytes built directly from the Arrow table
+
+    Projection, filtering and paging are pushed down into the parquet read:
+    - columns: comma-separated column names, e.g. 'columns=field,value'
+    - where: repeatable predicates, e.g. 'where=field=PX_LAST&where=date>=2025-01-01'
+    - limit/offset, or the opaque 'cursor' returned as next_cursor (also in the X-Next-Cursor header)
     """
     data_manager = request.app.state.data_manager
+    if format is None:
+        format = "arrow" if ARROW_STREAM_MEDIA_TYPE in request.headers.get("accept", "") else "records"
     try:
-        if version == "latest":
-            data = data_manager.get_latest_data(data_type, target_id)
+        if cursor:
+            version, offset = decode_cursor(cursor)
+        selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+        filters = [parse_predicate(w) for w in where] if where else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        filename = data_manager.resolve_version(data_type, target_id, version)
+        if format == "arrow":
+            data = (
+                data_manager.load_table(data_type, target_id, filename, selected, filters) if filename else pa.table({})
+            )
+            total = data.num_rows
         else:
-            df = data_manager.load_parquet(data_type, target_id, version)
-            data = df.to_dict(orient="records")
-        return {"data": data}
+            data = (
+                data_manager.load_parquet(data_type, target_id, filename, selected, filters)
+                if filename
+                else pd.DataFrame()
+            )
+            total = len(data)
+
+        next_cursor = encode_cursor(filename, offset + limit) if limit and offset + limit < total else None
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+
+        if format == "arrow":
+            page = data.slice(offset, limit)
+            return Response(content=table_to_arrow_ipc(page), media_type=ARROW_STREAM_MEDIA_TYPE, headers=headers)
+
+        page = data.iloc[offset : offset + limit] if limit else data.iloc[offset:]
+        if format == "columns":
+            content = frame_to_columns_json(page, meta={"version": filename, "next_cursor": next_cursor})
+            return Response(content=content, media_type="application/json", headers=headers)
+        content = frame_to_records_json(page, meta={"version": filename, "next_cursor": next_cursor})
+        return Response(content=content, media_type="application/json", headers=headers)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Snapshot file not found")
+    except ValueError as e:
+        # Unknown columns or values that don't match a column's type
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error reading parquet: {e}")
         raise HTTPException(status_code=500, detail="Error processing data file")
 
 
-@app.post("/stop-worker")
-async def stop_worker(request: Request):
+@app.get("/data/{target_id}/{data_type}/diff")
+@offload("snapshots")
+def get_data_diff(
+    target_id: str,
+    data_type: str,
+    request: Request,
+    from_version: str = Query(..., alias="from"),
+    to: str = "latest",
+    format: Optional[Literal["records", "columns", "arrow"]] = None,
+):
     """
-    Manually restarts the worker process to clear memory or recover from hangs.
+    Returns only the rows that changed between two snapshots, so a client holding 'from' can refresh
+    to 'to' (default latest) without fetching the full table again.
+
+    Every row carries a 'change' column: 'added' and 'changed' rows hold their values in 'to',
+    'removed' rows their values in 'from'. Rows are matched on 'keys' (e.g. fund_id + field for prices).
+    Same formats as /content; the arrow format carries versions and keys in X-Diff-* headers.
     """
-    if request.app.state.worker_process.is_alive():
-        request.app.state.worker_process.terminate()
-        request.app.state.worker_process.join()
-
-    # Re-spawn the process with the existing queue
-    new_ready_event = Event()
-    new_process = Process(
-        target=calc_worker, args=(request.app.state.task_queue, SHARED_DIR, USER_NAME, new_ready_event), daemon=True
-    )
-    new_process.start()
-    request.app.state.worker_process = new_process
-    request.app.state.worker_ready_event = new_ready_event
+    data_manager = request.app.state.data_manager
+    if format is None:
+        format = "arrow" if ARROW_STREAM_MEDIA_TYPE in request.headers.get("accept", "") else "records"
+    to_version = data_manager.resolve_version(data_type, target_id, to)
+    if to_version is None:
+        raise HTTPException(status_code=404, detail="Snapshot file not found")
+    try:
+        diff = data_manager.load_diff(data_type, target_id, from_version, to_version)
+        meta = {"from": from_version, "to": to_version, "keys": diff_keys(diff)}
+        if format == "arrow":
+            headers = {"X-Diff-From": from_version, "X-Diff-To": to_version, "X-Diff-Keys": ",".join(meta["keys"])}
+            return Response(content=table_to_arrow_ipc(diff), media_type=ARROW_STREAM_MEDIA_TYPE, headers=headers)
+        data = diff.to_pandas()
+        if format == "columns":
+            return Response(content=frame_to_columns_json(data, meta=meta), media_type="application/json")
+        return Response(content=frame_to_records_json(data, meta=meta), media_type="application/json")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Snapshot file not found")
+    except ValueError as e:
+        # Malformed version names or snapshots whose schemas can't be compared
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error diffing snapshots: {e}")
+        raise HTTPException(status_code=500, detail="Error processing data files")
+
+
+@app.get("/data/{target_id}/{data_type}/history")
+@offload("snapshots")
+def get_data_history(
+    target_id: str,
+    data_type: str,
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: Optional[Literal["records", "columns", "arrow"]] = None,
+    columns: Optional[str] = None,
+    where: Optional[list[str]] = Query(None),
+    max_versions: Optional[int] = Query(None, ge=1),
+):
+    """
+    Returns the rows of every snapshot taken between 'start' and 'end' as one table, oldest first,
+    with a 'version' column holding the snapshot filename of each row.
+
+    Accepts the same 'format', 'columns' and 'where' parameters as /content; 'max_versions' keeps
+    only the newest N snapshots of the range. All snapshot files are scanned in a single parallel pass.
+    """
+    if format is None:
+        format = "arrow" if ARROW_STREAM_MEDIA_TYPE in request.headers.get("accept", "") else "records"
+    try:
+        selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+        filters = [parse_predicate(w) for w in where] if where else None
+        table = request.app.state.data_manager.load_history(
+            data_type, target_id, start, end, selected, filters, max_versions
+        )
+        if format == "arrow":
+            return Response(content=table_to_arrow_ipc(table), media_type=ARROW_STREAM_MEDIA_TYPE)
+        data = table.to_pandas()
+        if format == "columns":
+            return Response(content=frame_to_columns_json(data), media_type="application/json")
+        return Response(content=frame_to_records_json(data), media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error reading snapshot history: {e}")
+        raise HTTPException(status_code=500, detail="Error processing data files")
+
 
-    return {"status": "restarted", "new_pid": new_process.pid}
+@app.post("/stop-worker")
+@offload("tasks")
+def stop_worker(request: Request):
+    """
+    Manually restarts the worker processes to clear memory or recover from hangs.
+    Workers are replaced one at a time by the warmed standby, or after their replacement finished warming up.
+    """
+    new_pid = request.app.state.worker_pool.recycle()
+    if new_pid is None:
+        return {"status": "restarting", "new_pid": None}
+    return {"status": "restarted", "new_pid": new_pid}
 
 
 @app.get("/api/health")
@@ -206,61 +572,78 @@ async def health_check():
 
 
 @app.get("/system/worker-status")
-async def get_worker_status(request: Request):
-    process = request.app.state.worker_process
-    ready_event = request.app.state.worker_ready_event
-
-    is_alive = process.is_alive() if process else False
-    # Check if process is alive and also ready_event is set
-    is_ready = is_alive and ready_event.is_set()
+@offload("tasks")
+def get_worker_status(request: Request):
+    """
+    Returns the worker pool state. 'status' is 'ready' as soon as one worker can take tasks,
+    'workers' lists every process (active and standby) with its current task, RSS, time-to-ready
+    and warm-up phase timings.
+    """
+    pool_status = request.app.state.worker_pool.status()
+    broker_consumer = request.app.state.broker_consumer
+    alive = [w for w in pool_status["workers"] if w["role"] == "active" and w["state"] != "offline"]
+    ready = [w for w in alive if w["state"] in ("ready", "busy")]
     return {
-        "is_alive": is_alive,
-        "pid": process.pid if is_alive else None,
-        "status": "ready" if is_ready else "initializing" if is_alive else "offline",
+        "is_alive": bool(alive),
+        "pid": (ready or alive)[0]["pid"] if alive else None,
+        "status": "ready" if ready else "initializing" if alive else "offline",
+        **pool_status,
+        "broker": broker_consumer.status() if broker_consumer is not None else None,
     }
 
 
+@app.get("/system/sync-status")
+async def get_sync_status(request: Request):
+    """Returns the local mirror's sync statistics (last cycle, copy queue depth, throughput and lag)."""
+    return request.app.state.syncer.metrics()
+
+
+@app.get("/system/cache-status")
+async def get_cache_status(request: Request):
+    """Returns snapshot cache metrics (entries, bytes, hits, misses, evictions, invalidations)."""
+    return request.app.state.data_manager.cache.metrics()
+
+
+@app.get("/system/io-status")
+async def get_io_status(request: Request):
+    """Returns the blocking I/O pool's per-resource limits, running and waiting calls, and longest wait."""
+    return request.app.state.blocking_io.metrics()
+
+
+@app.get("/system/compaction-status")
+async def get_compaction_status(request: Request):
+    """Returns the statistics of the last scheduled snapshot compaction run."""
+    scheduler = request.app.state.compaction_scheduler
+    return {"enabled": scheduler is not None, "last_run": scheduler.last_run if scheduler else None}
+
+
+@app.post("/system/compact-snapshots")
+@offload("compaction")
+def compact_snapshots(request: Request):
+    """Runs snapshot compaction and retention now (skipped if another PC is compacting)."""
+    try:
+        return run_in_subprocess(request.app.state.compactor)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/data/user-events", response_model=list[UserEvent])
-async def get_user_events():
+@offload("user_events")
+def get_user_events(request: Request):
     """Get user input events from the shared"""
-    if not USER_EVENTS_FILE.exists():
-        return []
     try:
-        with open(USER_EVENTS_FILE, "r", encoding="utf-8") as f:
-            # Shared lock - allow multiple reads but one write
-            portalocker.lock(f, portalocker.LOCK_SH)
-            content = f.read()
-            return json.loads(content) if content else []
+        return request.app.state.user_events.all()
     except Exception as e:
         logger.error(f"Error reading user events: {e}")
         return []
 
 
 @app.post("/data/user-events")
-async def save_user_event(event: UserEvent):
-    """Write new event to JSON in the shared"""
-    USER_DATA_DIR.mkdir(parents=True, exist_ok=True)
+@offload("user_events")
+def save_user_event(event: UserEvent, request: Request):
+    """Add the event, or update the event with the same ID (one record appended to the shared log)"""
     try:
-        with open(USER_EVENTS_FILE, "a+", encoding="utf-8") as f:
-            portalocker.lock(f, portalocker.LOCK_EX)  # Exclusive lock
-            # Read from the top of the file
-            f.seek(0)
-            content = f.read()
-            events = json.loads(content) if content else []
-
-            # Update if ID exists, or add a new item
-            event_dict = event.model_dump()
-            existing_idx = next((i for i, e in enumerate(events) if e["event_id"] == event.event_id), None)
-            if existing_idx is not None:
-                events[existing_idx] = event_dict
-            else:
-                events.append(event_dict)
-
-            # Write to the file
-            f.seek(0)
-            f.truncate()
-            json.dump(events, f, indent=2, ensure_ascii=False)
-
+        request.app.state.user_events.upsert(event.model_dump())
         return {"status": "success"}
     except Exception as e:
         logger.error(f"Error saving user event: {e}")
@@ -268,23 +651,9 @@ async def save_user_event(event: UserEvent):
 
 
 @app.delete("/data/user-events/{event_id}")
-async def delete_user_event(event_id: str):
+@offload("user_events")
+def delete_user_event(event_id: str, request: Request):
     """Delete an event with ID"""
-    if not USER_EVENTS_FILE.exists():
+    if not request.app.state.user_events.delete(event_id):
         return {"status": "not_found"}
-
-    with open(USER_EVENTS_FILE, "a+", encoding="utf-8") as f:
-        portalocker.lock(f, portalocker.LOCK_EX)
-        f.seek(0)
-        content = f.read()
-
-        # Remove the item with the ID
-        events = json.loads(content) if content else []
-        new_events = [e for e in events if e["event_id"] != event_id]
-
-        # Write to the file
-        f.seek(0)
-        f.truncate()
-        json.dump(new_events, f, indent=2, ensure_ascii=False)
-
     return {"status": "deleted"}
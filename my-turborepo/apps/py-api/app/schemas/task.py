@@ -1,7 +1,8 @@
+import hashlib
 from datetime import datetime
-from typing import Any, Dict, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class TaskParams(BaseModel):
@@ -10,18 +11,41 @@ class TaskParams(BaseModel):
     target_id: str = Field(..., description="Target identifier (e.g., AAPL)")
     task_type: Literal["event", "guideline", "pricing"] = Field(..., description="Type of task")
     extra_params: Dict[str, Any] = Field(default_factory=dict, description="Additional library-specific arguments")
+    target_ids: Optional[List[str]] = Field(
+        None, description="Batch: run all these targets in one engine call, saved as one BATCH snapshot"
+    )
+
+    @model_validator(mode="after")
+    def _batch_target(self):
+        # A batch is written under BATCH with a primary_id column (ALL is kept for full-universe runs)
+        if self.target_ids:
+            self.target_id = "BATCH"
+        return self
+
+    def task_target(self) -> str:
+        """
+        Target part of the task_id. A batch is named after its set of targets, so two different
+        batches queued by the same user are two tasks instead of coalescing into one.
+        """
+        if not self.target_ids:
+            return self.target_id
+        digest = hashlib.sha1(",".join(sorted(set(self.target_ids))).encode()).hexdigest()[:12]
+        return f"BATCH-{digest}"
 
 
 class TaskStatus(BaseModel):
     """The shape of the JSON stored in the shared folder."""
 
     task_id: str = Field(..., description="Unique ID for the task")
-    status: Literal["pending", "running", "done", "failed"] = Field(..., description="Current status")
+    status: Literal["pending", "running", "done", "failed", "cancelled"] = Field(..., description="Current status")
     user: str = Field(..., description="The user/PC executing the task")
     progress: float = Field(0.0, ge=0.0, le=100.0)
     message: str = Field("", description="Display message for the UI")
     last_heartbeat: datetime = Field(..., description="Last update timestamp")
     params: TaskParams
+    timings: Optional[Dict[str, float]] = Field(
+        None, description="Seconds per phase of a finished task (queue_wait, compute, write)"
+    )
 
 
 class UserEvent(BaseModel):
@@ -1,10 +1,46 @@
 import logging
 import pathlib
+import threading
 import time
 from datetime import datetime
+from typing import Callable, Optional
+
+from app.core.formats import params_hash, with_snapshot_metadata
 
 logger = logging.getLogger(__name__)
 
+# Snapshot data_types written by each task_type (any other task_type writes a data_type of its own name)
+TASK_DATA_TYPES = {"pricing": ["prices", "fx_rates"], "event": ["calendar_events"]}
+# Share of the progress bar covered by the engine call, the rest is for writing snapshots
+COMPUTE_PROGRESS = 80.0
+
+
+def data_types_for(task_type: str) -> list[str]:
+    return TASK_DATA_TYPES.get(task_type, [task_type])
+
+
+# Heavy library state, loaded once per process and shared by every engine instance
+_libraries: Optional[dict] = None
+_libraries_lock = threading.Lock()
+
+
+def load_libraries() -> dict:
+    """
+    Imports the heavy calculation libraries once per process.
+    Concurrent callers wait for the first import instead of repeating it.
+    """
+    global _libraries
+    with _libraries_lock:
+        if _libraries is None:
+            import numpy as np
+            import pandas as pd
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            time.sleep(5)  # Simulate heavy imports
+            _libraries = {"np": np, "pd": pd, "pa": pa, "pq": pq}
+        return _libraries
+
 
 class PortfolioDataManager:
     """
@@ -12,65 +48,143 @@ class PortfolioDataManager:
     Simulates library initialization and execution based on task_type.
     """
 
-    def __init__(self, shared_dir: str):
+    # Simulated cost of one engine call, whether it covers one target or a batch
+    RUN_SECONDS = 5.0
+
+    def __init__(self, shared_dir: str, on_write: Optional[Callable[[str], None]] = None):
         """
         Initialization (Warm-up Phase).
         Imports heavy libraries here to keep them in the Worker's memory.
-        """
-        import numpy as np
-        import pandas as pd
+        The imports are shared across instances, see load_libraries().
 
-        time.sleep(5)  # Simulate heavy imports
+        Args:
+            shared_dir (str): Root path of the shared data directory.
+            on_write (Callable): Called with the path of every snapshot written.
+        """
+        libraries = load_libraries()
 
-        self.pd = pd
-        self.np = np
+        self.pd = libraries["pd"]
+        self.np = libraries["np"]
+        self.pa = libraries["pa"]
+        self.pq = libraries["pq"]
         self.shared_root = pathlib.Path(shared_dir)
+        self.on_write = on_write
 
         logger.info("PortfolioDataManager: Service initialized and libraries warmed up.")
 
-    def run(self, params: dict) -> str:
+    def run(
+        self,
+        params: dict,
+        on_progress: Optional[Callable[[float, str], None]] = None,
+        checkpoint: Optional[Callable[[], None]] = None,
+        timings: Optional[dict] = None,
+    ) -> str:
         """
         Mimics the execution of 'AnotherLibrary' functions based on task_type.
 
+        Every snapshot carries the params hash, compute time and duration in its parquet schema
+        metadata, so a later identical request can be answered without recomputing.
+
+        With 'target_ids', all targets are computed in one vectorised call and saved as a single
+        snapshot under BATCH with a 'primary_id' column, instead of one file per target. ALL only
+        receives full-universe runs, so a batch never becomes the latest snapshot of targets it
+        doesn't cover.
+
         Args:
-            params (dict): Should contain 'target_id', 'task_type', and 'extra_params'.
+            params (dict): Should contain 'target_id', 'task_type', and 'extra_params'
+                ('target_ids' for a batch).
+            on_progress (Callable): Called with (progress percent, message) while computing and as
+                targets are written. May be called often; the caller is responsible for throttling.
+            checkpoint (Callable): Called regularly; raises to abort the run (cancellation, timeout).
+            timings (dict): Filled with the seconds spent per phase ('compute', 'write').
         Returns:
             str: The absolute path to the generated Parquet file.
         """
         target_id = params.get("target_id") or "ALL"
         task_type = params.get("task_type", "pricing")
-
-        time.sleep(5)  # Simulate heavy task
-
-        data_types = []
-        if task_type == "pricing":
-            data_types = ["prices", "fx_rates"]
-        elif task_type == "event":
-            data_types = ["calendar_events"]
-        else:
-            data_types = [task_type]
+        target_ids = params.get("target_ids") or []
+        if target_ids:
+            target_id = "BATCH"
+
+        timings = {} if timings is None else timings
+        start = time.perf_counter()
+        self._simulate_work(self.RUN_SECONDS, checkpoint, on_progress)  # Simulate heavy task
+        compute_seconds = time.perf_counter() - start
+        timings["compute"] = compute_seconds
+        write_start = time.perf_counter()
+
+        data_types = data_types_for(task_type)
+        metadata = {
+            "params_hash": params_hash(params),
+            "computed_at": datetime.now().isoformat(),
+            "compute_seconds": f"{compute_seconds:.3f}",
+        }
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        print(f"Target ID: {target_id}")
+        print(f"Target ID: {target_id}" + (f" ({len(target_ids)} targets)" if target_ids else ""))
         print(f"Task type: {task_type}")
         print(f"Data types: {data_types}")
         print(f"Extra params: {params}")
 
         file_path = ""
-        for data_type in data_types:
+        for i, data_type in enumerate(data_types):
             save_dir = self.shared_root / "snapshots" / data_type / target_id
             save_dir.mkdir(parents=True, exist_ok=True)
 
             file_path = save_dir / f"{timestamp}.parquet"
 
-            mock_data = self._generate_mock_data(target_id, data_type)
+            if target_ids:
+                mock_data = []
+                for j, batch_target in enumerate(target_ids):
+                    if checkpoint:
+                        checkpoint()
+                    mock_data.extend(
+                        {"primary_id": batch_target, **record}
+                        for record in self._generate_mock_data(batch_target, data_type)
+                    )
+                    if on_progress:
+                        done = i * len(target_ids) + j + 1
+                        on_progress(
+                            COMPUTE_PROGRESS + (99.0 - COMPUTE_PROGRESS) * done / (len(data_types) * len(target_ids)),
+                            f"{data_type}: {batch_target} ({j + 1}/{len(target_ids)})",
+                        )
+            else:
+                mock_data = self._generate_mock_data(target_id, data_type)
             df = self.pd.DataFrame(mock_data)
-            df.to_parquet(file_path, engine="pyarrow", index=False)
+            table = self.pa.Table.from_pandas(df, preserve_index=False)
+            self.pq.write_table(with_snapshot_metadata(table, **metadata), file_path)
             logger.info(f"Saved {data_type} to {file_path}")
-
+            if self.on_write:
+                self.on_write(str(file_path))
+            if on_progress and not target_ids:
+                on_progress(
+                    COMPUTE_PROGRESS + (99.0 - COMPUTE_PROGRESS) * (i + 1) / len(data_types), f"Saved {data_type}"
+                )
+
+        timings["write"] = time.perf_counter() - write_start
         return str(file_path)
 
+    @staticmethod
+    def _simulate_work(
+        seconds: float,
+        checkpoint: Optional[Callable[[], None]],
+        on_progress: Optional[Callable[[float, str], None]] = None,
+        step: float = 0.1,
+    ):
+        """
+        Sleeps in slices, hitting the checkpoint and reporting progress between them
+        like a real engine between sub-steps.
+        """
+        start = time.perf_counter()
+        deadline = start + seconds
+        while (remaining := deadline - time.perf_counter()) > 0:
+            if checkpoint:
+                checkpoint()
+            if on_progress:
+                on_progress(COMPUTE_PROGRESS * (time.perf_counter() - start) / seconds, "Computing...")
+            time.sleep(min(step, remaining))
+
     def _generate_mock_data(self, target_id: str, data_type: str) -> list:
         """Helper to create realistic dummy records."""
         now = datetime.now().isoformat()
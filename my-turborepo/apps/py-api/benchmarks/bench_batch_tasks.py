@@ -0,0 +1,64 @@
+"""
+Benchmark: N single-target tasks vs one batch task over the same N targets.
+
+Runs PortfolioDataManager directly (no worker round-trips), with the simulated engine call
+shortened to --engine-seconds, and reports end-to-end time, snapshot files written, and the
+time for DataManager to read back every target's prices.
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_batch_tasks --targets 200 --engine-seconds 0.05
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from app.core.data_manager import DataManager
+from app.services.portfolio_data_manager import PortfolioDataManager
+
+
+def count_files(root: str) -> int:
+    return sum(len(files) for _, _, files in os.walk(os.path.join(root, "snapshots")))
+
+
+def read_back(root: str, target_ids: list[str]) -> float:
+    data_manager = DataManager(root)
+    start = time.perf_counter()
+    for target_id in target_ids:
+        filename = data_manager.resolve_version("prices", target_id, "latest")
+        df = data_manager.load_parquet("prices", target_id, filename)
+        assert len(df) == 2, f"{target_id}: {len(df)} rows"
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", type=int, default=200)
+    parser.add_argument("--engine-seconds", type=float, default=0.05, help="Simulated cost of one engine call")
+    args = parser.parse_args()
+
+    PortfolioDataManager.RUN_SECONDS = args.engine_seconds
+    target_ids = [f"FUND{i:04d}" for i in range(args.targets)]
+    print(f"{args.targets} targets, pricing task, engine call {args.engine_seconds}s")
+    print(f"{'mode':<16} {'run (s)':>10} {'files':>8} {'read all (s)':>14}")
+
+    for mode in ("single x N", "batch"):
+        work = tempfile.mkdtemp(prefix="bench_batch_")
+        try:
+            engine = PortfolioDataManager(work)
+            start = time.perf_counter()
+            if mode == "batch":
+                engine.run({"target_id": "BATCH", "task_type": "pricing", "target_ids": target_ids})
+            else:
+                for target_id in target_ids:
+                    engine.run({"target_id": target_id, "task_type": "pricing"})
+            elapsed = time.perf_counter() - start
+            print(f"{mode:<16} {elapsed:>10.2f} {count_files(work):>8} {read_back(work, target_ids):>14.3f}")
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark: snapshot folders before and after SnapshotCompactor.
+
+Builds a shared directory with --targets folders of --versions small per-run snapshots spread over
+--days days, then measures on a fresh local mirror:
+- sync: one full FileSyncer cycle into an empty mirror, and a steady-state cycle afterwards
+- listing: get_snapshots for every target on a cold SnapshotIndex (folder scans, partition footers), then warm
+- read: load_parquet of --reads random versions per target on a cold cache
+Compaction then folds everything but the latest snapshot of each folder into per-day partitions,
+the measurements are repeated, and every version is checked to read back unchanged.
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_compaction --targets 50 --versions 200 --days 30
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.compaction import SnapshotCompactor, snapshot_filename
+from app.core.data_manager import DataManager
+from app.core.syncer import FileSyncer
+
+
+def build_share(shared: str, targets: list[str], versions: int, days: int):
+    now = datetime.now().replace(microsecond=0)
+    step = timedelta(days=days) / versions
+    for target_id in targets:
+        folder = os.path.join(shared, "snapshots", "prices", target_id)
+        os.makedirs(folder)
+        for i in range(versions):
+            ts = now - step * (versions - i)
+            table = pa.table(
+                {
+                    "fund_id": [target_id, target_id],
+                    "field": ["PX_LAST", "NAV"],
+                    "value": [100.0 + i, 50.0 + i],
+                    "date": [ts.isoformat()] * 2,
+                }
+            )
+            pq.write_table(table, os.path.join(folder, snapshot_filename(ts)))
+
+
+def count_files(root: str) -> int:
+    return sum(len(files) for _, _, files in os.walk(os.path.join(root, "snapshots")))
+
+
+def measure(shared: str, targets: list[str], reads: int, seed: int) -> dict:
+    local = tempfile.mkdtemp(prefix="bench_compaction_local_")
+    try:
+        syncer = FileSyncer(shared, local)
+        start = time.perf_counter()
+        syncer.sync_once(wait=True)
+        sync_cold = time.perf_counter() - start
+        start = time.perf_counter()
+        syncer.sync_once(wait=True)
+        sync_steady = time.perf_counter() - start
+        syncer.copier.stop()
+
+        dm = DataManager(local, memory_map=False)
+        start = time.perf_counter()
+        listings = {t: dm.get_snapshots("prices", t) for t in targets}
+        listing = time.perf_counter() - start
+        start = time.perf_counter()
+        for t in targets:
+            dm.get_snapshots("prices", t)
+        listing_warm = time.perf_counter() - start
+
+        rng = random.Random(seed)
+        picks = [(t, v) for t in targets for v in rng.sample(listings[t], min(reads, len(listings[t])))]
+        start = time.perf_counter()
+        frames = {(t, v): dm.load_parquet("prices", t, v) for t, v in picks}
+        read = time.perf_counter() - start
+        return {
+            "files": count_files(local),
+            "sync_cold": sync_cold,
+            "sync_steady": sync_steady,
+            "listing": listing,
+            "listing_warm": listing_warm,
+            "read": read,
+            "reads": len(picks),
+            "versions": sum(len(v) for v in listings.values()),
+            "frames": frames,
+        }
+    finally:
+        shutil.rmtree(local, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", type=int, default=50)
+    parser.add_argument("--versions", type=int, default=200, help="Snapshots per target")
+    parser.add_argument("--days", type=int, default=30, help="Period the snapshots are spread over")
+    parser.add_argument("--reads", type=int, default=5, help="Random versions read per target")
+    args = parser.parse_args()
+
+    shared = tempfile.mkdtemp(prefix="bench_compaction_shared_")
+    targets = [f"FUND{i:04d}" for i in range(args.targets)]
+    try:
+        build_share(shared, targets, args.versions, args.days)
+        before = measure(shared, targets, args.reads, seed=1)
+
+        compactor = SnapshotCompactor(shared, min_age=0, keep_latest=1, grace_seconds=0)
+        stats = compactor.run()
+        print(
+            f"compaction: {stats['compacted']} snapshots into {stats['partitions_written']} partitions, "
+            f"{stats['files_removed']} files removed in {stats['seconds']:.2f}s"
+        )
+
+        after = measure(shared, targets, args.reads, seed=1)
+        assert after["versions"] == before["versions"], "versions lost by compaction"
+        for key, frame in before["frames"].items():
+            assert frame.equals(after["frames"][key]), f"{key} reads back differently"
+
+        print(f"{args.targets} targets x {args.versions} snapshots over {args.days} days")
+        print(f"{'':<22} {'before':>10} {'after':>10}")
+        print(f"{'files in mirror':<22} {before['files']:>10} {after['files']:>10}")
+        for key, label in (
+            ("sync_cold", "sync cold (s)"),
+            ("sync_steady", "sync steady (s)"),
+            ("listing", "listing cold (s)"),
+            ("listing_warm", "listing warm (s)"),
+            ("read", f"read {before['reads']} (s)"),
+        ):
+            print(f"{label:<22} {before[key]:>10.3f} {after[key]:>10.3f}")
+        print(f"all {before['versions']} versions still listed, sampled reads identical")
+    finally:
+        shutil.rmtree(shared, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: response formats of /data/{target_id}/{data_type}/content.
+
+Compares the default row-records JSON (frame_to_records_json, as served by the endpoint) against the
+column-oriented JSON and the Arrow IPC stream, measuring latency and peak memory
+(Python allocations via tracemalloc plus Arrow's memory pool).
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_content_formats --rows 10000 100000 1000000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.core.data_manager import DataManager
+from app.core.formats import frame_to_columns_json, frame_to_records_json, table_to_arrow_ipc
+
+FILENAME = "20250101_000000.parquet"
+
+
+def build_snapshot(local_root: str, rows: int):
+    folder = os.path.join(local_root, "snapshots", "prices", "BENCH")
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "fund_id": [f"FUND{i % 500:04d}" for i in range(rows)],
+            "field": np.where(rng.random(rows) > 0.5, "PX_LAST", "PX_MID"),
+            "value": rng.random(rows) * 100,
+            "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(np.arange(rows) % 1000, unit="D"),
+        }
+    )
+    df.to_parquet(os.path.join(folder, FILENAME), engine="pyarrow", index=False)
+
+
+def records(dm: DataManager) -> int:
+    df = dm.load_parquet("prices", "BENCH", FILENAME)
+    return len(frame_to_records_json(df).encode())
+
+
+def columns(dm: DataManager) -> int:
+    df = dm.load_parquet("prices", "BENCH", FILENAME)
+    return len(frame_to_columns_json(df).encode())
+
+
+def arrow(dm: DataManager) -> int:
+    table = dm.load_table("prices", "BENCH", FILENAME)
+    return table_to_arrow_ipc(table).nbytes
+
+
+def measure(fn, local_root: str) -> tuple[float, float, int]:
+    """Latency and peak memory are taken from separate runs, as tracemalloc slows Python code down."""
+    # Each run starts from a fresh DataManager, so cached reads are excluded
+    start = time.perf_counter()
+    size = fn(DataManager(local_root))
+    elapsed = time.perf_counter() - start
+
+    dm = DataManager(local_root)
+    pool = pa.default_memory_pool()
+    arrow_before = pool.bytes_allocated()
+    tracemalloc.start()
+    fn(dm)
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_peak = max(0, pool.max_memory() - arrow_before)
+    return elapsed, (py_peak + arrow_peak) / 1024**2, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'format':<8} {'latency (s)':>12} {'peak (MiB)':>11} {'payload (MiB)':>14}")
+    for rows in args.rows:
+        work = tempfile.mkdtemp(prefix="bench_formats_")
+        try:
+            build_snapshot(work, rows)
+            for name, fn in (("records", records), ("columns", columns), ("arrow", arrow)):
+                elapsed, peak, size = measure(fn, work)
+                print(f"{rows:>10,} {name:<8} {elapsed:>12.3f} {peak:>11.1f} {size / 1024**2:>14.1f}")
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Simulation: several "PCs" sharing one directory through FileTaskBroker.
+
+Every PC is a separate process with its own WorkerPool and BrokerConsumer, pointed at the same
+temporary shared directory. One user publishes a backlog of tasks; the PCs claim and run them.
+Calc workers are replaced by a stand-in that sleeps for the task's duration and records which PC
+ran it, so the run shows how the backlog spreads and checks that every task ran exactly once.
+
+With --kill, one PC is killed mid-run (no clean shutdown, no lease release): its claimed tasks
+must be requeued once their lease expires and finished by the remaining PCs. Delivery is
+at-least-once, so a task the killed PC finished right before dying may run a second time.
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_distributed --pcs 3 --tasks 24 --duration 0.5
+    uv run python -m benchmarks.bench_distributed --pcs 3 --tasks 24 --duration 0.5 --kill
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from collections import Counter
+from queue import Empty
+
+from app.core.task_broker import BrokerConsumer, FileTaskBroker
+from app.core.worker_pool import WorkerPool
+
+
+def recording_worker(
+    queue,
+    shared_dir,
+    user_name,
+    ready_event,
+    sync_requests=None,
+    results=None,
+    worker_id=None,
+    lazy_engines=(),
+    cancel_seq=None,
+    cancel_reason=None,
+):
+    """calc_worker stand-in: sleeps for the task's duration, then records '<task_id>.<pc>' in runs/."""
+    parent = os.getppid()
+    ready_event.set()
+    while True:
+        try:
+            task_info = queue.get(timeout=0.5)
+        except Empty:
+            if os.getppid() != parent:
+                break  # The simulated PC was killed: go down with it
+            continue
+        if task_info == "STOP":
+            break
+        time.sleep(task_info["params"]["extra_params"]["duration"])
+        if os.getppid() != parent:
+            break  # Killed mid-task: a crashed PC doesn't deliver its result
+        open(os.path.join(shared_dir, "runs", f"{task_info['task_id']}.{user_name}"), "w").close()
+        results.put({"type": "done", "worker_id": worker_id, "task_id": task_info["task_id"]})
+
+
+def run_pc(shared_dir: str, name: str, workers: int, lease_seconds: float):
+    """One simulated PC: a worker pool fed by the shared broker, running until terminated."""
+    logging.basicConfig(level=logging.WARNING)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # Clean shutdown on terminate()
+    pool = WorkerPool(shared_dir, name, size=workers, worker_target=recording_worker)
+    pool.start()
+    consumer = BrokerConsumer(FileTaskBroker(shared_dir, lease_seconds=lease_seconds), pool, poll_interval=0.2)
+    consumer.start()
+    try:
+        while True:
+            time.sleep(1.0)
+    finally:
+        consumer.stop()
+        pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pcs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes per PC")
+    parser.add_argument("--tasks", type=int, default=24)
+    parser.add_argument("--duration", type=float, default=0.5, help="Seconds per task")
+    parser.add_argument("--lease", type=float, default=2.0, help="Lease seconds")
+    parser.add_argument("--kill", action="store_true", help="Kill one PC mid-run")
+    args = parser.parse_args()
+
+    shared_dir = tempfile.mkdtemp(prefix="bench_distributed_")
+    os.makedirs(os.path.join(shared_dir, "runs"))
+    broker = FileTaskBroker(shared_dir, lease_seconds=args.lease, user_name="alice")
+    pcs = [
+        multiprocessing.Process(target=run_pc, args=(shared_dir, f"pc{i}", args.workers, args.lease))
+        for i in range(args.pcs)
+    ]
+    try:
+        for pc in pcs:
+            pc.start()
+        time.sleep(1.0)  # Let the pools start
+
+        start = time.perf_counter()
+        for i in range(args.tasks):
+            params = {"target_id": f"FUND{i:03d}", "task_type": "pricing", "extra_params": {"duration": args.duration}}
+            broker.publish({"task_id": f"FUND{i:03d}_pricing_alice", "params": params})
+
+        killed = False
+        runs_dir = os.path.join(shared_dir, "runs")
+        deadline = time.monotonic() + 60 + args.tasks * args.duration
+        while time.monotonic() < deadline:
+            done = {name.rsplit(".", 1)[0] for name in os.listdir(runs_dir)}
+            if args.kill and not killed and len(done) >= args.tasks // 3:
+                pcs[0].kill()
+                killed = True
+                print(f"Killed pc0 after {len(done)} tasks")
+            status = broker.status()
+            if len(done) == args.tasks and status["pending"] == 0 and status["claimed"] == 0:
+                break
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+
+        runs = [name.rsplit(".", 1) for name in os.listdir(runs_dir)]
+        per_task = Counter(task_id for task_id, _ in runs)
+        per_pc = Counter(pc for _, pc in runs)
+        serial = args.tasks * args.duration / args.workers
+        print(f"{args.pcs} PCs x {args.workers} worker(s), {args.tasks} tasks of {args.duration}s")
+        print(f"makespan {elapsed:.2f}s (one PC alone: {serial:.2f}s)")
+        print("tasks per PC: " + ", ".join(f"{pc}={n}" for pc, n in sorted(per_pc.items())))
+        missing = args.tasks - len(per_task)
+        repeated = {task_id: n for task_id, n in per_task.items() if n > 1}
+        print(f"missing: {missing}, ran more than once: {repeated or 'none'}")
+        if args.kill:
+            # Delivery is at-least-once: a task pc0 finished just before it died, but whose claim it
+            # hadn't completed yet, is requeued and computed again
+            print("(with --kill, a task pc0 finished right before dying may run twice)")
+    finally:
+        for pc in pcs:
+            if pc.is_alive():
+                pc.terminate()
+            pc.join()
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Load test: latency of cheap endpoints while heavy snapshot reads are running.
+
+Serves the FastAPI app with uvicorn in its own process (without the worker pool and syncer, only the
+data and status managers over a temporary mirror) and runs two phases per mode:
+- idle: only a prober calling /api/health and /system/cache-status
+- loaded: the same prober while --readers clients fetch full snapshots from /content in a loop
+Modes:
+- inline: endpoint bodies run directly on the event loop (the behaviour before BlockingIO)
+- offloaded: bodies run on BlockingIO with the configured per-resource limits
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_event_loop --readers 8 --rows 200000 --seconds 5
+    uv run python -m benchmarks.bench_event_loop --format arrow
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import uvicorn
+
+from app.core.blocking_io import BlockingIO
+from app.core.data_manager import DataManager
+from app.core.status import StatusManager
+from app.main import BLOCKING_IO_LIMITS, BLOCKING_IO_WORKERS, app
+
+
+class InlineIO:
+    """Runs calls directly on the event loop, like the endpoints did before BlockingIO."""
+
+    async def run(self, resource, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def metrics(self) -> dict:
+        return {}
+
+    def shutdown(self):
+        pass
+
+
+def build_mirror(root: str, targets: int, rows: int):
+    rng = np.random.default_rng(0)
+    for i in range(targets):
+        folder = os.path.join(root, "snapshots", "prices", f"FUND{i}")
+        os.makedirs(folder)
+        table = pa.table(
+            {
+                "fund_id": [f"FUND{i}"] * rows,
+                "field": [f"FIELD{j % 100}" for j in range(rows)],
+                "value": rng.random(rows),
+                "date": ["2026-01-15T10:00:00"] * rows,
+            }
+        )
+        pq.write_table(table, os.path.join(folder, "20260115_100000.parquet"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def probe(base: str, seconds: float) -> list[float]:
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    with httpx.Client(base_url=base, timeout=60) as client:
+        while time.perf_counter() < deadline:
+            for path in ("/api/health", "/system/cache-status"):
+                start = time.perf_counter()
+                client.get(path).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+    return latencies
+
+
+def serve(root: str, port: int, mode: str):
+    """Server process: the app over the temporary mirror, with endpoint bodies inline or offloaded."""
+    # Cache disabled so every request reads and converts the parquet file, like distinct snapshots would
+    app.state.data_manager = DataManager(root, cache_max_bytes=0, memory_map=False)
+    app.state.status_manager = StatusManager(root)
+    app.state.blocking_io = InlineIO() if mode == "inline" else BlockingIO(BLOCKING_IO_WORKERS, BLOCKING_IO_LIMITS)
+    uvicorn.run(app, port=port, lifespan="off", log_level="warning")
+
+
+def read_loop(base: str, target: str, fmt: str, stop: threading.Event, counts: list):
+    with httpx.Client(base_url=base, timeout=120) as client:
+        while not stop.is_set():
+            client.get(f"/data/{target}/prices/content", params={"format": fmt}).raise_for_status()
+            counts.append(1)
+
+
+def run_readers(base: str, readers: int, fmt: str, seconds: float, counts):
+    """Reader process (kept apart from the prober so client-side parsing doesn't skew its timings)."""
+    stop, done = threading.Event(), []
+    threads = [threading.Thread(target=read_loop, args=(base, f"FUND{i}", fmt, stop, done)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    counts.value = len(done)
+
+
+def wait_until_up(base: str):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base}/api/health")
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start")
+
+
+def summarize(latencies: list[float]) -> str:
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99)]
+    return (
+        f"p50 {statistics.median(latencies) * 1000:8.1f}ms  p99 {p99 * 1000:8.1f}ms  max {latencies[-1] * 1000:8.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent clients reading full snapshots")
+    parser.add_argument("--rows", type=int, default=200000, help="Rows per snapshot")
+    parser.add_argument("--format", choices=["records", "columns", "arrow"], default="records")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each phase")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_event_loop_")
+    try:
+        build_mirror(root, args.readers, args.rows)
+        for mode in ("inline", "offloaded"):
+            port = free_port()
+            base = f"http://127.0.0.1:{port}"
+            server = multiprocessing.Process(target=serve, args=(root, port, mode), daemon=True)
+            server.start()
+            try:
+                wait_until_up(base)
+                idle = probe(base, args.seconds)
+
+                counts = multiprocessing.Value("i", 0)
+                readers = multiprocessing.Process(
+                    target=run_readers, args=(base, args.readers, args.format, args.seconds + 1, counts)
+                )
+                readers.start()
+                time.sleep(0.5)  # Let the readers ramp up
+                loaded = probe(base, args.seconds)
+                readers.join()
+            finally:
+                server.terminate()
+                server.join()
+
+            print(f"{mode}:")
+            print(f"  cheap endpoints, idle   {summarize(idle)}")
+            print(f"  cheap endpoints, loaded {summarize(loaded)}")
+            print(f"  heavy reads completed   {counts.value} ({counts.value / (args.seconds + 1):.1f}/s)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
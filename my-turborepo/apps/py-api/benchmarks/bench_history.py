@@ -0,0 +1,89 @@
+"""
+Benchmark: reading a target's snapshot history one version at a time vs. DataManager.load_history.
+
+Builds --versions snapshots of --rows rows for one target, every third run also written as a batch
+under ALL, then compacts the older half so the history spans loose files, ALL files and _history
+partitions. Measures on a cold cache:
+- loop: resolve every version and load_table it, then concatenate with a version column
+- history: one load_history call (single parallel dataset scan)
+and checks both return the same rows.
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_history --versions 300 --rows 2000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.compaction import SnapshotCompactor, snapshot_filename
+from app.core.data_manager import VERSION_COLUMN, DataManager
+
+
+def build_share(root: str, versions: int, rows: int):
+    now = datetime.now().replace(microsecond=0)
+    rng = np.random.default_rng(0)
+    fields = np.array([f"FIELD{i % 50}" for i in range(rows)])
+    for i in range(versions):
+        ts = now - timedelta(hours=versions - i)
+        folder = os.path.join(root, "snapshots", "prices", "ALL" if i % 3 == 0 else "FUND")
+        os.makedirs(folder, exist_ok=True)
+        table = pa.table({"fund_id": ["FUND"] * rows, "field": fields, "value": rng.random(rows)})
+        if i % 3 == 0:
+            other = pa.table({"fund_id": ["OTHER"] * rows, "field": fields, "value": rng.random(rows)})
+            table = pa.concat_tables([table, other])
+            table = table.add_column(0, "primary_id", table.column("fund_id"))
+        pq.write_table(table, os.path.join(folder, snapshot_filename(ts)))
+
+
+def read_loop(dm: DataManager, columns, filters) -> pa.Table:
+    tables = []
+    for filename in reversed(dm.get_snapshots("prices", "FUND")):
+        table = dm.load_table("prices", "FUND", filename, columns, filters)
+        if "primary_id" in table.column_names:
+            table = table.drop_columns(["primary_id"])
+        tables.append(table.add_column(0, VERSION_COLUMN, pa.array([filename] * table.num_rows, pa.string())))
+    return pa.concat_tables(tables)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--versions", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=2000, help="Rows per snapshot")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_history_")
+    try:
+        build_share(root, args.versions, args.rows)
+        SnapshotCompactor(root, min_age=args.versions / 2 * 3600, keep_latest=1, grace_seconds=0).run()
+
+        columns, filters = ["field", "value"], [("field", "==", "FIELD7")]
+        results = {}
+        for label, read in (
+            ("loop", lambda dm: read_loop(dm, columns, filters)),
+            ("history", lambda dm: dm.load_history("prices", "FUND", columns=columns, filters=filters)),
+        ):
+            dm = DataManager(root, memory_map=False)
+            dm.get_snapshots("prices", "FUND")  # Listing is not what is measured
+            start = time.perf_counter()
+            table = read(dm)
+            results[label] = (time.perf_counter() - start, table)
+
+        loop, history = results["loop"][1], results["history"][1]
+        assert loop.select(history.column_names).equals(history), "history differs from per-version reads"
+        print(f"{args.versions} snapshots x {args.rows} rows, {history.num_rows} rows selected")
+        for label, (seconds, _) in results.items():
+            print(f"{label:<10} {seconds:>8.3f}s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: listing snapshots / finding the latest one with per-request os.listdir + sort
+vs the maintained SnapshotIndex of DataManager.
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_snapshot_index --snapshots 10000
+"""
+
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+import time
+
+from app.core.data_manager import DataManager
+
+
+def build_folder(local_root: str, data_type: str, folder_id: str, n: int):
+    folder = os.path.join(local_root, "snapshots", data_type, folder_id)
+    os.makedirs(folder, exist_ok=True)
+    for i in range(n):
+        open(os.path.join(folder, f"2025{i:08d}.parquet"), "wb").close()
+
+
+def legacy_get_snapshots(local_root: str, data_type: str, target_id: str) -> list[str]:
+    """The previous implementation: list and sort both folders on every request."""
+    files = set()
+    for folder_id in (target_id, "ALL"):
+        p = os.path.join(local_root, "snapshots", data_type, folder_id)
+        if os.path.exists(p):
+            files.update([f for f in os.listdir(p) if f.endswith(".parquet")])
+    return sorted(list(files), reverse=True)
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snapshots", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_index_")
+    try:
+        build_folder(work, "prices", "FUND0001", args.snapshots)
+        build_folder(work, "prices", "ALL", args.snapshots // 10)
+        dm = DataManager(work)
+
+        print(f"{args.snapshots:,} snapshots per target (+{args.snapshots // 10:,} under ALL), ms per request")
+        print(f"{'operation':<36} {'ms':>10}")
+        legacy_list = timed(lambda: legacy_get_snapshots(work, "prices", "FUND0001"), args.repeat)
+        legacy_latest = timed(lambda: legacy_get_snapshots(work, "prices", "FUND0001")[0], args.repeat)
+        print(f"{'legacy get_snapshots':<36} {legacy_list:>10.3f}")
+        print(f"{'legacy latest (list + sort)':<36} {legacy_latest:>10.3f}")
+
+        start = time.perf_counter()
+        dm.get_snapshots("prices", "FUND0001")
+        print(f"{'index cold scan':<36} {(time.perf_counter() - start) * 1000:>10.3f}")
+        index_list = timed(lambda: dm.get_snapshots("prices", "FUND0001"), args.repeat)
+        index_latest = timed(lambda: dm.resolve_version("prices", "FUND0001", "latest"), args.repeat)
+        print(f"{'index get_snapshots':<36} {index_list:>10.3f}")
+        print(f"{'index latest':<36} {index_latest:>10.3f}")
+
+        # Syncer adding files one by one while requests keep coming
+        new_dir = os.path.join(work, "snapshots", "prices", "FUND0001")
+        counter = itertools.count()
+
+        def add_and_query():
+            path = os.path.join(new_dir, f"2099{next(counter):08d}.parquet")
+            open(path, "wb").close()
+            dm.on_file_synced(path)
+            return dm.resolve_version("prices", "FUND0001", "latest")
+
+        print(f"{'index add + latest':<36} {timed(add_and_query, args.repeat):>10.3f}")
+        assert dm.get_snapshots("prices", "FUND0001")[0] == legacy_get_snapshots(work, "prices", "FUND0001")[0]
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
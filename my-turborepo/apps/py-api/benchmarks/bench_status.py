@@ -0,0 +1,115 @@
+"""
+Benchmark: per-request directory scan vs the in-memory status index of StatusManager.
+
+Creates 5k status files and runs 50 concurrent pollers against the widget-level lookup
+(get_task_status) and the global list (get_all_statuses).
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_status --files 5000 --pollers 50
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.status import StatusManager
+
+TASK_TYPES = ["pricing", "event", "guideline"]
+
+
+def build_statuses(shared_root: str, n_files: int):
+    writer = StatusManager(shared_root)
+    for i in range(n_files):
+        target_id = f"FUND{i // len(TASK_TYPES):05d}"
+        task_type = TASK_TYPES[i % len(TASK_TYPES)]
+        params = {"target_id": target_id, "task_type": task_type, "extra_params": {}}
+        writer.update(f"{target_id}_{task_type}_user", "done", "user", params=params, progress=100)
+
+
+def legacy_get_task_status(manager: StatusManager, target_id: str, task_type: str):
+    """The previous implementation: list and parse every status file, then filter in Python."""
+    statuses = []
+    for filename in os.listdir(manager.status_dir):
+        if filename.endswith(".json"):
+            status = manager.get_status(filename[:-5])
+            if status:
+                statuses.append(status)
+    relevant = [s for s in statuses if s["params"]["target_id"] == target_id and s["params"]["task_type"] == task_type]
+    relevant.sort(key=lambda x: (x["status"] == "running", x["last_heartbeat"]), reverse=True)
+    return relevant[0] if relevant else None
+
+
+def run_pollers(fn, n_pollers: int, requests_per_poller: int, n_files: int) -> tuple[float, list[float]]:
+    def poller(idx: int) -> list[float]:
+        latencies = []
+        for r in range(requests_per_poller):
+            i = (idx * requests_per_poller + r) % n_files
+            start = time.perf_counter()
+            fn(f"FUND{i // len(TASK_TYPES):05d}", TASK_TYPES[i % len(TASK_TYPES)])
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_pollers) as pool:
+        results = list(pool.map(poller, range(n_pollers)))
+    return time.perf_counter() - start, [lat for lats in results for lat in lats]
+
+
+def report(label: str, wall: float, latencies: list[float]):
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<28} {len(latencies) / wall:>10.1f} {p50:>10.2f} {p99:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--pollers", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per poller for the indexed lookup")
+    parser.add_argument("--legacy-requests", type=int, default=2, help="Requests per poller for the legacy scan")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_status_")
+    try:
+        build_statuses(work, args.files)
+        manager = StatusManager(work)
+        print(f"{args.files:,} status files, {args.pollers} concurrent pollers")
+        print(f"{'mode':<28} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+
+        wall, lats = run_pollers(
+            lambda t, k: legacy_get_task_status(manager, t, k), args.pollers, args.legacy_requests, args.files
+        )
+        report("legacy scan", wall, lats)
+
+        start = time.perf_counter()
+        manager.refresh(force=True)
+        print(f"{'index cold build':<28} {time.perf_counter() - start:>10.3f}s")
+
+        wall, lats = run_pollers(manager.get_task_status, args.pollers, args.requests, args.files)
+        report("indexed get_task_status", wall, lats)
+
+        wall, lats = run_pollers(lambda t, k: manager.get_all_statuses(), args.pollers, args.requests, args.files)
+        report("indexed get_all_statuses", wall, lats)
+
+        # Steady state with a few files changing between refreshes
+        writer = StatusManager(work)
+
+        def poll_with_updates(target_id: str, task_type: str):
+            if target_id.endswith("0") and task_type == "pricing":
+                params = {"target_id": target_id, "task_type": task_type, "extra_params": {}}
+                writer.update(f"{target_id}_{task_type}_user", "running", "user", params=params, progress=50)
+            return manager.get_task_status(target_id, task_type)
+
+        wall, lats = run_pollers(poll_with_updates, args.pollers, args.requests, args.files)
+        report("indexed + concurrent writes", wall, lats)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: legacy full-walk FileSyncer vs manifest-driven incremental FileSyncer.
+
+Builds a synthetic shared tree (snapshots/{data_type}/{target_id}/*.parquet + status/*.json),
+then measures the cold (initial copy) and steady-state (nothing changed / one new file) cycles.
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_syncer --files 10000 100000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from app.core import syncer as syncer_module
+from app.core.syncer import FileSyncer
+
+DATA_TYPES = ["prices", "fx_rates", "calendar_events", "guideline"]
+FILES_PER_TARGET = 50
+STATUS_FILES = 200
+
+
+def build_tree(shared_root: str, n_files: int):
+    """Creates n_files small snapshot files spread over data_type/target_id folders."""
+    n_targets = max(1, n_files // (len(DATA_TYPES) * FILES_PER_TARGET))
+    count = 0
+    for data_type in DATA_TYPES:
+        for t in range(n_targets):
+            folder = os.path.join(shared_root, "snapshots", data_type, f"FUND{t:05d}")
+            os.makedirs(folder, exist_ok=True)
+            for i in range(FILES_PER_TARGET):
+                with open(os.path.join(folder, f"20250101_{i:06d}.parquet"), "wb") as f:
+                    f.write(b"x")
+                count += 1
+
+    status_dir = os.path.join(shared_root, "status")
+    os.makedirs(status_dir, exist_ok=True)
+    for i in range(STATUS_FILES):
+        with open(os.path.join(status_dir, f"FUND{i:05d}_pricing_user.json"), "w") as f:
+            f.write("{}")
+
+    # Age everything so the incremental syncer treats the tree as settled
+    old = time.time() - 3600
+    for root, dirs, files in os.walk(shared_root):
+        for name in files + dirs:
+            os.utime(os.path.join(root, name), (old, old))
+    return count + STATUS_FILES
+
+
+@contextmanager
+def count_fs_calls(counter: dict):
+    """Counts the os-level stat/listing calls made by the legacy syncer."""
+    real = {"exists": os.path.exists, "getmtime": os.path.getmtime}
+
+    def wrap(name):
+        def inner(*args, **kwargs):
+            counter[name] = counter.get(name, 0) + 1
+            return real[name](*args, **kwargs)
+
+        return inner
+
+    with (
+        mock.patch.object(syncer_module.os.path, "exists", wrap("exists")),
+        mock.patch.object(syncer_module.os.path, "getmtime", wrap("getmtime")),
+    ):
+        yield
+
+
+def run_legacy(shared_root: str, local_root: str) -> list[tuple[str, float, int]]:
+    results = []
+    syncer = FileSyncer(shared_root, local_root, incremental=False)
+    for label in ("cold", "steady"):
+        counter: dict = {}
+        with count_fs_calls(counter):
+            stats = syncer.sync_once(wait=True)
+        results.append((label, stats["elapsed"], sum(counter.values())))
+    return results
+
+
+def run_incremental(shared_root: str, local_root: str) -> list[tuple[str, float, int]]:
+    results = []
+    syncer = FileSyncer(shared_root, local_root, incremental=True, settle_seconds=60)
+    # The cycle after the cold copy confirms the copied directories before they can be skipped
+    for label in ("cold", "confirm", "steady"):
+        stats = syncer.sync_once(wait=True)
+        results.append((label, stats["elapsed"], stats["stat_calls"]))
+
+    # One new snapshot lands in a single target folder
+    new_file = os.path.join(shared_root, "snapshots", "prices", "FUND00000", "20990101_000000.parquet")
+    with open(new_file, "wb") as f:
+        f.write(b"y")
+    stats = syncer.sync_once(wait=True)
+    results.append(("one new file", stats["elapsed"], stats["stat_calls"]))
+
+    # Process restart: manifest is reloaded from disk
+    syncer = FileSyncer(shared_root, local_root, incremental=True, settle_seconds=60)
+    stats = syncer.sync_once(wait=True)
+    results.append(("after restart", stats["elapsed"], stats["stat_calls"]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    for n in args.files:
+        work = tempfile.mkdtemp(prefix="bench_syncer_")
+        try:
+            shared_root = os.path.join(work, "shared")
+            total = build_tree(shared_root, n)
+            print(f"\n=== {total:,} files ===")
+            print(f"{'mode':<12} {'cycle':<14} {'wall (s)':>10} {'stat calls':>12}")
+
+            for mode, runner in (("legacy", run_legacy), ("incremental", run_incremental)):
+                local_root = os.path.join(work, f"local_{mode}")
+                for label, elapsed, calls in runner(shared_root, local_root):
+                    print(f"{mode:<12} {label:<14} {elapsed:>10.3f} {calls:>12,}")
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
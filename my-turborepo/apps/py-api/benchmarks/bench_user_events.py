@@ -0,0 +1,161 @@
+"""
+Benchmark: user events as one JSON list rewritten per change vs. UserEventStore's append-only log.
+
+Starts from --events existing events, then --writers processes (one per simulated PC) each save
+--writes events concurrently (a mix of updates to existing ids and new ids). Measured per format:
+- write: wall time of the concurrent burst and p50/p99 latency of one save
+- read: latency of listing all events right after the burst (first read in the process)
+  and when nothing changed
+Both formats must end up with the same events.
+
+The whole-file functions replicate the endpoints before the store (lock, parse, linear update, rewrite).
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_user_events --events 50000 --writers 4 --writes 20
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import portalocker
+
+from app.core.event_store import UserEventStore
+
+
+def make_event(event_id: str, i: int) -> dict:
+    return {
+        "event_id": event_id,
+        "title": f"Event {i}",
+        "start": "2026-01-15",
+        "start_time": "09:00",
+        "end": None,
+        "end_time": None,
+        "timezone": "Asia/Tokyo",
+        "description": "Quarterly review with the portfolio team",
+        "category": "meeting",
+        "user": f"user{i % 20}",
+    }
+
+
+def whole_file_save(path: str, event: dict):
+    with open(path, "a+", encoding="utf-8") as f:
+        portalocker.lock(f, portalocker.LOCK_EX)
+        f.seek(0)
+        content = f.read()
+        events = json.loads(content) if content else []
+        existing_idx = next((i for i, e in enumerate(events) if e["event_id"] == event["event_id"]), None)
+        if existing_idx is not None:
+            events[existing_idx] = event
+        else:
+            events.append(event)
+        f.seek(0)
+        f.truncate()
+        json.dump(events, f, indent=2, ensure_ascii=False)
+
+
+def whole_file_list(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        portalocker.lock(f, portalocker.LOCK_SH)
+        content = f.read()
+        return json.loads(content) if content else []
+
+
+def writer(mode: str, root: str, writer_id: int, writes: int, events: int, start_at: float, results):
+    rng = random.Random(writer_id)
+    store = UserEventStore(root) if mode == "log" else None
+    if store:
+        store.all()  # A running app has its index loaded by the calendar's polling
+    path = os.path.join(root, "user_events.json")
+    latencies = []
+    while time.time() < start_at:
+        time.sleep(0.001)
+    for i in range(writes):
+        # Every other save updates an existing event, the rest add new ones
+        event_id = f"E{rng.randrange(events)}" if i % 2 else f"W{writer_id}_{i}"
+        event = make_event(event_id, writer_id * 1000 + i)
+        start = time.perf_counter()
+        if store:
+            store.upsert(event)
+        else:
+            whole_file_save(path, event)
+        latencies.append(time.perf_counter() - start)
+    results.put(latencies)
+
+
+def run(mode: str, args) -> dict:
+    root = tempfile.mkdtemp(prefix=f"bench_user_events_{mode}_")
+    try:
+        with open(os.path.join(root, "user_events.json"), "w", encoding="utf-8") as f:
+            json.dump([make_event(f"E{i}", i) for i in range(args.events)], f, indent=2)
+        if mode == "log":
+            UserEventStore(root).all()  # Imports the JSON list into the log
+
+        results = multiprocessing.Queue()
+        start_at = time.time() + 1.0
+        procs = [
+            multiprocessing.Process(target=writer, args=(mode, root, i, args.writes, args.events, start_at, results))
+            for i in range(args.writers)
+        ]
+        for p in procs:
+            p.start()
+        latencies = [lat for _ in procs for lat in results.get()]
+        for p in procs:
+            p.join()
+        burst = time.time() - start_at
+
+        store = UserEventStore(root, compact_min_records=10**9) if mode == "log" else None
+        path = os.path.join(root, "user_events.json")
+        start = time.perf_counter()
+        events = store.all() if store else whole_file_list(path)
+        read_cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(10):
+            store.all() if store else whole_file_list(path)
+        read_warm = (time.perf_counter() - start) / 10
+
+        latencies.sort()
+        return {
+            "burst": burst,
+            "p50": statistics.median(latencies),
+            "p99": latencies[int(len(latencies) * 0.99)],
+            "read_cold": read_cold,
+            "read_warm": read_warm,
+            "events": {e["event_id"]: e for e in events},
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50000, help="Existing events")
+    parser.add_argument("--writers", type=int, default=4, help="Concurrent writer processes")
+    parser.add_argument("--writes", type=int, default=20, help="Saves per writer")
+    args = parser.parse_args()
+
+    results = {mode: run(mode, args) for mode in ("whole-file", "log")}
+    assert results["whole-file"]["events"] == results["log"]["events"], "formats disagree on the final events"
+
+    print(f"{args.events} events, {args.writers} writers x {args.writes} saves")
+    print(f"{'':<22} {'whole-file':>12} {'log':>12}")
+    for key, label in (
+        ("burst", "write burst (s)"),
+        ("p50", "save p50 (ms)"),
+        ("p99", "save p99 (ms)"),
+        ("read_cold", "list first (ms)"),
+        ("read_warm", "list unchanged (ms)"),
+    ):
+        scale = 1 if key == "burst" else 1000
+        print(f"{label:<22} {results['whole-file'][key] * scale:>12.2f} {results['log'][key] * scale:>12.2f}")
+    print(f"both formats hold the same {len(results['log']['events'])} events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: single calc_worker vs the WorkerPool on a mixed task workload.
+
+Workers are stand-ins that sleep for a per-task_type duration instead of running the engines,
+so the numbers show scheduling only: makespan, and how long short 'event'/'guideline' tasks
+wait behind slow 'pricing' runs.
+
+Usage (from apps/py-api):
+    uv run python -m benchmarks.bench_worker_pool --targets 6 --workers 4
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+
+from app.core.worker_pool import WorkerPool
+
+# Seconds per task_type at --scale 1.0
+DURATIONS = {"pricing": 2.0, "event": 0.5, "guideline": 0.5}
+
+
+def sleeping_worker(
+    queue,
+    shared_dir,
+    user_name,
+    ready_event,
+    sync_requests=None,
+    results=None,
+    worker_id=None,
+    lazy_engines=(),
+    cancel_seq=None,
+    cancel_reason=None,
+):
+    """calc_worker stand-in: warms up instantly and sleeps for the task's duration."""
+    ready_event.set()
+    while True:
+        task_info = queue.get()
+        if task_info == "STOP":
+            break
+        time.sleep(task_info["params"]["extra_params"]["duration"])
+        results.put({"type": "done", "worker_id": worker_id, "task_id": task_info["task_id"]})
+
+
+def build_tasks(n_targets: int, scale: float) -> list[dict]:
+    tasks = []
+    for i in range(n_targets):
+        for task_type, duration in DURATIONS.items():
+            params = {
+                "target_id": f"FUND{i:03d}",
+                "task_type": task_type,
+                "extra_params": {"duration": duration * scale},
+            }
+            tasks.append({"task_id": f"FUND{i:03d}_{task_type}_bench", "params": params})
+    return tasks
+
+
+def run(tasks: list[dict], size: int, type_limits: dict) -> tuple[float, dict[str, list[float]]]:
+    shared_dir = tempfile.mkdtemp(prefix="bench_worker_pool_")  # Status files of requeued/cancelled tasks
+    pool = WorkerPool(shared_dir, "bench", size=size, type_limits=type_limits, worker_target=sleeping_worker)
+    pool.start()
+    try:
+        while not all(w["state"] == "ready" for w in pool.status()["workers"]):
+            time.sleep(0.01)
+
+        submitted = {}
+        finished = {}
+        original = pool._handle_message
+
+        def record(message: dict):
+            finished.setdefault(message["task_id"], time.perf_counter())
+            original(message)
+
+        pool._handle_message = record
+
+        start = time.perf_counter()
+        for task_info in tasks:
+            submitted[task_info["task_id"]] = time.perf_counter()
+            pool.submit(task_info)
+        while len(finished) < len(tasks):
+            time.sleep(0.01)
+        makespan = time.perf_counter() - start
+
+        latencies: dict[str, list[float]] = {}
+        for task_info in tasks:
+            task_id = task_info["task_id"]
+            latencies.setdefault(task_info["params"]["task_type"], []).append(finished[task_id] - submitted[task_id])
+        return makespan, latencies
+    finally:
+        pool.stop()
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+
+def report(label: str, makespan: float, latencies: dict[str, list[float]]):
+    cells = " ".join(f"{statistics.mean(latencies[t]):>12.2f}" for t in DURATIONS)
+    print(f"{label:<34} {makespan:>10.2f} {cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pricing-limit", type=int, default=2)
+    parser.add_argument("--scale", type=float, default=0.5, help="Multiplier on the simulated task durations")
+    args = parser.parse_args()
+
+    tasks = build_tasks(args.targets, args.scale)
+    print(f"{len(tasks)} tasks over {args.targets} targets, durations x{args.scale}: {DURATIONS}")
+    header = " ".join(f"{t + ' (s)':>12}" for t in DURATIONS)
+    print(f"{'mode':<34} {'makespan':>10} {header}")
+
+    report("single worker (FIFO)", *run(tasks, 1, {}))
+    limits = {"pricing": args.pricing_limit}
+    report(f"pool x{args.workers}, pricing<={args.pricing_limit}", *run(tasks, args.workers, limits))
+
+
+if __name__ == "__main__":
+    main()
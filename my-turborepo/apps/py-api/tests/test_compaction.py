@@ -0,0 +1,32 @@
+import os
+
+import portalocker
+
+from app.core.compaction import HISTORY_DIR, LOCK_FILENAME, SnapshotCompactor, run_in_subprocess
+from tests.test_snapshot_index import loose_files, write_snapshots
+
+
+def test_compaction_runs_in_a_child_process(tmp_path):
+    root = str(tmp_path)
+    write_snapshots(root, 3)
+    compactor = SnapshotCompactor(root, min_age=3600.0, keep_latest=0, grace_seconds=3600.0)
+
+    stats = run_in_subprocess(compactor)
+
+    assert not stats["skipped"]
+    assert stats["compacted"] == 3
+    assert os.listdir(os.path.join(root, "snapshots", "prices", "FUND", HISTORY_DIR))
+    assert len(loose_files(root)) == 3  # Kept during the grace period
+
+
+def test_run_is_skipped_while_another_process_compacts(tmp_path):
+    root = str(tmp_path)
+    write_snapshots(root, 3)
+    compactor = SnapshotCompactor(root, min_age=3600.0, keep_latest=0)
+
+    # Stands in for another PC holding the compaction lock on the shared drive
+    with portalocker.Lock(os.path.join(root, LOCK_FILENAME), mode="a", timeout=0, fail_when_locked=True):
+        stats = run_in_subprocess(compactor)
+
+    assert stats["skipped"]
+    assert not os.path.exists(os.path.join(root, "snapshots", "prices", "FUND", HISTORY_DIR))
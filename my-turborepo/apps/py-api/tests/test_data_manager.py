@@ -0,0 +1,124 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.core.compaction import snapshot_filename
+from app.core.data_manager import CHANGE_COLUMN, DataManager, diff_keys, parse_predicate
+from app.core.formats import write_arrow_sidecar
+
+START = datetime(2025, 1, 1, 9, 0, 0)
+
+
+def write_snapshot(root: str, folder_id: str, minutes: int, table: pa.Table) -> str:
+    folder = os.path.join(root, "snapshots", "prices", folder_id)
+    os.makedirs(folder, exist_ok=True)
+    name = snapshot_filename(START + timedelta(minutes=minutes))
+    pq.write_table(table, os.path.join(folder, name))
+    return name
+
+
+def all_run(px_last: float) -> pa.Table:
+    return pa.table(
+        {
+            "primary_id": ["FUND", "FUND", "OTHER"],
+            "fund_id": ["FUND", "FUND", "OTHER"],
+            "field": ["PX_LAST", "PX_MID", "PX_LAST"],
+            "value": [px_last, 2.0, 3.0],
+        }
+    )
+
+
+def apply_diff(rows: list[dict], diff: pa.Table) -> list[dict]:
+    """Same merge as applyDiff in the web app's use-snapshot hook."""
+    keys = diff_keys(diff)
+    merged = {tuple(row[k] for k in keys): row for row in rows}
+    for row in diff.to_pylist():
+        change = row.pop(CHANGE_COLUMN)
+        if change == "removed":
+            merged.pop(tuple(row[k] for k in keys))
+        else:
+            merged[tuple(row[k] for k in keys)] = row
+    return sorted(merged.values(), key=lambda row: [row[k] for k in keys])
+
+
+def test_diff_of_shared_snapshots_has_the_columns_of_content(tmp_path):
+    root = str(tmp_path)
+    old = write_snapshot(root, "ALL", 0, all_run(1.0))
+    new = write_snapshot(root, "ALL", 1, all_run(1.5))
+    dm = DataManager(root, memory_map=False)
+
+    diff = dm.load_diff("prices", "FUND", old, new)
+
+    assert diff.column_names == [CHANGE_COLUMN, *dm.load_table("prices", "FUND", new).column_names]
+    assert diff.to_pylist() == [
+        {CHANGE_COLUMN: "changed", "primary_id": "FUND", "fund_id": "FUND", "field": "PX_LAST", "value": 1.5}
+    ]
+    assert apply_diff(dm.load_table("prices", "FUND", old).to_pylist(), diff) == sorted(
+        dm.load_table("prices", "FUND", new).to_pylist(), key=lambda row: [row[k] for k in diff_keys(diff)]
+    )
+
+
+def test_primary_id_is_not_compared_across_shared_and_own_snapshots(tmp_path):
+    root = str(tmp_path)
+    own = pa.table({"fund_id": ["FUND", "FUND"], "field": ["PX_LAST", "PX_MID"], "value": [1.0, 2.0]})
+    old = write_snapshot(root, "FUND", 0, own)
+    new = write_snapshot(root, "ALL", 1, all_run(1.5))
+    dm = DataManager(root, memory_map=False)
+
+    diff = dm.load_diff("prices", "FUND", old, new)
+
+    assert diff.column_names == [CHANGE_COLUMN, *dm.load_table("prices", "FUND", new).column_names]
+    assert diff.column(CHANGE_COLUMN).to_pylist() == ["changed"]  # PX_MID only gained a primary_id
+
+
+def prices(root: str) -> str:
+    table = pa.table(
+        {
+            "fund_id": ["FUND"] * 4,
+            "field": ["PX_LAST", "PX_MID", "PX_LAST", "PX_MID"],
+            "date": pa.array([date(2025, 1, 1), date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 2)]),
+            "value": [1.0, 2.0, 3.0, 4.0],
+        }
+    )
+    return write_snapshot(root, "FUND", 0, table)
+
+
+def test_projection_and_filters_are_pushed_down(tmp_path):
+    root = str(tmp_path)
+    name = prices(root)
+    filters = [parse_predicate("field=PX_LAST"), parse_predicate("date >= 2025-01-02")]
+
+    # Same result from the parquet reader and from a memory-mapped sidecar
+    write_arrow_sidecar(os.path.join(root, "snapshots", "prices", "FUND", name))
+    for dm in (DataManager(root, memory_map=False), DataManager(root)):
+        table = dm.load_table("prices", "FUND", name, columns=["date", "value"], filters=filters)
+        assert table.to_pylist() == [{"date": date(2025, 1, 2), "value": 3.0}]
+        assert dm.load_parquet("prices", "FUND", name, filters=[("value", ">", "3")])["value"].tolist() == [4.0]
+
+
+def test_shared_snapshots_are_filtered_by_primary_id_while_reading(tmp_path):
+    root = str(tmp_path)
+    name = write_snapshot(root, "ALL", 0, all_run(1.0))
+    dm = DataManager(root, memory_map=False)
+
+    table = dm.load_table("prices", "FUND", name, filters=[("field", "==", "PX_LAST")])
+
+    assert table.to_pylist() == [{"primary_id": "FUND", "fund_id": "FUND", "field": "PX_LAST", "value": 1.0}]
+
+
+def test_invalid_filters_are_rejected(tmp_path):
+    root = str(tmp_path)
+    name = prices(root)
+    dm = DataManager(root, memory_map=False)
+
+    with pytest.raises(ValueError, match="Invalid filter"):
+        parse_predicate("value")
+    with pytest.raises(ValueError, match="Unknown filter column"):
+        dm.load_table("prices", "FUND", name, filters=[("missing", "==", "1")])
+    with pytest.raises(ValueError, match="Invalid value for value"):
+        dm.load_table("prices", "FUND", name, filters=[("value", ">", "high")])
+    with pytest.raises(ValueError, match="Unknown columns"):
+        dm.load_table("prices", "FUND", name, columns=["missing"])
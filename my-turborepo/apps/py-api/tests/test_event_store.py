@@ -0,0 +1,66 @@
+import json
+import time
+
+from app.core.event_store import UserEventStore
+
+
+def event(event_id: str, title: str = "") -> dict:
+    return {"event_id": event_id, "title": title or event_id}
+
+
+def test_changes_of_one_pc_are_seen_by_another(tmp_path):
+    alice, bob = UserEventStore(str(tmp_path)), UserEventStore(str(tmp_path))
+    assert bob.all() == []
+
+    alice.upsert(event("a"))
+    alice.upsert(event("b"))
+    alice.upsert(event("a", "renamed"))
+    assert bob.all() == [event("a", "renamed"), event("b")]
+
+    assert bob.delete("b")
+    assert not bob.delete("missing")
+    assert alice.all() == [event("a", "renamed")]
+
+
+def test_reader_only_parses_appended_records(tmp_path):
+    store = UserEventStore(str(tmp_path))
+    store.upsert(event("a"))
+    store.all()
+    offset = store.metrics()["bytes"]
+
+    UserEventStore(str(tmp_path)).upsert(event("b"))
+
+    assert [e["event_id"] for e in store.all()] == ["a", "b"]
+    assert store.metrics()["records"] == 2
+    assert store.metrics()["bytes"] > offset
+
+
+def test_compaction_drops_superseded_records_and_readers_rebuild(tmp_path):
+    writer = UserEventStore(str(tmp_path), compact_min_records=3)
+    reader = UserEventStore(str(tmp_path))
+    writer.upsert(event("b"))
+    writer.all()  # Index the log, so appends can trigger compaction
+    reader.all()
+    generation = reader.metrics()["generation"]
+
+    for i in range(10):
+        writer.upsert(event("a", f"v{i}"))
+
+    # Compacted in the background under a new generation, which makes the reader rebuild its index
+    deadline = time.monotonic() + 5.0
+    while reader.all() and reader.metrics()["generation"] == generation and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert reader.metrics()["generation"] != generation
+    assert reader.all() == [event("b"), event("a", "v9")]
+    assert reader.metrics()["records"] < 11  # Superseded upserts were dropped
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    (tmp_path / "user_events.json").write_text(json.dumps([event("old")]), encoding="utf-8")
+
+    store = UserEventStore(str(tmp_path))
+    assert store.all() == [event("old")]
+    store.upsert(event("new"))
+
+    assert UserEventStore(str(tmp_path)).all() == [event("old"), event("new")]
@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.formats import frame_to_columns_json, frame_to_records_json, open_arrow_sidecar, write_arrow_sidecar
+
+FLOATS = [150.12345678901234, 1e-12, 0.1 + 0.2, 1e20, -0.0, 5e-324, 1.7976931348623157e308, 123456789.12345678]
+
+
+def sample_frame() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    rows = 2000
+    values = np.concatenate([FLOATS, rng.random(rows - len(FLOATS)) * 100])
+    values[10] = np.nan
+    return pd.DataFrame(
+        {
+            # Strings that look like the JSON around a float value must come through untouched
+            "fund_id": [f'F{i},"value":"{i}"' if i % 7 == 0 else f"FUND{i}" for i in range(rows)],
+            "value": values,
+            "a/b": 10 ** rng.uniform(-300, 300, rows),
+            "count": np.arange(rows),
+        }
+    )
+
+
+def expected(df: pd.DataFrame, column: str) -> list:
+    return [None if pd.isna(v) else v for v in df[column].tolist()]
+
+
+def test_records_json_round_trips_floats_exactly():
+    df = sample_frame()
+    payload = json.loads(frame_to_records_json(df, {"version": "v1"}, chunk_rows=300))
+
+    assert payload["version"] == "v1"
+    rows = payload["data"]
+    assert len(rows) == len(df)
+    for column in df.columns:
+        assert [row[column] for row in rows] == expected(df, column), column
+
+
+def test_columns_json_round_trips_floats_exactly():
+    df = sample_frame()
+    payload = json.loads(frame_to_columns_json(df, {"version": "v1"}))
+
+    assert payload["columns"] == list(df.columns)
+    assert payload["num_rows"] == len(df)
+    for column in df.columns:
+        assert payload["data"][column] == expected(df, column), column
+
+
+def test_non_finite_floats_become_null():
+    df = pd.DataFrame({"value": [np.inf, -np.inf, np.nan, 1.5]})
+
+    assert [row["value"] for row in json.loads(frame_to_records_json(df))["data"]] == [None, None, None, 1.5]
+    assert json.loads(frame_to_columns_json(df))["data"]["value"] == [None, None, None, 1.5]
+
+
+def test_empty_frame():
+    df = pd.DataFrame({"value": pd.Series([], dtype=float)})
+
+    assert json.loads(frame_to_records_json(df)) == {"data": []}
+    assert json.loads(frame_to_columns_json(df))["data"] == {"value": []}
+
+
+def test_sidecar_is_ignored_once_its_parquet_changes(tmp_path):
+    path = str(tmp_path / "20250101_090000.parquet")
+    pq.write_table(pa.table({"value": [1.0]}), path)
+    write_arrow_sidecar(path)
+    assert open_arrow_sidecar(path).column("value").to_pylist() == [1.0]
+
+    pq.write_table(pa.table({"value": [2.0, 3.0]}), path)
+    assert open_arrow_sidecar(path) is None
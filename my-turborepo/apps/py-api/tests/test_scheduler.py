@@ -0,0 +1,85 @@
+import time
+
+from app.core.scheduler import TaskScheduler
+
+
+def task(task_id: str, target_id: str = "FUND", task_type: str = "pricing", **extra) -> dict:
+    return {"task_id": task_id, "params": {"target_id": target_id, "task_type": task_type}, **extra}
+
+
+def drain(scheduler: TaskScheduler) -> list[str]:
+    order = []
+    while (task_info := scheduler.pop()) is not None:
+        order.append(task_info["task_id"])
+        scheduler.done(task_info)
+    return order
+
+
+def test_priority_classes_then_arrival():
+    scheduler = TaskScheduler()
+    scheduler.push(task("batch", priority="batch"))
+    scheduler.push(task("background", priority="background"))
+    scheduler.push(task("interactive-1"))
+    scheduler.push(task("interactive-2"))
+
+    assert drain(scheduler) == ["interactive-1", "interactive-2", "background", "batch"]
+
+
+def test_due_deadline_goes_first_earliest_first():
+    scheduler = TaskScheduler(deadline_horizon=60.0)
+    now = time.time()
+    scheduler.push(task("interactive"))
+    scheduler.push(task("far", priority="batch", deadline=now + 3600))
+    scheduler.push(task("due-later", priority="batch", deadline=now + 30))
+    scheduler.push(task("due-soon", priority="batch", deadline=now + 10))
+
+    assert drain(scheduler) == ["due-soon", "due-later", "interactive", "far"]
+
+
+def test_waiting_tasks_are_promoted_by_aging():
+    scheduler = TaskScheduler(aging_seconds=120.0)
+    scheduler.push(task("background", priority="background"))
+    scheduler.push(task("old-batch", priority="batch", enqueued_at=time.time() - 250))
+
+    old = scheduler.pending()[0]
+    assert old["task_id"] == "old-batch"
+    assert scheduler.effective_priority(old) == "interactive"
+    assert drain(scheduler) == ["old-batch", "background"]
+
+
+def test_least_recently_served_target_goes_first():
+    scheduler = TaskScheduler()
+    scheduler.push(task("a-1", target_id="A"))
+    scheduler.push(task("a-2", target_id="A"))
+    scheduler.push(task("b-1", target_id="B"))
+
+    assert drain(scheduler) == ["a-1", "b-1", "a-2"]
+
+
+def test_type_limits_and_one_instance_per_task_id():
+    scheduler = TaskScheduler(type_limits={"pricing": 1})
+    scheduler.push(task("a", target_id="A"))
+    scheduler.push(task("b", target_id="B"))
+    scheduler.push(task("report", task_type="report"))
+
+    running = scheduler.pop()
+    assert scheduler.pop()["task_id"] == "report"  # pricing is at its limit
+    assert scheduler.pop() is None
+
+    scheduler.push(task(running["task_id"], target_id=running["params"]["target_id"]))  # Requested again
+    scheduler.done(running)
+    assert scheduler.pop()["task_id"] == "b"  # Arrived before the new request for a
+
+
+def test_duplicate_push_is_coalesced_keeping_the_most_urgent_request():
+    scheduler = TaskScheduler()
+    assert scheduler.push(task("a", priority="batch"))
+    scheduler.push(task("b", priority="background"))
+    deadline = time.time() + 3600
+
+    assert not scheduler.push({**task("a", priority="interactive", deadline=deadline), "params": {"new": True}})
+
+    assert len(scheduler) == 2
+    queued = scheduler.pending()[0]
+    assert (queued["task_id"], queued["priority"], queued["deadline"]) == ("a", "interactive", deadline)
+    assert queued["params"] == {"new": True}  # Latest request wins
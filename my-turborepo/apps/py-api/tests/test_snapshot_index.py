@@ -0,0 +1,66 @@
+import os
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.compaction import HISTORY_DIR, SnapshotCompactor, snapshot_filename
+from app.core.data_manager import DataManager
+
+
+def write_snapshots(root: str, count: int) -> dict[str, pa.Table]:
+    folder = os.path.join(root, "snapshots", "prices", "FUND")
+    os.makedirs(folder)
+    start = datetime.now().replace(microsecond=0) - timedelta(days=2)
+    tables = {}
+    for i in range(count):
+        name = snapshot_filename(start + timedelta(minutes=i))
+        tables[name] = pa.table({"fund_id": ["FUND", "FUND"], "field": ["PX_LAST", "PX_MID"], "value": [i, i + 0.5]})
+        pq.write_table(tables[name], os.path.join(folder, name))
+    return tables
+
+
+def loose_files(root: str) -> set[str]:
+    folder = os.path.join(root, "snapshots", "prices", "FUND")
+    return {os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(".parquet")}
+
+
+def test_compacted_snapshots_survive_removal_of_their_loose_files(tmp_path):
+    root = str(tmp_path)
+    tables = write_snapshots(root, 3)
+    dm = DataManager(root, memory_map=False)
+    dm.index.revalidate_interval = 3600.0  # Only the incremental updates may keep the index right
+    assert dm.get_snapshots("prices", "FUND") == sorted(tables, reverse=True)
+
+    # First run writes the partition but keeps the loose files during the grace period
+    compact = dict(min_age=3600.0, keep_latest=0, on_write=dm.on_file_synced)
+    SnapshotCompactor(root, grace_seconds=3600.0, **compact).run()
+    assert os.listdir(os.path.join(root, "snapshots", "prices", "FUND", HISTORY_DIR))
+    before = loose_files(root)
+    assert len(before) == 3
+
+    # Second run deletes them; the syncer then reports each removal to the index
+    SnapshotCompactor(root, grace_seconds=0.0, **compact).run()
+    removed = before - loose_files(root)
+    assert len(removed) == 3
+    for path in removed:
+        dm.on_file_removed(path)
+
+    assert dm.get_snapshots("prices", "FUND") == sorted(tables, reverse=True)
+    assert dm.resolve_version("prices", "FUND", "latest") == max(tables)
+    for name, table in tables.items():
+        assert dm.load_table("prices", "FUND", name).equals(table)
+
+
+def test_loose_file_removed_without_compaction_is_dropped(tmp_path):
+    root = str(tmp_path)
+    tables = write_snapshots(root, 2)
+    dm = DataManager(root, memory_map=False)
+    dm.index.revalidate_interval = 3600.0
+    oldest = min(tables)
+    path = os.path.join(root, "snapshots", "prices", "FUND", oldest)
+
+    os.remove(path)
+    dm.on_file_removed(path)
+
+    assert dm.get_snapshots("prices", "FUND") == [max(tables)]
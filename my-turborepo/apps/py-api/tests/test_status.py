@@ -0,0 +1,48 @@
+import os
+import threading
+
+from app.core.status import StatusManager
+
+PARAMS = {"target_id": "FUND", "task_type": "pricing"}
+
+
+def test_refresh_reads_the_share_without_blocking_readers(tmp_path):
+    manager = StatusManager(str(tmp_path))
+    manager.update("a", "running", "me", PARAMS)
+    manager.refresh(force=True)
+    manager.update("a", "done", "me", PARAMS, progress=100)
+
+    read = manager.get_status
+    served = []
+
+    def slow_read(task_id):
+        manager.get_status = read
+        # Another request while the refresh is reading the file: answered from the previous index
+        reader = threading.Thread(target=lambda: served.append(manager.get_all_statuses()), daemon=True)
+        reader.start()
+        reader.join(timeout=5.0)
+        assert not reader.is_alive()
+        return read(task_id)
+
+    manager.get_status = slow_read
+    manager.refresh_interval = 0.0
+    assert manager.refresh(force=True) == {"a"}
+
+    assert served[0][0]["status"] == "running"
+    assert manager.get_all_statuses()[0]["status"] == "done"
+
+
+def test_change_feed_forgets_removals_once_polled_past(tmp_path):
+    manager = StatusManager(str(tmp_path))
+    manager.update("a", "running", "me", PARAMS)
+    manager.update("b", "running", "me", PARAMS)
+    version, changed = manager.changes_since(0)
+    assert changed == {"a", "b"}
+
+    os.remove(os.path.join(manager.status_dir, "a.json"))
+    manager.refresh(force=True)
+    latest, changed = manager.changes_since(version)
+    assert changed == {"a"}
+
+    assert manager.changes_since(latest) == (latest, set())
+    assert set(manager._changed_at) == {"b"}  # Removed tasks don't accumulate in the feed
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from app.core.status import StatusManager
+from app.core.status_stream import StatusBroadcaster
+
+
+def status(task_id: str, target_id: str, progress: float = 0, heartbeat: str = "2025-01-01T09:00:00") -> dict:
+    params = {"target_id": target_id, "task_type": "pricing"}
+    return {
+        "task_id": task_id,
+        "status": "running",
+        "user": "me",
+        "progress": progress,
+        "message": "",
+        "last_heartbeat": heartbeat,
+        "params": params,
+    }
+
+
+async def drain(subscription) -> list[dict]:
+    return await subscription.next_batch(timeout=0.05)
+
+
+def test_heartbeat_only_updates_are_coalesced(tmp_path):
+    asyncio.run(heartbeat_only_updates_are_coalesced(str(tmp_path)))
+
+
+async def heartbeat_only_updates_are_coalesced(root: str):
+    broadcaster = StatusBroadcaster(StatusManager(root), heartbeat_interval=3600.0)
+    subscription = broadcaster.subscribe()
+    broadcaster._publish({"a"}, [status("a", "FUND")])
+    assert [m["status"]["progress"] for m in await drain(subscription)] == [0]
+
+    broadcaster._publish({"a"}, [status("a", "FUND", heartbeat="2025-01-01T09:00:05")])
+    assert await drain(subscription) == []
+
+    broadcaster._publish({"a"}, [status("a", "FUND", progress=50, heartbeat="2025-01-01T09:00:10")])
+    assert [m["status"]["progress"] for m in await drain(subscription)] == [50]
+
+    # Past heartbeat_interval a heartbeat is pushed again, so clients can tell the task is alive
+    broadcaster.heartbeat_interval = 0.0
+    broadcaster._publish({"a"}, [status("a", "FUND", progress=50, heartbeat="2025-01-01T09:00:15")])
+    assert [m["status"]["last_heartbeat"] for m in await drain(subscription)] == ["2025-01-01T09:00:15"]
+
+
+def test_removals_reach_matching_subscriptions_only(tmp_path):
+    asyncio.run(removals_reach_matching_subscriptions_only(str(tmp_path)))
+
+
+async def removals_reach_matching_subscriptions_only(root: str):
+    broadcaster = StatusBroadcaster(StatusManager(root))
+    fund = broadcaster.subscribe({("FUND", "pricing")})
+    other = broadcaster.subscribe({("OTHER", "pricing")})
+    everything = broadcaster.subscribe()
+    broadcaster._publish({"a"}, [status("a", "FUND")])
+    for subscription in (fund, other, everything):
+        await drain(subscription)
+
+    # The removed status is gone from the index: its key comes from what was published before
+    broadcaster._publish({"a"}, [])
+
+    removed = {"type": "removed", "task_id": "a"}
+    assert await drain(fund) == [removed]
+    assert await drain(everything) == [removed]
+    assert await drain(other) == []
+
+
+def test_stream_starts_with_a_snapshot_of_matching_statuses(tmp_path):
+    manager = StatusManager(str(tmp_path))
+    manager.update("a", "running", "me", {"target_id": "FUND", "task_type": "pricing"})
+    manager.update("b", "running", "me", {"target_id": "OTHER", "task_type": "pricing"})
+    broadcaster = StatusBroadcaster(manager)
+
+    event, data = asyncio.run(first_event(broadcaster, {("FUND", "pricing")})).strip().split("\n")
+
+    assert event == "event: snapshot"
+    assert [s["task_id"] for s in json.loads(data[len("data: ") :])] == ["a"]
+
+
+async def first_event(broadcaster: StatusBroadcaster, tasks: set[tuple[str, str]]) -> str:
+    stream = broadcaster.stream(broadcaster.subscribe(tasks))
+    try:
+        return await anext(stream)
+    finally:
+        await stream.aclose()
@@ -0,0 +1,53 @@
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.data_manager import DataManager
+from app.core.formats import sidecar_path
+from app.core.syncer import FileSyncer
+
+FILENAME = "20250101_090000.parquet"
+
+
+def write_shared(shared: str, values: list[float]) -> str:
+    path = os.path.join(shared, "snapshots", "prices", "FUND", FILENAME)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(pa.table({"field": [f"F{i}" for i in range(len(values))], "value": values}), path)
+    return path
+
+
+def test_rewritten_and_removed_snapshots_invalidate_their_sidecars(tmp_path):
+    shared, local = str(tmp_path / "shared"), str(tmp_path / "local")
+    dm = DataManager(local)
+    syncer = FileSyncer(
+        shared,
+        local,
+        settle_seconds=0.0,
+        on_file_synced=dm.on_file_synced,
+        on_file_removed=dm.on_file_removed,
+        arrow_sidecars=True,
+    )
+    try:
+        shared_file = write_shared(shared, [1.0])
+        syncer.sync_once(wait=True)
+        local_file = os.path.join(local, "snapshots", "prices", "FUND", FILENAME)
+        assert os.path.exists(sidecar_path(local_file))
+        assert dm.load_table("prices", "FUND", FILENAME).column("value").to_pylist() == [1.0]
+        assert dm.load_parquet("prices", "FUND", FILENAME)["value"].tolist() == [1.0]
+
+        # Rewritten on the share: the mirror, its sidecar and every cached read follow
+        write_shared(shared, [2.0, 3.0])
+        syncer.sync_paths([shared_file])
+        syncer.copier.join()
+        assert dm.load_table("prices", "FUND", FILENAME).column("value").to_pylist() == [2.0, 3.0]
+        assert dm.load_parquet("prices", "FUND", FILENAME)["value"].tolist() == [2.0, 3.0]
+
+        # Removed from the share: the local copy and its sidecar go too
+        os.remove(shared_file)
+        syncer.sync_once(wait=True)
+        assert not os.path.exists(local_file)
+        assert not os.path.exists(sidecar_path(local_file))
+        assert dm.get_snapshots("prices", "FUND") == []
+    finally:
+        syncer.copier.stop()
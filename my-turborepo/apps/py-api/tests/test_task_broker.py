@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from collections import Counter
+from multiprocessing import Process
+from typing import Optional
+
+from app.core.task_broker import BrokerConsumer, FileTaskBroker
+
+LEASE_SECONDS = 1.0
+
+
+def task(task_id: str) -> dict:
+    return {"task_id": task_id, "params": {"target_id": task_id, "task_type": "pricing"}}
+
+
+class SleepingPool:
+    """WorkerPool stand-in: runs one task at a time on a thread and records '<task_id>.<name>' in runs/."""
+
+    def __init__(self, shared_dir: str, name: str, duration: float):
+        self.runs_dir = os.path.join(shared_dir, "runs")
+        self.name = name
+        self.duration = duration
+        self._active: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def can_start(self, task_info: dict) -> bool:
+        with self._lock:
+            return self._active is None
+
+    def is_active(self, task_id: str) -> bool:
+        with self._lock:
+            return self._active == task_id
+
+    def submit(self, task_info: dict) -> str:
+        with self._lock:
+            self._active = task_info["task_id"]
+        threading.Thread(target=self._run, args=(task_info["task_id"],), daemon=True).start()
+        return "accepted"
+
+    def _run(self, task_id: str):
+        time.sleep(self.duration)
+        open(os.path.join(self.runs_dir, f"{task_id}.{self.name}"), "w").close()
+        with self._lock:
+            self._active = None
+
+
+def run_consumer(shared_dir: str, name: str, duration: float):
+    """One PC: a BrokerConsumer feeding a SleepingPool until the process is terminated."""
+    broker = FileTaskBroker(shared_dir, lease_seconds=LEASE_SECONDS)
+    consumer = BrokerConsumer(broker, SleepingPool(shared_dir, name, duration), poll_interval=0.05)
+    consumer.start()
+    consumer.join()
+
+
+def wait_for(condition, timeout: float = 30.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_claim_is_exclusive_and_renewed_leases_are_kept(tmp_path):
+    publisher = FileTaskBroker(str(tmp_path))
+    first, second = FileTaskBroker(str(tmp_path), lease_seconds=0.2), FileTaskBroker(str(tmp_path), lease_seconds=0.2)
+    publisher.publish(task("a"))
+
+    task_info, token = first.claim()
+    assert task_info["task_id"] == "a"
+    assert second.claim() is None
+
+    # Renewed (mtime changes) while the other PC watches: never requeued
+    for _ in range(5):
+        time.sleep(0.1)
+        assert first.renew("a", token)
+        assert second.requeue_expired() == []
+
+    first.complete("a", token)
+    assert publisher.status()["claimed"] == 0 and publisher.pending() == []
+
+
+def test_unrenewed_lease_is_requeued_after_lease_seconds(tmp_path):
+    publisher = FileTaskBroker(str(tmp_path))
+    holder, watcher = FileTaskBroker(str(tmp_path)), FileTaskBroker(str(tmp_path), lease_seconds=0.2)
+    publisher.publish(task("a"))
+    _, token = holder.claim()
+
+    assert watcher.requeue_expired() == []  # First sighting starts the lease on the watcher's clock
+    time.sleep(0.3)
+    assert watcher.requeue_expired() == ["a"]
+
+    assert [t["task_id"] for t in publisher.pending()] == ["a"]
+    assert not holder.renew("a", token)  # The holder learns it lost the claim
+
+
+def test_consumers_in_separate_processes_run_every_task_exactly_once(tmp_path):
+    shared_dir = str(tmp_path)
+    runs_dir = os.path.join(shared_dir, "runs")
+    os.makedirs(runs_dir)
+    publisher = FileTaskBroker(shared_dir, user_name="alice")
+    processes = []
+    try:
+        # A PC claims a task and dies before finishing it, without releasing its lease
+        publisher.publish(task("stuck"))
+        crashed = Process(target=run_consumer, args=(shared_dir, "crashed", 3600.0), daemon=True)
+        processes.append(crashed)
+        crashed.start()
+        assert wait_for(lambda: publisher.status()["claimed"] == 1)
+        crashed.kill()
+        crashed.join()
+
+        consumers = [Process(target=run_consumer, args=(shared_dir, f"pc{i}", 0.05), daemon=True) for i in range(3)]
+        processes += consumers
+        for consumer in consumers:
+            consumer.start()
+        task_ids = {"stuck", *(f"FUND{i:02d}" for i in range(20))}
+        for task_id in sorted(task_ids - {"stuck"}):
+            publisher.publish(task(task_id))
+
+        def finished() -> bool:
+            status = publisher.status()
+            return len(os.listdir(runs_dir)) >= len(task_ids) and status["pending"] == 0 and status["claimed"] == 0
+
+        assert wait_for(finished)
+        time.sleep(LEASE_SECONDS)  # Nothing may be requeued and run again afterwards
+        runs = [name.rsplit(".", 1) for name in os.listdir(runs_dir)]
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+            process.join()
+
+    assert Counter(task_id for task_id, _ in runs) == Counter(task_ids)
+    assert "crashed" not in {pc for _, pc in runs}
+    assert len({pc for _, pc in runs}) > 1  # The backlog was spread over several PCs
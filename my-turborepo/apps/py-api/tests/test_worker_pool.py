@@ -0,0 +1,49 @@
+import queue
+import threading
+
+from app.core.worker_pool import WorkerHandle, WorkerPool
+
+
+def idle_handle(worker_id: int) -> WorkerHandle:
+    ready = threading.Event()
+    ready.set()
+    return WorkerHandle(
+        worker_id, process=None, inbox=queue.Queue(), ready_event=ready, cancel_seq=None, cancel_reason=None
+    )
+
+
+def task(task_id: str) -> dict:
+    return {"task_id": task_id, "params": {"task_type": "pricing", "target_id": task_id}}
+
+
+def test_position_writes_never_follow_dispatch(tmp_path):
+    pool = WorkerPool(str(tmp_path), "me")
+    first, second = idle_handle(1), idle_handle(2)
+    first.current = second.current = {"task_id": "busy"}  # No worker free while the tasks are queued
+    pool._workers = {1: first, 2: second}
+    pool.scheduler.push(task("a"))
+    pool.scheduler.push(task("b"))
+
+    writes = []
+
+    def dispatch():
+        with pool._lock:
+            pool._dispatch()
+
+    def write_status(task_info, status, message):
+        writes.append(task_info["task_id"])
+        if task_info["task_id"] == "a":
+            # Both workers become free while a's 'pending' status is still being written
+            first.current = second.current = None
+            dispatcher = threading.Thread(target=dispatch)
+            dispatcher.start()
+            dispatcher.join()
+            assert first.inbox.empty()  # a is held back until its 'pending' write landed
+            assert second.inbox.get_nowait()["task_id"] == "b"
+
+    pool._write_status = write_status
+    pool._report_positions()
+
+    assert first.inbox.get_nowait()["task_id"] == "a"
+    assert writes == ["a"]  # b was dispatched before its turn, so no stale 'pending' is written for it
+    assert pool._position_writes == {}
@@ -6,6 +6,12 @@ import { Toaster } from '@/components/ui/sonner';
 import { NuqsAdapter } from 'nuqs/adapters/next/app';
 import { QueryClient, QueryClientProvider } from '@tanstack/react-query';
 import { useState } from 'react';
+import { useTaskStatusStream } from '@/hooks/use-task-status-stream';
+
+function TaskStatusStream() {
+  useTaskStatusStream();
+  return null;
+}
 
 export function Providers({ children }: { children: React.ReactNode }) {
   // QueryClient should be initialized with useState to hold an instance
@@ -23,6 +29,7 @@ export function Providers({ children }: { children: React.ReactNode }) {
 
   return (
     <QueryClientProvider client={queryClient}>
+      <TaskStatusStream />
       <NuqsAdapter>
         <ThemeProvider attribute="class" defaultTheme="system" enableSystem>
           <SidebarProvider defaultOpen={false}>
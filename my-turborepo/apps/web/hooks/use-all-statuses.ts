@@ -11,6 +11,7 @@ export function useAllStatuses() {
       if (!res.ok) return [];
       return res.json();
     },
-    refetchInterval: 5000,
+    // Updates are pushed by useTaskStatusStream, polling is only a fallback
+    refetchInterval: 60000,
   });
 }
@@ -1,19 +1,54 @@
 'use client';
 
-import { useQuery } from '@tanstack/react-query';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 
 const API_BASE = 'http://localhost:8000';
 
+type Row = Record<string, any>;
+
+interface SnapshotContent {
+  version: string | null; // Snapshot filename the rows were read from
+  data: Row[];
+}
+
+interface SnapshotDiff {
+  from: string;
+  to: string;
+  keys: string[];
+  data: (Row & { change: 'added' | 'removed' | 'changed' })[];
+}
+
+// Applies only the changed rows to the cached content instead of refetching the whole snapshot
+function applyDiff(previous: SnapshotContent, diff: SnapshotDiff): SnapshotContent {
+  const keyOf = (row: Row) => JSON.stringify(diff.keys.map((k) => row[k] ?? null));
+  const rows = new Map(previous.data.map((row) => [keyOf(row), row]));
+  for (const { change, ...row } of diff.data) {
+    if (change === 'removed') rows.delete(keyOf(row));
+    else rows.set(keyOf(row), row);
+  }
+  return { version: diff.to, data: Array.from(rows.values()) };
+}
+
 export function useSnapshot(targetId: string, dataType: string, version: string = 'latest') {
+  const queryClient = useQueryClient();
+  const contentKey = ['snapshot', targetId, dataType, 'content', version];
+
   // Get content of snapshot
   const { data: result, isLoading: isDataLoading } = useQuery({
-    queryKey: ['snapshot', targetId, dataType, 'content', version],
-    queryFn: async () => {
+    queryKey: contentKey,
+    queryFn: async (): Promise<SnapshotContent> => {
+      // Refreshing 'latest': fetch the delta from the version already held
+      const previous = queryClient.getQueryData<SnapshotContent>(contentKey);
+      if (version === 'latest' && previous?.version) {
+        const res = await fetch(`${API_BASE}/data/${targetId}/${dataType}/diff?from=${previous.version}`);
+        if (res.ok) return applyDiff(previous, await res.json());
+      }
       const res = await fetch(`${API_BASE}/data/${targetId}/${dataType}/content?version=${version}`);
       if (!res.ok) throw new Error('Data fetch failed');
       const json = await res.json();
-      return json.data;
+      return { version: json.version, data: json.data };
     },
+    select: (content) => content.data,
     enabled: !!targetId && !!dataType,
   });
 
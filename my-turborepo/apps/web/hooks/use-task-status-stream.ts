@@ -0,0 +1,39 @@
+'use client';
+
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import { TaskStatus } from '@/types/task';
+
+const API_BASE = 'http://localhost:8000';
+const QUERY_KEY = ['tasks', 'global-status'];
+
+/**
+ * Subscribes once to the backend's status stream (Server-Sent Events)
+ * and writes every change into the shared 'global-status' query cache.
+ * Mount a single instance near the root so widgets don't need to poll.
+ */
+export function useTaskStatusStream() {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    const source = new EventSource(`${API_BASE}/tasks/stream`);
+
+    source.addEventListener('snapshot', (e) => {
+      queryClient.setQueryData<TaskStatus[]>(QUERY_KEY, JSON.parse((e as MessageEvent).data));
+    });
+    source.addEventListener('status', (e) => {
+      const { status } = JSON.parse((e as MessageEvent).data) as { status: TaskStatus };
+      queryClient.setQueryData<TaskStatus[]>(QUERY_KEY, (prev = []) => [
+        status,
+        ...prev.filter((s) => s.task_id !== status.task_id),
+      ]);
+    });
+    source.addEventListener('removed', (e) => {
+      const { task_id } = JSON.parse((e as MessageEvent).data) as { task_id: string };
+      queryClient.setQueryData<TaskStatus[]>(QUERY_KEY, (prev = []) => prev.filter((s) => s.task_id !== task_id));
+    });
+
+    // EventSource reconnects automatically, the slow polling in useAllStatuses covers the gap
+    return () => source.close();
+  }, [queryClient]);
+}
@@ -21,7 +21,9 @@ export function useTask(targetId: string, taskType: string) {
       (s) =>
         s.params.task_type === taskType &&
         s.status === 'running' &&
-        (s.params.target_id === targetId || s.params.target_id === 'ALL'),
+        (s.params.target_id === targetId ||
+          s.params.target_id === 'ALL' ||
+          (s.params.target_ids?.includes(targetId) ?? false)),
     );
     if (relevantRunning) return relevantRunning;
 
@@ -46,8 +48,18 @@ export function useTask(targetId: string, taskType: string) {
       if (!res.ok) throw new Error('Execution failed');
       return res.json();
     },
-    onSuccess: () => {
-      toast.info(`Sent task request for ${taskType.toUpperCase()}`);
+    onSuccess: (data) => {
+      if (data?.status === 'reused') {
+        toast.info(`Using ${data.user}'s ${data.task_status} ${taskType.toUpperCase()} result`);
+      } else if (data?.status === 'fresh') {
+        toast.info(`${taskType.toUpperCase()} for ${targetId} is up to date`);
+      } else if (data?.status === 'attached' || data?.status === 'coalesced') {
+        toast.info(`${taskType.toUpperCase()} for ${targetId} is already queued`);
+      } else if (data?.position) {
+        toast.info(`Queued ${taskType.toUpperCase()} for ${targetId} (position ${data.position})`);
+      } else {
+        toast.info(`Sent task request for ${taskType.toUpperCase()}`);
+      }
       // Reload status and start pollilng
       queryClient.invalidateQueries({ queryKey: ['tasks', 'global-status'] });
     },
@@ -5,16 +5,18 @@ export interface TaskParams {
   target_id: string;
   task_type: 'event' | 'guideline' | 'pricing';
   extra_params: Record<string, any>;
+  target_ids?: string[] | null; // Batch: one engine call for all targets, saved under BATCH
 }
 
 export interface TaskStatus {
   task_id: string;
-  status: 'pending' | 'running' | 'done' | 'failed';
+  status: 'pending' | 'running' | 'done' | 'failed' | 'cancelled';
   user: string;
   progress: number;
   message: string;
   last_heartbeat: string; // ISO format string from JSON
   params: TaskParams;
+  timings?: Record<string, number> | null; // Seconds per phase of a finished task (queue_wait, compute, write)
 }
 
 export interface UserEvent {